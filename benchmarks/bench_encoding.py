@@ -0,0 +1,59 @@
+"""Compare the JSON encoders available for responses on large list results.
+
+Run with ``python benchmarks/bench_encoding.py``. Encoders whose package is not
+installed are skipped.
+"""
+import argparse
+import timeit
+
+from graphql_server import json_encode
+
+from flask_graphql.encoding import (orjson, orjson_encode, stdlib_json_encode,
+                                    ujson, ujson_encode)
+
+
+def make_result(rows):
+    return {
+        "data": {
+            "items": [
+                {
+                    "id": str(index),
+                    "name": f"Item number {index}",
+                    "price": index * 1.25,
+                    "inStock": index % 2 == 0,
+                    "tags": ["alpha", "beta", "gamma"],
+                    "owner": {"id": str(index % 97), "name": "Ünïcødé owner"},
+                }
+                for index in range(rows)
+            ]
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = make_result(args.rows)
+    encoders = [
+        ("json_encode + str.encode", lambda: json_encode(result).encode()),
+        ("stdlib_json_encode", lambda: stdlib_json_encode(result)),
+    ]
+    if orjson is not None:
+        encoders.append(("orjson_encode", lambda: orjson_encode(result)))
+    if ujson is not None:
+        encoders.append(("ujson_encode", lambda: ujson_encode(result)))
+
+    size = len(stdlib_json_encode(result))
+    print(f"{args.rows} rows, {size / 1e6:.1f} MB of JSON")
+    baseline = None
+    for name, encode in encoders:
+        best = min(timeit.repeat(encode, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<28} {best * 1000:8.1f} ms  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
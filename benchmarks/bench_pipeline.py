@@ -0,0 +1,447 @@
+"""Measure the cost of the request pipeline on scaled up synthetic schemas.
+
+Every scenario is run through the Flask test client and through a bare WSGI
+harness that calls the application directly, reporting requests per second and
+latency percentiles. The stages of the pipeline (body parsing, parsing,
+validation, execution and encoding) are also timed separately, together with
+the memory they allocate.
+
+Run with ``python benchmarks/bench_pipeline.py``. Pass ``--output results.json``
+to save the results and ``--compare results.json`` to compare a later run with
+them, which exits with status 1 if any measurement got slower than allowed by
+``--threshold``.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Any, Callable, Dict, List, NamedTuple
+
+import flask
+from flask import Flask
+from graphql_server import load_json_body
+from werkzeug.test import EnvironBuilder
+
+import graphql
+from flask_graphql import GraphQLView
+from flask_graphql.encoding import json_encode_bytes
+from flask_graphql.runtime import (encode_execution_results, execute_document,
+                                   get_graphql_params)
+from graphql import (GraphQLArgument, GraphQLField, GraphQLInputField,
+                     GraphQLInputObjectType, GraphQLInt, GraphQLList,
+                     GraphQLNonNull, GraphQLObjectType, GraphQLSchema,
+                     GraphQLString, parse, validate)
+
+WIDE_FIELDS = 200
+DEEP_LEVELS = 25
+LIST_ITEMS = 5000
+BATCH_SIZE = 100
+VARIABLE_ITEMS = 5000
+
+
+class Scenario(NamedTuple):
+    name: str
+    schema: GraphQLSchema
+    payload: Any
+    view_options: Dict[str, Any]
+
+
+def make_schema(scale: float) -> GraphQLSchema:
+    """Build a schema modeled on ``tests/schema.py`` with larger types."""
+    wide_fields = int(WIDE_FIELDS * scale)
+    list_items = int(LIST_ITEMS * scale)
+
+    WideType = GraphQLObjectType(
+        "Wide",
+        {
+            f"field{index}": GraphQLField(
+                GraphQLString, resolve=lambda obj, info: info.field_name
+            )
+            for index in range(wide_fields)
+        },
+    )
+    NodeType = GraphQLObjectType(
+        "Node",
+        lambda: {
+            "depth": GraphQLField(GraphQLInt),
+            "name": GraphQLField(GraphQLString),
+            "child": GraphQLField(
+                NodeType,
+                resolve=lambda node, info: {
+                    "depth": node["depth"] + 1,
+                    "name": f"node {node['depth'] + 1}",
+                },
+            ),
+        },
+    )
+    ItemType = GraphQLObjectType(
+        "Item",
+        {
+            "id": GraphQLField(GraphQLNonNull(GraphQLString)),
+            "name": GraphQLField(GraphQLString),
+            "price": GraphQLField(GraphQLInt),
+            "tags": GraphQLField(GraphQLList(GraphQLString)),
+            "owner": GraphQLField(
+                GraphQLObjectType(
+                    "Owner",
+                    {
+                        "id": GraphQLField(GraphQLString),
+                        "name": GraphQLField(GraphQLString),
+                    },
+                )
+            ),
+        },
+    )
+    ItemInputType = GraphQLInputObjectType(
+        "ItemInput",
+        {
+            "id": GraphQLInputField(GraphQLNonNull(GraphQLString)),
+            "name": GraphQLInputField(GraphQLString),
+            "tags": GraphQLInputField(GraphQLList(GraphQLString)),
+        },
+    )
+    items = [
+        {
+            "id": str(index),
+            "name": f"Item number {index}",
+            "price": index,
+            "tags": ["alpha", "beta", "gamma"],
+            "owner": {"id": str(index % 97), "name": "Owner"},
+        }
+        for index in range(list_items)
+    ]
+    return GraphQLSchema(
+        GraphQLObjectType(
+            "QueryRoot",
+            {
+                "test": GraphQLField(
+                    GraphQLString,
+                    args={"who": GraphQLArgument(GraphQLString)},
+                    resolve=lambda obj, info, who="World": "Hello %s" % who,
+                ),
+                "wide": GraphQLField(WideType, resolve=lambda *_: {}),
+                "root": GraphQLField(
+                    NodeType, resolve=lambda *_: {"depth": 0, "name": "node 0"}
+                ),
+                "items": GraphQLField(GraphQLList(ItemType), resolve=lambda *_: items),
+                "countItems": GraphQLField(
+                    GraphQLInt,
+                    args={
+                        "items": GraphQLArgument(
+                            GraphQLList(GraphQLNonNull(ItemInputType))
+                        )
+                    },
+                    resolve=lambda obj, info, items: len(items),
+                ),
+            },
+        )
+    )
+
+
+def make_scenarios(scale: float) -> List[Scenario]:
+    schema = make_schema(scale)
+    wide_query = "{ wide { %s } }" % " ".join(
+        f"field{index}" for index in range(int(WIDE_FIELDS * scale))
+    )
+    deep_query = "{ root { %s } }" % (
+        "depth name child { " * int(DEEP_LEVELS * scale)
+        + "depth name"
+        + " }" * int(DEEP_LEVELS * scale)
+    )
+    list_query = "{ items { id name price tags owner { id name } } }"
+    variables_query = "query Count($items: [ItemInput!]) { countItems(items: $items) }"
+    variable_items = [
+        {"id": str(index), "name": f"Item {index}", "tags": ["alpha", "beta"]}
+        for index in range(int(VARIABLE_ITEMS * scale))
+    ]
+    return [
+        Scenario("wide", schema, {"query": wide_query}, {}),
+        Scenario("deep", schema, {"query": deep_query}, {}),
+        Scenario("list", schema, {"query": list_query}, {}),
+        Scenario(
+            "batch",
+            schema,
+            [
+                {
+                    "query": "query Hello($who: String) { test(who: $who) }",
+                    "variables": {"who": f"user {index}"},
+                }
+                for index in range(int(BATCH_SIZE * scale))
+            ],
+            {"batch": True},
+        ),
+        Scenario(
+            "variables",
+            schema,
+            {"query": variables_query, "variables": {"items": variable_items}},
+            {},
+        ),
+    ]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(durations: List[float]) -> Dict[str, float]:
+    """Return requests per second and latency percentiles in milliseconds."""
+    durations = sorted(durations)
+    total = sum(durations)
+    return {
+        "requests": len(durations),
+        "rps": len(durations) / total if total else 0.0,
+        "p50_ms": percentile(durations, 0.5) * 1000,
+        "p90_ms": percentile(durations, 0.9) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "max_ms": durations[-1] * 1000,
+    }
+
+
+def measure(func: Callable[[], Any], requests: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return summarize(durations)
+
+
+def measure_allocations(func: Callable[[], Any]) -> Dict[str, int]:
+    """Return the bytes allocated at peak and retained by one call."""
+    tracemalloc.start()
+    try:
+        func()  # keep allocations of caches warmed up once out of the figures
+        tracemalloc.clear_traces()
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"peak_bytes": peak - before, "retained_bytes": current - before}
+
+
+def make_app(scenario: Scenario, view_options: Dict[str, Any]) -> Flask:
+    app = Flask(__name__)
+    app.add_url_rule(
+        "/graphql",
+        view_func=GraphQLView.as_view(
+            "graphql",
+            schema=scenario.schema,
+            **scenario.view_options,
+            **view_options,
+        ),
+    )
+    return app
+
+
+def bench_harnesses(
+    scenario: Scenario, app: Flask, requests: int, warmup: int
+) -> Dict[str, Any]:
+    body = json.dumps(scenario.payload).encode()
+    client = app.test_client()
+
+    def client_request():
+        response = client.post(
+            "/graphql", data=body, content_type="application/json"
+        )
+        assert response.status_code == 200, response.data[:500]
+
+    environ = EnvironBuilder(
+        path="/graphql",
+        method="POST",
+        data=body,
+        content_type="application/json",
+    ).get_environ()
+
+    def start_response(status, headers, exc_info=None):
+        assert status.startswith("200"), status
+
+    def wsgi_request():
+        request_environ = dict(environ, **{"wsgi.input": BytesIO(body)})
+        chunks = app.wsgi_app(request_environ, start_response)
+        try:
+            for _chunk in chunks:
+                pass
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    return {
+        "body_bytes": len(body),
+        "client": measure(client_request, requests, warmup),
+        "wsgi": measure(wsgi_request, requests, warmup),
+    }
+
+
+def bench_stages(scenario: Scenario, requests: int, warmup: int) -> Dict[str, Any]:
+    schema = scenario.schema
+    body = json.dumps(scenario.payload)
+    data = load_json_body(body)
+    entries = data if isinstance(data, list) else [data]
+    all_params = [get_graphql_params(entry, {}) for entry in entries]
+    documents = [parse(params.query) for params in all_params]
+    for document in documents:
+        assert not validate(schema, document)
+    results = [
+        execute_document(schema, document, params)
+        for document, params in zip(documents, all_params)
+    ]
+
+    stages = {
+        "body": lambda: load_json_body(body),
+        "parse": lambda: [parse(params.query) for params in all_params],
+        "validate": lambda: [validate(schema, document) for document in documents],
+        "execute": lambda: [
+            execute_document(schema, document, params)
+            for document, params in zip(documents, all_params)
+        ],
+        "encode": lambda: encode_execution_results(
+            results, is_batch=isinstance(data, list), encode=json_encode_bytes
+        ),
+    }
+    return {
+        name: {**measure(stage, requests, warmup), **measure_allocations(stage)}
+        for name, stage in stages.items()
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    view_options = {}
+    if args.document_cache:
+        view_options["document_cache"] = True
+    if args.compile_queries:
+        view_options["compile_queries"] = True
+    scenarios = {}
+    for scenario in make_scenarios(args.scale):
+        if args.scenario and scenario.name not in args.scenario:
+            continue
+        app = make_app(scenario, view_options)
+        scenarios[scenario.name] = {
+            **bench_harnesses(scenario, app, args.requests, args.warmup),
+            "stages": bench_stages(scenario, args.requests, args.warmup),
+        }
+        print_scenario(scenario.name, scenarios[scenario.name])
+    return {
+        "environment": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "graphql-core": graphql.__version__,
+            "flask": flask.__version__,
+        },
+        "options": {
+            "scale": args.scale,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            **view_options,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def print_scenario(name: str, result: Dict[str, Any]) -> None:
+    print(f"{name} ({result['body_bytes']} byte body)")
+    for harness in ("client", "wsgi"):
+        stats = result[harness]
+        print(
+            f"  {harness:<10} {stats['rps']:9.1f} req/s"
+            f"  p50 {stats['p50_ms']:8.2f} ms  p90 {stats['p90_ms']:8.2f} ms"
+            f"  p99 {stats['p99_ms']:8.2f} ms"
+        )
+    for stage, stats in result["stages"].items():
+        print(
+            f"  {stage:<10} {stats['p50_ms']:9.3f} ms"
+            f"  peak {stats['peak_bytes'] / 1024:9.1f} KiB"
+            f"  retained {stats['retained_bytes'] / 1024:9.1f} KiB"
+        )
+
+
+def iter_timings(results: Dict[str, Any]):
+    """Yield the name and median latency of every measurement."""
+    for name, scenario in results["scenarios"].items():
+        for harness in ("client", "wsgi"):
+            yield f"{name}.{harness}", scenario[harness]["p50_ms"]
+        for stage, stats in scenario["stages"].items():
+            yield f"{name}.{stage}", stats["p50_ms"]
+
+
+def compare(
+    baseline: Dict[str, Any],
+    results: Dict[str, Any],
+    threshold: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Print the change of all median latencies and return the regressions.
+
+    Changes smaller than ``min_delta_ms`` are never reported as regressions, to
+    ignore the noise of the fastest stages.
+    """
+    baseline_timings = dict(iter_timings(baseline))
+    regressions = []
+    print(f"compared with {baseline['environment']['time']}")
+    for name, timing in iter_timings(results):
+        before = baseline_timings.get(name)
+        if not before:
+            continue
+        ratio = timing / before
+        marker = ""
+        if ratio > threshold and timing - before > min_delta_ms:
+            marker = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<24} {before:9.3f} -> {timing:9.3f} ms  {ratio:5.2f}x{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=["wide", "deep", "list", "batch", "variables"],
+        help="run only the given scenario, can be repeated",
+    )
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--document-cache", action="store_true")
+    parser.add_argument("--compile-queries", action="store_true")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with results of an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown factor reported as a regression when comparing",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.05,
+        help="smallest slowdown in milliseconds reported as a regression",
+    )
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(baseline, results, args.threshold, args.min_delta_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
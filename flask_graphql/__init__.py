@@ -1,3 +1,42 @@
-from graphql_server.flask.graphqlview import GraphQLView
+from .cache import DocumentCache
+from .dataloader import DataLoader, DataLoaderRegistry
+from .graphqlview import AsyncGraphQLView, GraphQLView
+from .incremental import GraphQLDeferDirective, GraphQLStreamDirective
+from .metrics import GraphQLMetrics, MetricsView
+from .persisted_queries import (DictPersistedQueryStore,
+                                FilePersistedQueryStore,
+                                MemoryPersistedQueryStore,
+                                PersistedQueryNotFound,
+                                PersistedQueryNotSupported,
+                                PersistedQueryStore)
+from .subscriptions import (Broker, InMemoryBroker, SocketBroker,
+                            SubscriptionView)
+from .trusted_documents import (OperationNotTrusted, TrustedDocumentNotFound,
+                                TrustedDocuments)
+from .uploads import GraphQLUpload
 
-__all__ = ['GraphQLView']
+__all__ = [
+    'GraphQLView',
+    'AsyncGraphQLView',
+    'DocumentCache',
+    'DataLoader',
+    'DataLoaderRegistry',
+    'GraphQLDeferDirective',
+    'GraphQLStreamDirective',
+    'GraphQLMetrics',
+    'MetricsView',
+    'PersistedQueryStore',
+    'MemoryPersistedQueryStore',
+    'DictPersistedQueryStore',
+    'FilePersistedQueryStore',
+    'PersistedQueryNotFound',
+    'PersistedQueryNotSupported',
+    'SubscriptionView',
+    'Broker',
+    'InMemoryBroker',
+    'SocketBroker',
+    'TrustedDocuments',
+    'TrustedDocumentNotFound',
+    'OperationNotTrusted',
+    'GraphQLUpload',
+]
@@ -0,0 +1,264 @@
+"""Admission control: cost based rate limits per client and a concurrency cap.
+
+A ``RateLimit`` keeps a token bucket per client, identified by the
+``rate_limit_key`` function of the view. Every request is charged the
+complexity of its operations, as calculated for ``max_complexity``, and at
+least 1 per operation. The buckets are kept in memory by default, or in a
+SQLite database shared by all processes on the host.
+
+A ``ConcurrencyLimit`` caps the number of requests executing at the same time in
+a process. A limited number of requests may wait for a free slot.
+
+Requests over either limit are rejected with a 429 response and a
+``Retry-After`` header before any resolver runs.
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from threading import Condition, Lock
+from typing import Any, Optional, Tuple
+
+from graphql_server import HttpQueryError
+
+from .cache import LRUCache
+
+__all__ = [
+    "RateLimit",
+    "ConcurrencyLimit",
+    "TokenBucketStore",
+    "MemoryTokenBucketStore",
+    "SQLiteTokenBucketStore",
+    "make_concurrency_limit",
+    "too_many_requests",
+]
+
+
+def too_many_requests(message: str, retry_after: float) -> HttpQueryError:
+    return HttpQueryError(
+        429,
+        message,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def refill(
+    tokens: float, elapsed: float, amount: float, rate: float, capacity: float
+) -> Tuple[float, float]:
+    """Refill a bucket and take the amount if possible.
+
+    Buckets may hold negative tokens after an amount larger than the capacity
+    has been taken.
+
+    Returns the new number of tokens and the seconds to wait until the amount
+    can be taken, or 0 if it has been taken.
+    """
+    tokens = min(capacity, tokens + max(elapsed, 0) * rate)
+    # Amounts larger than the capacity are taken from a full bucket, leaving
+    # it in debt until the whole amount has been refilled.
+    needed = min(amount, capacity)
+    if tokens >= needed:
+        return tokens - amount, 0
+    return tokens, (needed - tokens) / rate
+
+
+class TokenBucketStore:
+    """Interface for storing the token buckets of clients."""
+
+    def take(self, key: str, amount: float, rate: float, capacity: float) -> float:
+        """Take tokens from the bucket of the key, which starts out full.
+
+        Returns 0 if the tokens have been taken, or the seconds until the bucket
+        holds enough of them.
+        """
+        raise NotImplementedError
+
+
+class MemoryTokenBucketStore(TokenBucketStore):
+    """Keep the buckets of the most recent clients in the current process.
+
+    Evicted buckets start out full again.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.buckets = LRUCache(maxsize)
+        self.lock = Lock()
+
+    def take(self, key: str, amount: float, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (capacity, now))
+            tokens, wait = refill(tokens, now - updated, amount, rate, capacity)
+            self.buckets.set(key, (tokens, now))
+        return wait
+
+
+class SQLiteTokenBucketStore(TokenBucketStore):
+    """Keep the buckets in a SQLite database shared by all processes on the host.
+
+    Every bucket is updated in its own write transaction. Each thread of each
+    process uses its own connection.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets"
+                " (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return connection
+
+    def take(self, key: str, amount: float, rate: float, capacity: float) -> float:
+        connection = self.connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = connection.execute(
+                "SELECT tokens, updated FROM token_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, wait = refill(tokens, now - updated, amount, rate, capacity)
+            connection.execute(
+                "INSERT OR REPLACE INTO token_buckets (key, tokens, updated)"
+                " VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return wait
+
+
+class RateLimit:
+    """Token buckets per client, refilled with ``rate`` cost units per second.
+
+    A bucket holds at most ``burst`` units, which defaults to the rate. Requests
+    costing more than the burst are admitted when the bucket is full, and are
+    charged their full cost, which leaves the bucket in debt. The ``store`` is a
+    ``MemoryTokenBucketStore`` by default.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        store: Optional[TokenBucketStore] = None,
+    ):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive. Received {rate!r}.")
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.store = MemoryTokenBucketStore() if store is None else store
+
+    def charge(self, key: Any, cost: float) -> None:
+        """Take the cost from the bucket of the client, or raise a 429 error."""
+        wait = self.store.take(str(key), cost, self.rate, self.burst)
+        if wait > 0:
+            raise too_many_requests("Rate limit exceeded, try again later.", wait)
+
+
+class ConcurrencyLimit:
+    """Allow at most ``max_concurrent`` requests to execute at the same time.
+
+    Up to ``max_waiting`` further requests wait at most ``timeout`` seconds for a
+    free slot. Other requests are rejected right away.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int = 0, timeout: float = 1.0):
+        if max_concurrent < 1:
+            raise ValueError(
+                f"Concurrency limit must be positive. Received {max_concurrent!r}."
+            )
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self.condition = Condition()
+
+    def acquire(self) -> None:
+        with self.condition:
+            if self.running >= self.max_concurrent:
+                if self.waiting >= self.max_waiting:
+                    raise self.rejected()
+                self.waiting += 1
+                try:
+                    if not self.condition.wait_for(
+                        lambda: self.running < self.max_concurrent, self.timeout
+                    ):
+                        raise self.rejected()
+                finally:
+                    self.waiting -= 1
+            self.running += 1
+
+    async def acquire_async(self) -> None:
+        """Wait for a free slot in a worker thread, without blocking the loop.
+
+        If the awaiting task is cancelled, a slot acquired by the thread
+        afterwards is released right away.
+        """
+        lock = Lock()
+        acquired = abandoned = False
+
+        def acquire() -> None:
+            nonlocal acquired
+            self.acquire()
+            with lock:
+                if abandoned:
+                    self.release()
+                else:
+                    acquired = True
+
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, acquire)
+        except asyncio.CancelledError:
+            with lock:
+                if acquired:
+                    self.release()
+                abandoned = True
+            raise
+
+    def release(self) -> None:
+        with self.condition:
+            self.running -= 1
+            self.condition.notify()
+
+    def rejected(self) -> HttpQueryError:
+        return too_many_requests(
+            "Too many operations are being executed, try again later.",
+            self.timeout,
+        )
+
+    def __enter__(self) -> "ConcurrencyLimit":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+def make_concurrency_limit(value: Any) -> Optional[ConcurrencyLimit]:
+    """Build a concurrency limit from the ``concurrency_limit`` view option.
+
+    The option can be a ``ConcurrencyLimit`` instance, the maximum number of
+    concurrent requests, or a false value for no limit.
+    """
+    if value is None or value is False:
+        return None
+    if isinstance(value, int):
+        return ConcurrencyLimit(value)
+    return value
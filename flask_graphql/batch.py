@@ -0,0 +1,85 @@
+"""Concurrent execution of the operations in a batch request."""
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from inspect import isawaitable
+from threading import BoundedSemaphore
+from typing import Any, Callable, List, Optional
+
+from flask import copy_current_request_context, has_request_context
+
+__all__ = ["execute_batch", "execute_batch_async", "make_batch_executor"]
+
+
+def execute_batch(
+    calls: List[Callable[[], Any]],
+    executor: Executor,
+    max_concurrency: Optional[int] = None,
+) -> List[Any]:
+    """Run the given calls using the executor and return their results in order.
+
+    At most ``max_concurrency`` calls of this batch are running at the same time.
+    When called while handling a Flask request, every call is run inside a copy of
+    the current request context, so that resolvers can still use ``request``.
+    """
+    semaphore = BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def release(_future):
+        semaphore.release()
+
+    futures = []
+    for call in calls:
+        if has_request_context():
+            call = copy_current_request_context(call)
+        if semaphore:
+            semaphore.acquire()
+        try:
+            future = executor.submit(call)
+        except BaseException:
+            if semaphore:
+                semaphore.release()
+            raise
+        if semaphore:
+            future.add_done_callback(release)
+        futures.append(future)
+    return [future.result() for future in futures]
+
+
+async def execute_batch_async(
+    calls: List[Callable[[], Any]], max_concurrency: Optional[int] = None
+) -> List[Any]:
+    """Run the given calls concurrently on the event loop and return their results.
+
+    The calls may return awaitables, which are awaited with at most
+    ``max_concurrency`` of them running at the same time.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def run(call):
+        if semaphore:
+            async with semaphore:
+                return await await_value(call())
+        return await await_value(call())
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def await_value(value: Any) -> Any:
+    if isawaitable(value):
+        return await value
+    return value
+
+
+def make_batch_executor(value: Any) -> Optional[Executor]:
+    """Build an executor from the ``batch_executor`` view option.
+
+    The option can be an executor instance, True for a thread pool with the
+    default number of workers, an integer for a thread pool of that size, or a
+    false value to execute the operations of a batch one after another.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return ThreadPoolExecutor(thread_name_prefix="graphql-batch")
+    if isinstance(value, int):
+        return ThreadPoolExecutor(value, thread_name_prefix="graphql-batch")
+    return value
@@ -0,0 +1,251 @@
+"""Reading request bodies within configured size limits.
+
+The body is read from the input stream in chunks, so a request exceeding
+``max_body_size`` is rejected with a 413 error as soon as the limit is reached,
+or before reading anything if its ``Content-Length`` is already too large.
+JSON batches are decoded one operation at a time while the body arrives, so
+that batches with too many operations fail before the rest is read.
+"""
+import codecs
+import json
+from typing import IO, Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from graphql_server import HttpQueryError
+
+__all__ = [
+    "CHUNK_SIZE",
+    "body_too_large",
+    "iter_body",
+    "read_body",
+    "iter_json_array",
+    "load_json_body_stream",
+    "check_params_size",
+]
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+def body_too_large(max_body_size: int) -> HttpQueryError:
+    return HttpQueryError(
+        413, f"Request body is too large, the limit is {max_body_size} bytes."
+    )
+
+
+def iter_body(
+    stream: IO[bytes],
+    content_length: Optional[int] = None,
+    max_body_size: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yield the request body in chunks, enforcing the maximum body size."""
+    if max_body_size is not None and (content_length or 0) > max_body_size:
+        raise body_too_large(max_body_size)
+    size = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        size += len(chunk)
+        if max_body_size is not None and size > max_body_size:
+            raise body_too_large(max_body_size)
+        yield chunk
+
+
+def read_body(
+    stream: IO[bytes],
+    content_length: Optional[int] = None,
+    max_body_size: Optional[int] = None,
+) -> bytes:
+    """Return the complete request body, enforcing the maximum body size."""
+    return b"".join(iter_body(stream, content_length, max_body_size))
+
+
+def decode_query_body(body: bytes) -> str:
+    """Decode the body of an ``application/graphql`` request."""
+    try:
+        return body.decode("utf8")
+    except UnicodeDecodeError:
+        raise HttpQueryError(400, "POST body sent invalid UTF-8.")
+
+
+def invalid_json() -> HttpQueryError:
+    return HttpQueryError(400, "POST body sent invalid JSON.")
+
+
+class _TextBuffer:
+    """Decoded text of a chunked body, read on demand."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Append the next chunk to the text and return whether there was one."""
+        if self.eof:
+            return False
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            chunk = b""
+        try:
+            decoded = self.decoder.decode(chunk, final=self.eof)
+        except UnicodeDecodeError:
+            raise invalid_json()
+        # Drop the text that has already been consumed.
+        self.text = self.text[self.pos:] + decoded
+        self.pos = 0
+        return True
+
+    def read_all(self) -> str:
+        while self.read_more():
+            pass
+        return self.text[self.pos:]
+
+    def skip_whitespace(self) -> Optional[str]:
+        """Move to the next non-whitespace character and return it."""
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _whitespace:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.read_more():
+                return None
+
+    def decode_value(self) -> Tuple[Any, int]:
+        """Decode the JSON value at the current position and return its size.
+
+        A value is only accepted if it is followed by another character or the
+        end of the body, so that a number is never cut off at a chunk boundary.
+        If the value is incomplete, at least as much text as is buffered is
+        read before trying again, to keep decoding large values linear.
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except (ValueError, RecursionError):
+                end = None
+            if end is not None and (end < len(self.text) or self.eof):
+                size = end - self.pos
+                self.pos = end
+                return value, size
+            if self.eof:
+                raise invalid_json()
+            target = 2 * (len(self.text) - self.pos) + 1
+            while len(self.text) - self.pos < target and self.read_more():
+                pass
+
+
+def _iter_array(
+    buffer: _TextBuffer, max_items: Optional[int]
+) -> Iterator[Tuple[Any, int]]:
+    if buffer.skip_whitespace() != "[":
+        raise invalid_json()
+    buffer.pos += 1
+    if buffer.skip_whitespace() == "]":
+        buffer.pos += 1
+    else:
+        count = 0
+        while True:
+            count += 1
+            if max_items is not None and count > max_items:
+                raise HttpQueryError(
+                    400,
+                    "Batch GraphQL requests may contain"
+                    f" at most {max_items} operations.",
+                )
+            yield buffer.decode_value()
+            separator = buffer.skip_whitespace()
+            buffer.pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise invalid_json()
+    if buffer.skip_whitespace() is not None:
+        raise invalid_json()
+
+
+def iter_json_array(
+    chunks: Iterable[bytes], max_items: Optional[int] = None
+) -> Iterator[Tuple[Any, int]]:
+    """Decode a JSON array from the given chunks and yield its items one by one.
+
+    Every item is yielded with the length of its JSON text. A batch error is
+    raised as soon as the array has more than ``max_items`` items.
+    """
+    return _iter_array(_TextBuffer(chunks), max_items)
+
+
+def load_json_body_stream(
+    chunks: Iterable[bytes],
+    batch_enabled: bool = False,
+    max_batch_size: Optional[int] = None,
+) -> Tuple[Union[Any, List[Any]], List[int]]:
+    """Decode a JSON request body from the given chunks.
+
+    Returns the decoded body and the length of the JSON text of each operation.
+    Batches are decoded while they are read, so that they are rejected before
+    the rest of the body is read if batching is disabled or if they contain too
+    many operations.
+    """
+    buffer = _TextBuffer(chunks)
+    if buffer.skip_whitespace() == "[":
+        if not batch_enabled:
+            raise HttpQueryError(400, "Batch GraphQL requests are not enabled.")
+        items = list(_iter_array(buffer, max_batch_size))
+        return [item for item, _size in items], [size for _item, size in items]
+    text = buffer.read_all()
+    try:
+        data = json.loads(text)
+    except Exception:
+        raise invalid_json()
+    return data, [len(text)]
+
+
+def check_params_size(
+    data: Any,
+    size: Optional[int],
+    max_query_length: Optional[int] = None,
+    max_variables_size: Optional[int] = None,
+) -> None:
+    """Check the length of the query and the size of the variables of a request.
+
+    ``size`` is the length of the JSON text the params were decoded from, if
+    known. The variables are only measured if the params could exceed the limit.
+    Values that cannot be encoded, like uploaded files, are measured as null,
+    which is the placeholder they were sent as.
+    """
+    if not hasattr(data, "get"):
+        return
+    query = data.get("query")
+    if (
+        max_query_length is not None
+        and isinstance(query, str)
+        and len(query) > max_query_length
+    ):
+        raise HttpQueryError(
+            400, f"The query is too long, the limit is {max_query_length} characters."
+        )
+    variables = data.get("variables")
+    if max_variables_size is None or not variables:
+        return
+    if size is not None and size <= max_variables_size:
+        return
+    if isinstance(variables, str):
+        variables_size = len(variables)
+    else:
+        variables_size = len(json.dumps(variables, default=lambda _value: None))
+    if variables_size > max_variables_size:
+        raise HttpQueryError(
+            400,
+            f"The variables are too large, the limit is {max_variables_size} bytes.",
+        )
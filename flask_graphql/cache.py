@@ -0,0 +1,100 @@
+"""Bounded in-process caches used by the GraphQL view."""
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from typing import Any, Hashable, Optional
+
+__all__ = ["CacheInfo", "LRUCache", "DocumentCache", "make_document_cache"]
+
+
+CacheInfo = namedtuple("CacheInfo", "hits misses evictions maxsize currsize")
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A thread-safe mapping that keeps at most ``maxsize`` entries.
+
+    The least recently used entry is evicted first. Hits, misses and evictions are
+    counted and can be read with ``info()``.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError(f"Cache maxsize must be positive. Received {maxsize!r}.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            self.hits, self.misses, self.evictions, self.maxsize, len(self._data)
+        )
+
+
+class DocumentCache(LRUCache):
+    """Cache of parsed and validated GraphQL documents.
+
+    Entries are keyed by the schema object, the query text and the validation
+    options, so one cache can safely be shared by views serving different schemas.
+    """
+
+    @staticmethod
+    def make_key(
+        schema: Any,
+        query: str,
+        validation_rules: Optional[Any] = None,
+        max_errors: Optional[int] = None,
+    ) -> Hashable:
+        rules = tuple(validation_rules) if validation_rules else None
+        return schema, query, rules, max_errors
+
+
+def make_document_cache(value: Any) -> Optional[DocumentCache]:
+    """Build a document cache from the ``document_cache`` view option.
+
+    The option can be a cache instance, True for a cache of the default size,
+    an integer for a cache of that size, or a false value to disable caching.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return DocumentCache()
+    if isinstance(value, int):
+        return DocumentCache(value)
+    return value
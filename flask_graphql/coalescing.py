@@ -0,0 +1,160 @@
+"""Coalescing of identical queries that are executed at the same time.
+
+When a query is already being executed with the same document, variables,
+operation name and vary value, later requests wait for its result instead of
+executing it again, so a burst of identical requests, e.g. after the response
+cache has been cleared, only executes the query once. Only queries are
+coalesced, never mutations.
+
+Waiting requests get the very same ``ExecutionResult``, which was computed with
+the root value and context of the request that executed it, so anything in the
+context that changes the result must be part of the vary value. Requests that
+have waited longer than the timeout of the ``SingleFlight`` execute the query
+themselves.
+"""
+import asyncio
+import json
+from inspect import isawaitable
+from threading import Event, Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from graphql_server import GraphQLParams
+
+__all__ = ["SingleFlight", "make_single_flight"]
+
+
+class _Call:
+    """An execution that other requests can wait for."""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def get(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.event.wait(timeout)
+
+    async def wait_async(self, timeout: Optional[float] = None) -> bool:
+        # The execution may run in another thread or on this event loop.
+        if self.event.is_set():
+            return True
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.event.wait, timeout
+        )
+
+
+class SingleFlight:
+    """Run at most one call per key at the same time and share its result.
+
+    This is safe to use from several threads and event loops. The number of
+    calls that got the result of another call is counted in ``coalesced``.
+    Calls wait at most ``timeout`` seconds for the result of another call, and
+    then run themselves, which is counted in ``timed_out``.
+    """
+
+    def __init__(self, timeout: Optional[float] = 10.0) -> None:
+        self.calls: Dict[Hashable, _Call] = {}
+        self.lock = Lock()
+        self.timeout = timeout
+        self.coalesced = 0
+        self.timed_out = 0
+
+    @staticmethod
+    def make_key(schema: Any, params: GraphQLParams, vary: Any = None) -> Hashable:
+        variables = (
+            json.dumps(params.variables, sort_keys=True, default=str)
+            if params.variables
+            else None
+        )
+        return schema, params.query, params.operation_name, variables, vary
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    def do(self, key: Hashable, fn: Callable[[], Any], run_sync: bool = True) -> Any:
+        """Return the result of ``fn``, or of the running call with the same key.
+
+        ``fn`` may return an awaitable, in which case it is awaited in a task
+        running on the current event loop, and the task is returned.
+        If ``run_sync`` is False, waiting for another call returns an awaitable as
+        well, so that the event loop is not blocked.
+        """
+        with self.lock:
+            running_call = self.calls.get(key)
+            if running_call is None:
+                call = self.calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if running_call is not None:
+            if not run_sync:
+                return self.wait_async(running_call, fn)
+            if running_call.wait(self.timeout):
+                return running_call.get()
+            self.count_timeout()
+            return fn()
+
+        try:
+            result = fn()
+        except BaseException as error:
+            self.finish(key, call, error=error)
+            raise
+        if isawaitable(result):
+            # Run the execution as a task, so that waiting calls are released
+            # even if the caller stops awaiting it.
+            return asyncio.ensure_future(self.finish_async(key, call, result))
+        self.finish(key, call, result)
+        return result
+
+    async def wait_async(self, call: _Call, fn: Callable[[], Any]) -> Any:
+        if await call.wait_async(self.timeout):
+            return call.get()
+        self.count_timeout()
+        result = fn()
+        if isawaitable(result):
+            result = await result
+        return result
+
+    def count_timeout(self) -> None:
+        with self.lock:
+            self.timed_out += 1
+
+    async def finish_async(self, key: Hashable, call: _Call, result: Awaitable) -> Any:
+        try:
+            value = await result
+        except BaseException as error:
+            self.finish(key, call, error=error)
+            raise
+        self.finish(key, call, value)
+        return value
+
+    def finish(
+        self,
+        key: Hashable,
+        call: _Call,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        call.result, call.error = result, error
+        with self.lock:
+            del self.calls[key]
+        call.event.set()
+
+
+def make_single_flight(value: Any) -> Optional[SingleFlight]:
+    """Build the coalescing layer from the ``coalesce_queries`` view option.
+
+    The option can be True, a ``SingleFlight`` instance to share it between
+    views or to set its timeout, or a false value to disable coalescing.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return SingleFlight()
+    return value
@@ -0,0 +1,256 @@
+"""Static depth and complexity analysis of GraphQL operations.
+
+The cost of an operation is computed from its document and the variables of
+the request, before any resolver runs, so that expensive queries can be
+rejected up front. Arguments given as variables are passed to cost functions
+with their coerced values, so the cost of operations with variables depends on
+the request.
+"""
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from graphql.error import GraphQLError
+from graphql.execution.values import get_variable_values
+from graphql.language import (DocumentNode, FieldNode, FragmentDefinitionNode,
+                              FragmentSpreadNode, InlineFragmentNode,
+                              OperationType, SelectionSetNode)
+from graphql.pyutils import Undefined
+from graphql.type import (GraphQLInterfaceType, GraphQLNamedType,
+                          GraphQLObjectType, GraphQLSchema, SchemaMetaFieldDef,
+                          TypeMetaFieldDef, get_named_type)
+from graphql.utilities import get_operation_ast, type_from_ast, value_from_ast
+
+__all__ = [
+    "QueryCost",
+    "QueryCostError",
+    "QueryTooComplex",
+    "QueryTooDeep",
+    "FieldCostFunction",
+    "default_field_cost",
+    "calculate_query_cost",
+    "check_query_cost",
+]
+
+QueryCost = namedtuple("QueryCost", "depth complexity")
+
+FieldCostFunction = Callable[[GraphQLNamedType, str, Dict[str, Any], int], int]
+
+# Introspection fields of the query type, which are not in its field map.
+META_FIELDS = {"__schema": SchemaMetaFieldDef, "__type": TypeMetaFieldDef}
+
+
+class QueryCostError(GraphQLError):
+    """Base class for errors reported when an operation is too expensive."""
+
+    code = "QUERY_COST_EXCEEDED"
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message, extensions={"code": self.code})
+
+
+class QueryTooDeep(QueryCostError):
+    code = "QUERY_TOO_DEEP"
+
+
+class QueryTooComplex(QueryCostError):
+    code = "QUERY_TOO_COMPLEX"
+
+
+def default_field_cost(
+    parent_type: GraphQLNamedType,
+    field_name: str,
+    args: Dict[str, Any],
+    child_complexity: int,
+) -> int:
+    """Return the cost of a field including the cost of its selections.
+
+    Every field costs 1, unless a different ``cost`` is set in the extensions of
+    the field definition.
+    """
+    field = parent_type.fields[field_name]  # type: ignore
+    cost = (field.extensions or {}).get("cost", 1)
+    return cost + child_complexity
+
+
+def calculate_query_cost(
+    schema: GraphQLSchema,
+    document: DocumentNode,
+    operation_name: Optional[str] = None,
+    field_cost: Optional[FieldCostFunction] = None,
+    variables: Optional[Dict[str, Any]] = None,
+) -> Optional[QueryCost]:
+    """Calculate the depth and complexity of an operation in a valid document.
+
+    The depth is the number of nested field levels. The complexity is the sum of
+    the costs of all fields, where ``field_cost`` is called with the parent type,
+    the field name, the arguments and the complexity of the selections of the
+    field, and returns the cost of the field including its selections. Arguments
+    given as variables get their value from ``variables``, coerced like for the
+    execution, or the default value of the variable. If the variables are
+    invalid, these arguments are left out, as the operation will not be
+    executed anyway. The selections of all fragments are counted, even if they
+    apply to different types. The ``__schema`` and ``__type`` fields cost 1 plus
+    the complexity of their selections, which are counted like other fields.
+    ``__typename`` is free.
+
+    Returns None if the operation cannot be found in the document.
+    """
+    operation = get_operation_ast(document, operation_name)
+    if operation is None:
+        return None
+    root_type = {
+        OperationType.QUERY: schema.query_type,
+        OperationType.MUTATION: schema.mutation_type,
+        OperationType.SUBSCRIPTION: schema.subscription_type,
+    }[operation.operation]
+    if root_type is None:
+        return None
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    coerced_variables: Dict[str, Any] = {}
+    if operation.variable_definitions:
+        coerced = get_variable_values(
+            schema,
+            operation.variable_definitions,
+            variables if isinstance(variables, dict) else {},
+        )
+        if isinstance(coerced, dict):
+            coerced_variables = coerced
+    calculator = _CostCalculator(
+        schema, fragments, field_cost or default_field_cost, coerced_variables
+    )
+    return calculator.selection_set_cost(root_type, operation.selection_set, set())
+
+
+def check_query_cost(
+    cost: Optional[QueryCost],
+    max_depth: Optional[int] = None,
+    max_complexity: Optional[int] = None,
+) -> List[GraphQLError]:
+    """Return the errors for the limits that are exceeded by the given cost."""
+    errors: List[GraphQLError] = []
+    if cost is None:
+        return errors
+    if max_depth is not None and cost.depth > max_depth:
+        errors.append(
+            QueryTooDeep(
+                f"Query depth of {cost.depth} exceeds"
+                f" the maximum allowed depth of {max_depth}."
+            )
+        )
+    if max_complexity is not None and cost.complexity > max_complexity:
+        errors.append(
+            QueryTooComplex(
+                f"Query complexity of {cost.complexity} exceeds"
+                f" the maximum allowed complexity of {max_complexity}."
+            )
+        )
+    return errors
+
+
+class _CostCalculator:
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        fragments: Dict[str, FragmentDefinitionNode],
+        field_cost: FieldCostFunction,
+        variables: Dict[str, Any],
+    ) -> None:
+        self.schema = schema
+        self.fragments = fragments
+        self.field_cost = field_cost
+        self.variables = variables
+        # Every fragment is analyzed once, however often it is spread.
+        self.fragment_costs: Dict[str, QueryCost] = {}
+
+    def selection_set_cost(
+        self,
+        parent_type: GraphQLNamedType,
+        selection_set: SelectionSetNode,
+        visited_fragments: Set[str],
+    ) -> QueryCost:
+        depth = complexity = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                cost = self.field_cost_of(parent_type, selection, visited_fragments)
+            elif isinstance(selection, InlineFragmentNode):
+                type_condition = selection.type_condition
+                fragment_type = (
+                    type_from_ast(self.schema, type_condition)
+                    if type_condition
+                    else parent_type
+                )
+                if fragment_type is None:
+                    continue
+                cost = self.selection_set_cost(
+                    fragment_type, selection.selection_set, visited_fragments
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                cost = self.fragment_cost(selection.name.value, visited_fragments)
+            else:  # pragma: no cover
+                continue
+            if cost is not None:
+                depth = max(depth, cost.depth)
+                complexity += cost.complexity
+        return QueryCost(depth, complexity)
+
+    def field_cost_of(
+        self,
+        parent_type: GraphQLNamedType,
+        node: FieldNode,
+        visited_fragments: Set[str],
+    ) -> Optional[QueryCost]:
+        field_name = node.name.value
+        if field_name == "__typename":
+            return None
+        meta_field = META_FIELDS.get(field_name)
+        if meta_field is not None:
+            child = self.selection_set_cost(
+                get_named_type(meta_field.type),
+                node.selection_set,  # type: ignore
+                visited_fragments,
+            )
+            return QueryCost(child.depth + 1, child.complexity + 1)
+        if not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            return None
+        field = parent_type.fields.get(field_name)
+        if field is None:
+            return None
+        child = QueryCost(0, 0)
+        if node.selection_set:
+            child = self.selection_set_cost(
+                get_named_type(field.type), node.selection_set, visited_fragments
+            )
+        arg_nodes = {arg.name.value: arg for arg in node.arguments or ()}
+        args = {}
+        for arg_name, arg in field.args.items():
+            arg_node = arg_nodes.get(arg_name)
+            if arg_node is None:
+                value = arg.default_value
+            else:
+                value = value_from_ast(arg_node.value, arg.type, self.variables)
+            if value is not Undefined:
+                args[arg_name] = value
+        complexity = self.field_cost(parent_type, field_name, args, child.complexity)
+        return QueryCost(child.depth + 1, complexity)
+
+    def fragment_cost(
+        self, name: str, visited_fragments: Set[str]
+    ) -> Optional[QueryCost]:
+        cost = self.fragment_costs.get(name)
+        if cost is not None:
+            return cost
+        fragment = self.fragments.get(name)
+        if fragment is None or name in visited_fragments:
+            return None
+        fragment_type = type_from_ast(self.schema, fragment.type_condition)
+        if fragment_type is None:
+            return None
+        cost = self.selection_set_cost(
+            fragment_type, fragment.selection_set, visited_fragments | {name}
+        )
+        self.fragment_costs[name] = cost
+        return cost
@@ -0,0 +1,195 @@
+"""Compression of responses negotiated with the ``Accept-Encoding`` header.
+
+``gzip`` is always available. ``br`` and ``zstd`` are offered when ``brotli``
+(or ``brotlicffi``) and ``zstandard`` can be imported. Streamed responses are
+compressed chunk by chunk and flushed after every chunk, so that clients can
+process each part as soon as it arrives.
+"""
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+__all__ = [
+    "Codec",
+    "GzipCodec",
+    "BrotliCodec",
+    "ZstdCodec",
+    "available_codecs",
+    "make_codecs",
+    "negotiate_codec",
+    "iter_compress",
+]
+
+
+class Codec:
+    """A content coding with one-shot and streaming compression."""
+
+    name = ""
+    default_level = 0
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        raise NotImplementedError
+
+    def compressor(self, level: Optional[int] = None) -> Any:
+        """Return an object with ``compress(chunk)`` and ``finish()`` methods.
+
+        ``compress`` returns all output for the chunk, flushed so that the
+        client can decompress it without waiting for more data.
+        """
+        raise NotImplementedError
+
+
+class _ZlibCompressor:
+    def __init__(self, level: int) -> None:
+        self.compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressobj.compress(chunk) + self.compressobj.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self.compressobj.flush()
+
+
+class GzipCodec(Codec):
+    name = "gzip"
+    default_level = 6
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        compressor = zlib.compressobj(
+            self.default_level if level is None else level,
+            zlib.DEFLATED,
+            16 + zlib.MAX_WBITS,
+        )
+        return compressor.compress(data) + compressor.flush()
+
+    def compressor(self, level: Optional[int] = None) -> _ZlibCompressor:
+        return _ZlibCompressor(self.default_level if level is None else level)
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        self.brotli_compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.brotli_compressor.process(chunk) + self.brotli_compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.brotli_compressor.finish()
+
+
+class BrotliCodec(Codec):
+    name = "br"
+    # The brotli default of 11 is too slow for compressing responses on the fly.
+    default_level = 4
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        return brotli.compress(
+            data, quality=self.default_level if level is None else level
+        )
+
+    def compressor(self, level: Optional[int] = None) -> _BrotliCompressor:
+        return _BrotliCompressor(self.default_level if level is None else level)
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int) -> None:
+        self.compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressobj.compress(chunk) + self.compressobj.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self.compressobj.flush()
+
+
+class ZstdCodec(Codec):
+    name = "zstd"
+    default_level = 3
+
+    def compress(self, data: bytes, level: Optional[int] = None) -> bytes:
+        level = self.default_level if level is None else level
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    def compressor(self, level: Optional[int] = None) -> _ZstdCompressor:
+        return _ZstdCompressor(self.default_level if level is None else level)
+
+
+def available_codecs() -> Dict[str, Codec]:
+    """Return the codecs that can be used, in the order of preference."""
+    codecs: List[Codec] = []
+    if brotli is not None:
+        codecs.append(BrotliCodec())
+    if zstandard is not None:
+        codecs.append(ZstdCodec())
+    codecs.append(GzipCodec())
+    return {codec.name: codec for codec in codecs}
+
+
+def make_codecs(value: Any) -> Optional[List[Codec]]:
+    """Build the list of codecs from the ``compression`` view option.
+
+    The option can be True to use all available codecs, a list of codec names or
+    ``Codec`` instances in the order of preference, or a false value to disable
+    compression. Names of codecs that are not available are ignored.
+    """
+    if value is None or value is False:
+        return None
+    available = available_codecs()
+    if value is True:
+        return list(available.values())
+    codecs = []
+    for codec in value:
+        if isinstance(codec, str):
+            codec = available.get(codec)
+        if codec is not None:
+            codecs.append(codec)
+    return codecs or None
+
+
+def negotiate_codec(codecs: Iterable[Codec], accept_encodings: Any) -> Optional[Codec]:
+    """Return the codec with the highest quality in the Accept-Encoding header.
+
+    Codecs with the same quality are chosen in the given order of preference.
+    """
+    best_codec, best_quality = None, 0.0
+    for codec in codecs:
+        quality = accept_encodings[codec.name]
+        if quality > best_quality:
+            best_codec, best_quality = codec, quality
+    return best_codec
+
+
+def iter_compress(
+    chunks: Iterable[bytes], codec: Codec, level: Optional[int] = None
+) -> Iterator[bytes]:
+    """Compress the given chunks of a streamed response one at a time."""
+    compressor = codec.compressor(level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                compressed = compressor.compress(chunk)
+                if compressed:
+                    yield compressed
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
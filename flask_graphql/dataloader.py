@@ -0,0 +1,172 @@
+"""Request-scoped data loaders that batch and cache ``load`` calls.
+
+Resolvers return ``loader.load(key)``. All keys requested while the current
+level of the query is being resolved are collected and passed to the batch
+load function in a single call, once the event loop gets control again.
+"""
+import asyncio
+from collections.abc import Mapping
+from inspect import isawaitable
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+__all__ = ["DataLoader", "DataLoaderRegistry"]
+
+
+class DataLoader:
+    """Batch and cache the loading of values by key.
+
+    ``batch_load_fn`` receives a list of keys and must return a list (or an
+    awaitable list) with one value per key, in the same order. A value may be an
+    exception instance, which is then raised for the corresponding key only.
+    Loaded values are cached for the lifetime of the loader, which is one request
+    when the loader is obtained from a ``DataLoaderRegistry``.
+    """
+
+    batch_load_fn: Optional[Callable[[List[Any]], Any]] = None
+    max_batch_size: Optional[int] = None
+    cache = True
+
+    def __init__(
+        self,
+        batch_load_fn: Optional[Callable[[List[Any]], Any]] = None,
+        max_batch_size: Optional[int] = None,
+        cache: Optional[bool] = None,
+        cache_key_fn: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        if batch_load_fn is not None:
+            self.batch_load_fn = batch_load_fn
+        if not callable(self.batch_load_fn):
+            raise TypeError(
+                "DataLoader must be created with a batch load function."
+                f" Received {self.batch_load_fn!r}."
+            )
+        if max_batch_size is not None:
+            self.max_batch_size = max_batch_size
+        if cache is not None:
+            self.cache = cache
+        self.cache_key_fn = cache_key_fn
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Any] = []
+
+    def load(self, key: Any) -> "asyncio.Future":
+        """Return a future for the value of the given key.
+
+        This must be called while an event loop is running.
+        """
+        if key is None:
+            raise TypeError("The key passed to DataLoader.load() must not be None.")
+        cache_key = self.cache_key_fn(key) if self.cache_key_fn else key
+        loop = asyncio.get_event_loop()
+        if self.cache:
+            future = self._cache.get(cache_key)
+            if future is not None:
+                if future.get_loop() is loop:
+                    return future
+                # Values loaded on another event loop, e.g. the one of the
+                # initial payload of a deferred query, are reused if available.
+                if future.done() and not future.cancelled():
+                    if future.exception() is None:
+                        reused = loop.create_future()
+                        reused.set_result(future.result())
+                        self._cache[cache_key] = reused
+                        return reused
+
+        future = loop.create_future()
+        if self.cache:
+            self._cache[cache_key] = future
+        self._queue.append((key, future))
+        if len(self._queue) == 1:
+            loop.call_soon(self._dispatch_queue, loop)
+        return future
+
+    def load_many(self, keys: Iterable[Any]) -> "asyncio.Future":
+        """Return a future for the list of values of the given keys."""
+        return asyncio.gather(*(self.load(key) for key in keys))
+
+    def prime(self, key: Any, value: Any) -> "DataLoader":
+        """Store the given value for the key unless the key is already cached."""
+        cache_key = self.cache_key_fn(key) if self.cache_key_fn else key
+        if self.cache and cache_key not in self._cache:
+            future = asyncio.get_event_loop().create_future()
+            if isinstance(value, Exception):
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+            self._cache[cache_key] = future
+        return self
+
+    def clear(self, key: Any) -> "DataLoader":
+        """Remove the given key from the cache."""
+        cache_key = self.cache_key_fn(key) if self.cache_key_fn else key
+        self._cache.pop(cache_key, None)
+        return self
+
+    def clear_all(self) -> "DataLoader":
+        """Remove all keys from the cache."""
+        self._cache.clear()
+        return self
+
+    def _dispatch_queue(self, loop: asyncio.AbstractEventLoop) -> None:
+        queue, self._queue = self._queue, []
+        size = self.max_batch_size or len(queue)
+        for start in range(0, len(queue), size):
+            loop.create_task(self._dispatch_batch(queue[start:start + size]))
+
+    async def _dispatch_batch(self, batch: List[Any]) -> None:
+        keys = [key for key, _future in batch]
+        try:
+            values = self.batch_load_fn(keys)  # type: ignore
+            if isawaitable(values):
+                values = await values
+            values = list(values)
+            if len(values) != len(keys):
+                raise TypeError(
+                    "DataLoader batch load function must return a list with one"
+                    f" value per key. Received {len(values)} values"
+                    f" for {len(keys)} keys."
+                )
+        except Exception as error:
+            for key, future in batch:
+                self.clear(key)
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (key, future), value in zip(batch, values):
+            if future.done():
+                continue
+            if isinstance(value, Exception):
+                self.clear(key)
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+
+class DataLoaderRegistry(Mapping):
+    """Mapping of data loaders that are created on first access.
+
+    Every entry of ``loaders`` is either a batch load function or a DataLoader
+    subclass. A new registry is put into the context of every request, so loaded
+    values are never shared between requests.
+    """
+
+    def __init__(self, loaders: Mapping):
+        self.loaders = loaders
+        self._instances: Dict[str, DataLoader] = {}
+
+    def __getitem__(self, name: str) -> DataLoader:
+        loader = self._instances.get(name)
+        if loader is None:
+            factory = self.loaders[name]
+            if isinstance(factory, type) and issubclass(factory, DataLoader):
+                loader = factory()
+            else:
+                loader = DataLoader(factory)
+            self._instances[name] = loader
+        return loader
+
+    def __iter__(self):
+        return iter(self.loaders)
+
+    def __len__(self) -> int:
+        return len(self.loaders)
@@ -0,0 +1,140 @@
+"""JSON encoding of responses, using the fastest encoder that is installed.
+
+``orjson`` and ``ujson`` are used when they can be imported, the standard
+library ``json`` module otherwise. All encoders return UTF-8 encoded bytes, so
+Flask can send them without encoding the response body again.
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+__all__ = [
+    "json_encode_bytes",
+    "stdlib_json_encode",
+    "orjson_encode",
+    "ujson_encode",
+    "get_json_encoder",
+    "iter_json_encode",
+]
+
+
+def stdlib_json_encode(data: Union[Dict, List], pretty: bool = False) -> bytes:
+    """Serialize the given data using the standard library ``json`` module."""
+    if not pretty:
+        encoded = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    else:
+        encoded = json.dumps(
+            data, indent=2, separators=(",", ": "), ensure_ascii=False
+        )
+    return encoded.encode("utf-8")
+
+
+def orjson_encode(data: Union[Dict, List], pretty: bool = False) -> bytes:
+    """Serialize the given data using ``orjson``.
+
+    Data that ``orjson`` cannot serialize, such as integers exceeding 64 bits, is
+    passed on to the standard library encoder.
+    """
+    try:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    except TypeError:
+        return stdlib_json_encode(data, pretty)
+
+
+def ujson_encode(data: Union[Dict, List], pretty: bool = False) -> bytes:
+    """Serialize the given data using ``ujson``."""
+    try:
+        encoded = ujson.dumps(
+            data,
+            ensure_ascii=False,
+            escape_forward_slashes=False,
+            indent=2 if pretty else 0,
+        )
+    except (TypeError, OverflowError):
+        return stdlib_json_encode(data, pretty)
+    return encoded.encode("utf-8")
+
+
+def get_json_encoder() -> Callable[..., bytes]:
+    """Return the fastest JSON encoder that is installed."""
+    if orjson is not None:
+        return orjson_encode
+    if ujson is not None:
+        return ujson_encode
+    return stdlib_json_encode
+
+
+_json_encode = get_json_encoder()
+
+
+def json_encode_bytes(data: Any, pretty: bool = False) -> bytes:
+    """Serialize the given data to UTF-8 encoded JSON bytes.
+
+    The fastest installed encoder is used, and the output is nicely formatted
+    if you set pretty=True.
+    """
+    return _json_encode(data, pretty)
+
+
+def iter_json_encode(
+    data: Any,
+    encode: Callable[[Any], Union[str, bytes]] = json_encode_bytes,
+    chunk_size: int = 65536,
+) -> Iterator[bytes]:
+    """Serialize the given data to JSON incrementally.
+
+    Objects and lists are walked item by item, down to the objects and lists
+    that only contain scalars, which are serialized in one piece with the given
+    encoder. Iterators are serialized as lists and consumed while encoding, so
+    e.g. the results of a batch can be produced one at a time. The output is
+    yielded in UTF-8 encoded chunks of about ``chunk_size`` bytes.
+    """
+    buffer: List[bytes] = []
+    buffered = 0
+    for part in _iter_json_parts(data, encode):
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= chunk_size:
+            yield b"".join(buffer)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _iter_json_parts(
+    data: Any, encode: Callable[[Any], Union[str, bytes]]
+) -> Iterator[bytes]:
+    if isinstance(data, dict) and not _is_flat(data.values()):
+        yield b"{"
+        for index, (key, value) in enumerate(data.items()):
+            separator = b"," if index else b""
+            yield separator + _as_bytes(encode(key)) + b":"
+            yield from _iter_json_parts(value, encode)
+        yield b"}"
+    elif isinstance(data, Iterator) or (isinstance(data, list) and not _is_flat(data)):
+        yield b"["
+        for index, item in enumerate(data):
+            if index:
+                yield b","
+            yield from _iter_json_parts(item, encode)
+        yield b"]"
+    else:
+        yield _as_bytes(encode(data))
+
+
+def _is_flat(values: Iterable[Any]) -> bool:
+    return not any(isinstance(value, (dict, list)) for value in values)
+
+
+def _as_bytes(encoded: Union[str, bytes]) -> bytes:
+    return encoded.encode("utf-8") if isinstance(encoded, str) else encoded
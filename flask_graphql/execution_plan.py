@@ -0,0 +1,474 @@
+"""Execution plans that keep the variable independent work of executing a document.
+
+Executing a document repeatedly walks the same selection sets: fields are
+collected and fragments are flattened for every object, field definitions and
+resolvers are looked up for every field, and literal arguments are coerced
+every time. An ``ExecutionPlan`` does this work once per document and keeps the
+results for all later executions, through an ``ExecutionContext`` subclass that
+is passed to ``graphql.execute``.
+
+Fields included or skipped depending on variables are collected once for every
+combination of the values of these variables. Coerced literal arguments are
+shared between executions, so resolvers must not modify them in place.
+
+The operations and fragments of the document are looked up once, and the
+variables of every operation are coerced according to a ``VariablesPlan``.
+"""
+from asyncio import gather
+from collections.abc import Mapping
+from typing import (Any, Callable, Dict, List, NamedTuple, Optional, Set,
+                    Tuple, Type)
+
+from graphql.error import located_error
+from graphql.execution import ExecutionContext, MiddlewareManager
+from graphql.execution.execute import (default_field_resolver,
+                                       default_type_resolver, get_field_def)
+from graphql.execution.values import get_argument_values
+from graphql.language import (DirectiveNode, DocumentNode, FieldNode,
+                              FragmentDefinitionNode, OperationDefinitionNode,
+                              SelectionSetNode, VariableNode, Visitor, visit)
+from graphql.pyutils import AwaitableOrValue, Path, Undefined, inspect
+from graphql.type import (GraphQLField, GraphQLObjectType, GraphQLOutputType,
+                          GraphQLSchema, get_nullable_type, is_leaf_type,
+                          is_non_null_type)
+
+from .variables import VariablesPlan
+
+__all__ = ["ExecutionPlan", "PlannedExecutionContext", "FieldPlan", "PLANS_SUPPORTED"]
+
+# The planned execution context overrides methods of the execution context of
+# graphql-core 3.1, which were replaced in graphql-core 3.2. Documents are
+# executed with the stock execution context where these are missing.
+PLANS_SUPPORTED = all(
+    hasattr(ExecutionContext, name) for name in ("collect_fields", "resolve_field")
+)
+
+
+def find_variables(node: Any) -> Set[str]:
+    """Return the names of all variables used within the given AST node."""
+    names: Set[str] = set()
+
+    class VariableVisitor(Visitor):
+        def enter_variable(self, node: VariableNode, *_args) -> None:
+            names.add(node.name.value)
+
+    visit(node, VariableVisitor())
+    return names
+
+
+class FieldPlan(NamedTuple):
+    """What is known about a field entry of a selection before executing it.
+
+    ``serialize`` is only set for leaf fields using the default resolver with
+    literal arguments, which can be resolved without building a resolve info.
+    """
+
+    response_name: str
+    field_nodes: List[FieldNode]
+    field_name: str
+    return_type: GraphQLOutputType
+    serialize: Optional[Callable[[Any], Any]]
+    non_null: bool
+
+
+class ExecutionPlan:
+    """Field collections, field definitions and arguments of a valid document."""
+
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode) -> None:
+        self.schema = schema
+        self.document = document
+        condition_variables: Set[str] = set()
+
+        class ConditionVisitor(Visitor):
+            def enter_directive(self, node: DirectiveNode, *_args) -> None:
+                if node.name.value in ("skip", "include"):
+                    condition_variables.update(find_variables(node))
+
+        visit(document, ConditionVisitor())
+        self.condition_variables = tuple(sorted(condition_variables))
+        self.fields: Dict[Tuple, Dict[str, List[FieldNode]]] = {}
+        self.field_defs: Dict[Tuple, Optional[Tuple[GraphQLField, Callable]]] = {}
+        self.arguments: Dict[int, Optional[Dict[str, Any]]] = {}
+        self.field_plans: Dict[Tuple, Tuple[Dict, List[FieldPlan]]] = {}
+        self.fragments: Dict[str, FragmentDefinitionNode] = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.operations: Dict[
+            Optional[str], Tuple[OperationDefinitionNode, VariablesPlan]
+        ] = {}
+        self.execution_context_class: Type[ExecutionContext] = (
+            type("PlannedExecutionContext", (PlannedExecutionContext,), {"plan": self})
+            if PLANS_SUPPORTED
+            else ExecutionContext
+        )
+
+    def get_operation(
+        self, operation_name: Optional[str]
+    ) -> Optional[Tuple[OperationDefinitionNode, VariablesPlan]]:
+        """Return the operation with the given name and the plan of its variables.
+
+        Returns None if the operation is unknown or ambiguous.
+        """
+        try:
+            return self.operations[operation_name]
+        except KeyError:
+            pass
+        operations = [
+            definition
+            for definition in self.document.definitions
+            if isinstance(definition, OperationDefinitionNode)
+            and (
+                operation_name is None
+                or (definition.name and definition.name.value == operation_name)
+            )
+        ]
+        if not operations or (operation_name is None and len(operations) > 1):
+            return None
+        # Like graphql-core, use the last operation with the given name.
+        operation = operations[-1]
+        entry = self.operations[operation_name] = (
+            operation,
+            VariablesPlan(self.schema, operation),
+        )
+        return entry
+
+    def get_field(
+        self,
+        parent_type: GraphQLObjectType,
+        field_name: str,
+        field_resolver: Callable,
+    ) -> Optional[Tuple[GraphQLField, Callable]]:
+        """Return the definition and the resolver of a field."""
+        key = (parent_type, field_name, field_resolver)
+        try:
+            return self.field_defs[key]
+        except KeyError:
+            field_def = get_field_def(self.schema, parent_type, field_name)
+            field = (
+                (field_def, field_def.resolve or field_resolver) if field_def else None
+            )
+            self.field_defs[key] = field
+            return field
+
+    def get_field_plans(
+        self,
+        parent_type: GraphQLObjectType,
+        fields: Dict[str, List[FieldNode]],
+        field_resolver: Callable,
+    ) -> List[FieldPlan]:
+        """Return the plans for the given collected fields of the parent type."""
+        key = (parent_type, id(fields), field_resolver)
+        entry = self.field_plans.get(key)
+        # The collected fields are kept by the plan, so their ids are not reused.
+        if entry is not None and entry[0] is fields:
+            return entry[1]
+        field_plans = []
+        for response_name, field_nodes in fields.items():
+            field_node = field_nodes[0]
+            field_name = field_node.name.value
+            field = self.get_field(parent_type, field_name, field_resolver)
+            if field is None:
+                continue
+            field_def, resolve_fn = field
+            return_type = field_def.type
+            named_type = get_nullable_type(return_type)
+            serialize = None
+            if (
+                resolve_fn is default_field_resolver
+                and is_leaf_type(named_type)
+                and not self.get_arguments(field_def, field_node, {})
+            ):
+                serialize = named_type.serialize
+            field_plans.append(
+                FieldPlan(
+                    response_name,
+                    field_nodes,
+                    field_name,
+                    return_type,
+                    serialize,
+                    is_non_null_type(return_type),
+                )
+            )
+        self.field_plans[key] = (fields, field_plans)
+        return field_plans
+
+    def get_arguments(
+        self, field_def: GraphQLField, node: FieldNode, variable_values: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Return the coerced arguments of a field node.
+
+        Arguments without variables are only coerced for the first execution.
+        """
+        key = id(node)
+        try:
+            args = self.arguments[key]
+        except KeyError:
+            if any(find_variables(arg) for arg in node.arguments or ()):
+                args = None
+            else:
+                args = get_argument_values(field_def, node)
+            self.arguments[key] = args
+        if args is None:
+            return get_argument_values(field_def, node, variable_values)
+        return args
+
+
+class PlannedExecutionContext(ExecutionContext):
+    """Execution context reusing the work stored in its execution plan.
+
+    Subclasses bound to a plan are available as ``plan.execution_context_class``.
+    Documents other than the one of the plan are executed as usual.
+    """
+
+    plan: ExecutionPlan
+
+    @classmethod
+    def build(
+        cls,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        root_value: Any = None,
+        context_value: Any = None,
+        raw_variable_values: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None,
+        field_resolver: Optional[Callable] = None,
+        type_resolver: Optional[Callable] = None,
+        middleware: Any = None,
+        is_awaitable: Optional[Callable[[Any], bool]] = None,
+    ):
+        """Build an execution context from the operation and variables plans.
+
+        Invalid requests are handled by graphql-core, which reports the errors.
+        """
+        args = (
+            schema,
+            document,
+            root_value,
+            context_value,
+            raw_variable_values,
+            operation_name,
+            field_resolver,
+            type_resolver,
+            middleware,
+            is_awaitable,
+        )
+        if schema is not cls.plan.schema or document is not cls.plan.document:
+            return ExecutionContext.build(*args)
+        entry = cls.plan.get_operation(operation_name)
+        if isinstance(middleware, (list, tuple)):
+            middleware = MiddlewareManager(*middleware)
+        elif middleware is not None and not isinstance(middleware, MiddlewareManager):
+            entry = None
+        if entry is None:
+            return super(PlannedExecutionContext, cls).build(*args)
+        operation, variables_plan = entry
+        variable_values = variables_plan.coerce(raw_variable_values)
+        if variable_values is None:
+            return super(PlannedExecutionContext, cls).build(*args)
+        return cls(
+            schema,
+            cls.plan.fragments,
+            root_value,
+            context_value,
+            operation,
+            variable_values,
+            field_resolver or default_field_resolver,
+            type_resolver or default_type_resolver,
+            [],
+            middleware,
+            is_awaitable,
+        )
+
+    def condition_values(self) -> Tuple:
+        variable_values = self.variable_values
+        return tuple(
+            variable_values.get(name) for name in self.plan.condition_variables
+        )
+
+    def collect_fields(
+        self,
+        runtime_type: GraphQLObjectType,
+        selection_set: SelectionSetNode,
+        fields: Dict[str, List[FieldNode]],
+        visited_fragment_names: Set[str],
+    ) -> Dict[str, List[FieldNode]]:
+        if fields or selection_set is not self.operation.selection_set:
+            return super().collect_fields(
+                runtime_type, selection_set, fields, visited_fragment_names
+            )
+        # Root fields of the operation
+        key = (runtime_type, id(selection_set), self.condition_values())
+        cached_fields = self.plan.fields.get(key)
+        if cached_fields is None:
+            cached_fields = super().collect_fields(
+                runtime_type, selection_set, {}, set()
+            )
+            self.plan.fields[key] = cached_fields
+        return cached_fields
+
+    def collect_subfields(
+        self, return_type: GraphQLObjectType, field_nodes: List[FieldNode]
+    ) -> Dict[str, List[FieldNode]]:
+        key = (return_type, *map(id, field_nodes), self.condition_values())
+        sub_field_nodes = self.plan.fields.get(key)
+        if sub_field_nodes is None:
+            sub_field_nodes = super().collect_subfields(return_type, field_nodes)
+            self.plan.fields[key] = sub_field_nodes
+        return sub_field_nodes
+
+    def execute_fields(
+        self,
+        parent_type: GraphQLObjectType,
+        source_value: Any,
+        path: Optional[Path],
+        fields: Dict[str, List[FieldNode]],
+    ) -> AwaitableOrValue[Dict[str, Any]]:
+        """Execute the given fields concurrently.
+
+        Leaf fields with the default resolver and without middleware are read
+        from the source and serialized directly, other fields are resolved with
+        ``resolve_field``.
+        """
+        field_plans = self.plan.get_field_plans(
+            parent_type, fields, self.field_resolver
+        )
+        fast = not self.middleware_manager
+        results = {}
+        is_awaitable = self.is_awaitable
+        awaitable_fields: List[str] = []
+        append_awaitable = awaitable_fields.append
+        for field_plan in field_plans:
+            response_name = field_plan.response_name
+            serialize = field_plan.serialize
+            if fast and serialize is not None:
+                if isinstance(source_value, Mapping):
+                    value = source_value.get(field_plan.field_name)
+                else:
+                    value = getattr(source_value, field_plan.field_name, None)
+                if not callable(value) and not is_awaitable(value):
+                    try:
+                        if isinstance(value, Exception):
+                            raise value
+                        if value is None:
+                            if field_plan.non_null:
+                                raise TypeError(
+                                    "Cannot return null for non-nullable field"
+                                    f" {parent_type.name}.{field_plan.field_name}."
+                                )
+                        else:
+                            serialized = serialize(value)
+                            if serialized is Undefined:
+                                leaf_type = get_nullable_type(field_plan.return_type)
+                                raise TypeError(
+                                    f"Expected a value of type '{inspect(leaf_type)}'"
+                                    f" but received: {inspect(value)}"
+                                )
+                            if serialized is None and field_plan.non_null:
+                                raise TypeError(
+                                    "Cannot return null for non-nullable field"
+                                    f" {parent_type.name}.{field_plan.field_name}."
+                                )
+                            value = serialized
+                    except Exception as raw_error:
+                        field_path = Path(path, response_name, parent_type.name)
+                        error = located_error(
+                            raw_error, field_plan.field_nodes, field_path.as_list()
+                        )
+                        self.handle_field_error(error, field_plan.return_type)
+                        value = None
+                    results[response_name] = value
+                    continue
+            field_path = Path(path, response_name, parent_type.name)
+            result = self.resolve_field(
+                parent_type, source_value, field_plan.field_nodes, field_path
+            )
+            if result is not Undefined:
+                results[response_name] = result
+                if is_awaitable(result):
+                    append_awaitable(response_name)
+
+        if not awaitable_fields:
+            return results
+
+        async def get_results() -> Dict[str, Any]:
+            results.update(
+                zip(
+                    awaitable_fields,
+                    await gather(*(results[field] for field in awaitable_fields)),
+                )
+            )
+            return results
+
+        return get_results()
+
+    def resolve_field(
+        self,
+        parent_type: GraphQLObjectType,
+        source: Any,
+        field_nodes: List[FieldNode],
+        path: Path,
+    ) -> AwaitableOrValue[Any]:
+        """Resolve the field on the given source object.
+
+        This works like ``ExecutionContext.resolve_field``, but takes the field
+        definition, the resolver and literal arguments from the plan.
+        """
+        field_node = field_nodes[0]
+        field = self.plan.get_field(
+            parent_type, field_node.name.value, self.field_resolver
+        )
+        if field is None:
+            return Undefined
+        field_def, resolve_fn = field
+
+        return_type = field_def.type
+        if self.middleware_manager:
+            resolve_fn = self.middleware_manager.get_field_resolver(resolve_fn)
+
+        info = self.build_resolve_info(field_def, field_nodes, parent_type, path)
+
+        try:
+            args = self.plan.get_arguments(field_def, field_node, self.variable_values)
+
+            result = resolve_fn(source, info, **args)
+
+            completed: AwaitableOrValue[Any]
+            if self.is_awaitable(result):
+                # noinspection PyShadowingNames
+                async def await_result() -> Any:
+                    try:
+                        completed = self.complete_value(
+                            return_type, field_nodes, info, path, await result
+                        )
+                        if self.is_awaitable(completed):
+                            return await completed
+                        return completed
+                    except Exception as raw_error:
+                        error = located_error(raw_error, field_nodes, path.as_list())
+                        self.handle_field_error(error, return_type)
+                        return None
+
+                return await_result()
+
+            completed = self.complete_value(
+                return_type, field_nodes, info, path, result
+            )
+            if self.is_awaitable(completed):
+                # noinspection PyShadowingNames
+                async def await_completed() -> Any:
+                    try:
+                        return await completed
+                    except Exception as raw_error:
+                        error = located_error(raw_error, field_nodes, path.as_list())
+                        self.handle_field_error(error, return_type)
+                        return None
+
+                return await_completed()
+
+            return completed
+        except Exception as raw_error:
+            error = located_error(raw_error, field_nodes, path.as_list())
+            self.handle_field_error(error, return_type)
+            return None
@@ -0,0 +1,210 @@
+"""GraphiQL page rendered once per view, and optional local GraphiQL assets.
+
+The template of the page only depends on the options of the view, so it is
+rendered the first time the page is requested, with placeholders for the query,
+variables, operation name and result of the request. Later requests only add
+their values into the rendered parts.
+
+By default, the page loads GraphiQL and its dependencies from the jsDelivr CDN.
+To use local copies instead, download them with
+``python -m flask_graphql.graphiql DIRECTORY``, serve the directory with
+``add_graphiql_assets_url_rule`` and pass its URL as ``graphiql_assets_url``.
+"""
+import argparse
+import json
+import os
+import re
+import uuid
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.request import urlopen
+
+from flask import render_template_string, send_from_directory
+from graphql_server.render_graphiql import (GRAPHIQL_TEMPLATE,
+                                            GRAPHIQL_VERSION, GraphiQLConfig,
+                                            GraphiQLData, GraphiQLOptions,
+                                            render_graphiql_sync)
+
+__all__ = [
+    "GraphiQLPage",
+    "CDN_URL",
+    "ASSETS_MAX_AGE",
+    "add_graphiql_assets_url_rule",
+    "download_graphiql_assets",
+    "get_asset_paths",
+]
+
+CDN_URL = "//cdn.jsdelivr.net/npm/"
+
+# Asset paths contain the version of their package, so they never change.
+ASSETS_MAX_AGE = 365 * 24 * 60 * 60
+
+REQUEST_VALUES = ("query", "variables", "operation_name", "result")
+
+_json_escapes = {"<": "\\u003c", ">": "\\u003e", "&": "\\u0026", "'": "\\u0027"}
+_json_escapes_re = re.compile("[<>&']")
+
+
+def htmlsafe_json_dumps(value: Any) -> str:
+    """Serialize a value to JSON that can be embedded in a script element."""
+    return _json_escapes_re.sub(
+        lambda match: _json_escapes[match.group()], json.dumps(value)
+    )
+
+
+class GraphiQLPage:
+    """The GraphiQL page of a view, rendered once with placeholders.
+
+    The page is rendered with the options of the view that requests it first,
+    so one instance must not be shared between views with different options.
+    """
+
+    def __init__(self) -> None:
+        self.parts: Optional[Tuple[str, List[Tuple[str, str]]]] = None
+        self.lock = Lock()
+
+    def render(
+        self,
+        view: Any,
+        query: Optional[str] = None,
+        variables: Optional[str] = None,
+        operation_name: Optional[str] = None,
+        result: Optional[str] = None,
+    ) -> str:
+        """Return the page with the values of the current request added in."""
+        parts = self.parts
+        if parts is None:
+            with self.lock:
+                if self.parts is None:
+                    self.parts = self.render_parts(view)
+                parts = self.parts
+        values = {
+            "query": query,
+            "variables": variables,
+            "operation_name": operation_name,
+            "result": result,
+        }
+        head, tail = parts
+        page = [head]
+        for name, part in tail:
+            page.append(htmlsafe_json_dumps(values[name]))
+            page.append(part)
+        return "".join(page)
+
+    @staticmethod
+    def render_parts(view: Any) -> Tuple[str, List[Tuple[str, str]]]:
+        """Render the template of the view and split it at the placeholders.
+
+        Returns the text before the first placeholder, and the name of every
+        placeholder together with the text following it.
+        """
+        token = uuid.uuid4().hex
+        placeholders = {name: f"__graphiql_{name}_{token}__" for name in REQUEST_VALUES}
+        template = view.graphiql_template or GRAPHIQL_TEMPLATE
+        if view.graphiql_assets_url:
+            template = template.replace(
+                CDN_URL, view.graphiql_assets_url.rstrip("/") + "/"
+            )
+        source = render_graphiql_sync(
+            data=GraphiQLData(
+                query=placeholders["query"],
+                variables=placeholders["variables"],
+                operation_name=placeholders["operation_name"],
+                result=placeholders["result"],
+                subscription_url=view.subscriptions,
+                headers=view.headers,
+            ),
+            config=GraphiQLConfig(
+                graphiql_version=view.graphiql_version,
+                graphiql_template=template,
+                graphiql_html_title=view.graphiql_html_title,
+                jinja_env=None,
+            ),
+            options=GraphiQLOptions(
+                default_query=view.default_query,
+                header_editor_enabled=view.header_editor_enabled,
+                should_persist_headers=view.should_persist_headers,
+            ),
+        )
+        # Custom templates may use Jinja features of the Flask environment.
+        source = render_template_string(source)
+        names = {placeholder: name for name, placeholder in placeholders.items()}
+        pieces = re.split(
+            '"(' + "|".join(map(re.escape, placeholders.values())) + ')"', source
+        )
+        tail = [
+            (names[placeholder], part)
+            for placeholder, part in zip(pieces[1::2], pieces[2::2])
+        ]
+        return pieces[0], tail
+
+
+def add_graphiql_assets_url_rule(
+    app: Any,
+    directory: str,
+    url_path: str = "/graphiql-assets",
+    endpoint: str = "graphiql_assets",
+    max_age: int = ASSETS_MAX_AGE,
+) -> None:
+    """Serve the GraphiQL assets in the given directory from an app or blueprint.
+
+    The assets are sent with a ``Cache-Control`` header allowing clients to
+    cache them for ``max_age`` seconds.
+    """
+    directory = os.path.abspath(directory)
+
+    def send_asset(path: str) -> Any:
+        response = send_from_directory(directory, path, max_age=max_age)
+        response.cache_control.immutable = True
+        return response
+
+    app.add_url_rule(
+        url_path.rstrip("/") + "/<path:path>", endpoint=endpoint, view_func=send_asset
+    )
+
+
+def get_asset_paths(
+    graphiql_version: Optional[str] = None, template: Optional[str] = None
+) -> List[str]:
+    """Return the paths of the assets the template loads from the CDN."""
+    template = (template or GRAPHIQL_TEMPLATE).replace(
+        "{{graphiql_version}}", graphiql_version or GRAPHIQL_VERSION
+    )
+    return re.findall(re.escape(CDN_URL) + r'([^"\s]+)', template)
+
+
+def download_graphiql_assets(
+    directory: str,
+    graphiql_version: Optional[str] = None,
+    template: Optional[str] = None,
+) -> Dict[str, str]:
+    """Download the assets of the template from the CDN into the directory.
+
+    Files keep their path on the CDN, so the directory can be served at the
+    URL passed as ``graphiql_assets_url``. Returns the written file paths.
+    """
+    written = {}
+    for path in get_asset_paths(graphiql_version, template):
+        target = os.path.join(directory, *path.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with urlopen("https:" + CDN_URL + path) as response:
+            content = response.read()
+        with open(target, "wb") as asset_file:
+            asset_file.write(content)
+        written[path] = target
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Download the GraphiQL assets for serving them locally."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--graphiql-version", default=GRAPHIQL_VERSION)
+    args = parser.parse_args()
+    for path in download_graphiql_assets(args.directory, args.graphiql_version):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,714 @@
+import json
+from functools import partial
+from hashlib import sha256
+from itertools import chain
+from time import perf_counter
+from typing import List
+
+from flask import Response, request, stream_with_context
+from graphql_server import GraphQLParams, HttpQueryError
+from graphql_server.flask.graphqlview import GraphQLView as BaseGraphQLView
+
+from graphql.error import GraphQLError
+
+from .admission import make_concurrency_limit
+from .batch import await_value, make_batch_executor
+from .body import (body_too_large, check_params_size, decode_query_body,
+                   iter_body, load_json_body_stream, read_body)
+from .cache import DocumentCache, make_document_cache
+from .coalescing import make_single_flight
+from .complexity import check_query_cost
+from .compression import iter_compress, make_codecs, negotiate_codec
+from .dataloader import DataLoaderRegistry
+from .encoding import iter_json_encode, json_encode_bytes
+from .graphiql import GraphiQLPage
+from .incremental import (MULTIPART_CONTENT_TYPE, IncrementalExecutionResult,
+                          execute_incrementally, iter_multipart_parts)
+from .introspection import (is_introspection_query, make_introspection_cache,
+                            may_be_introspection_query)
+from .persisted_queries import PersistedQueryError, make_persisted_query_store
+from .response_cache import (CacheScope, get_schema_fingerprint,
+                             make_response_cache)
+from .runtime import (encode_execution_results, execute_document,
+                      format_execution_result, get_cache_policy,
+                      get_graphql_params, get_status_code, parse_and_validate,
+                      run_http_query, run_http_query_async, run_until_complete)
+from .trusted_documents import make_trusted_documents
+from .uploads import DEFAULT_SPOOL_SIZE, load_multipart_request
+
+
+def has_errors(execution_results):
+    return any(
+        execution_result is None or execution_result.errors
+        for execution_result in execution_results
+    )
+
+
+class GraphQLView(BaseGraphQLView):
+    document_cache = None
+    persisted_queries = None
+    batch_executor = None
+    batch_concurrency = None
+    max_batch_size = None
+    loaders = None
+    stream_response = False
+    incremental_delivery = False
+    max_depth = None
+    max_complexity = None
+    field_cost = None
+    tracing = False
+    response_cache = None
+    response_cache_vary = None
+    response_cache_version = None
+    # Set per request when a single operation is looked up in the caches
+    # without a shared document cache, so its document is parsed once.
+    _request_document_cache = None
+    cache_default_max_age = 0
+    http_caching = False
+    cache_control = None
+    compression = None
+    compression_level = None
+    compression_min_size = 1024
+    compile_queries = False
+    metrics = None
+    max_body_size = None
+    max_query_length = None
+    max_variables_size = None
+    introspection_cache = None
+    graphiql_assets_url = None
+    graphiql_prefill_response = True
+    graphiql_page = None
+    trusted_documents = None
+    coalesce_queries = None
+    coalesce_vary = None
+    rate_limit = None
+    rate_limit_key = None
+    concurrency_limit = None
+    multipart_uploads = False
+    upload_spool_size = DEFAULT_SPOOL_SIZE
+    max_upload_file_size = None
+    max_upload_size = None
+
+    encode = staticmethod(json_encode_bytes)
+
+    # Flask creates a new view instance for every request, so options holding
+    # state that must outlive a single request are built once in as_view().
+    shared_options = {
+        "document_cache": make_document_cache,
+        "persisted_queries": make_persisted_query_store,
+        "batch_executor": make_batch_executor,
+        "response_cache": make_response_cache,
+        "compression": make_codecs,
+        "introspection_cache": make_introspection_cache,
+        "trusted_documents": make_trusted_documents,
+        "coalesce_queries": make_single_flight,
+        "concurrency_limit": make_concurrency_limit,
+    }
+
+    @classmethod
+    def as_view(cls, name, *class_args, **class_kwargs):
+        for option, make in cls.shared_options.items():
+            if option in class_kwargs:
+                class_kwargs[option] = make(class_kwargs[option])
+        class_kwargs.setdefault("graphiql_page", GraphiQLPage())
+        # Invalid trusted documents are reported when the view is created.
+        trusted_documents = class_kwargs.get("trusted_documents")
+        if trusted_documents is not None and class_kwargs.get("schema") is not None:
+            trusted_documents.prepare(class_kwargs["schema"])
+        return super(GraphQLView, cls).as_view(name, *class_args, **class_kwargs)
+
+    def get_document_cache(self):
+        # Trusted documents are parsed and validated in advance, so their cache
+        # holds every document the view may execute.
+        trusted_documents = self.get_trusted_documents()
+        if trusted_documents is not None:
+            return trusted_documents.prepare(self.schema)
+        if self.document_cache is not None:
+            return self.document_cache
+        return self._request_document_cache
+
+    def get_trusted_documents(self):
+        return self.trusted_documents
+
+    def get_single_flight(self):
+        # Without a vary function, the results of different clients would be
+        # shared. Uploads are not part of the key of coalesced queries.
+        if self.coalesce_vary is None or self.request_has_uploads():
+            return None
+        return self.coalesce_queries
+
+    def get_rate_limit_key(self):
+        """Return the identity of the client, by default its IP address."""
+        if self.rate_limit_key is not None:
+            return self.rate_limit_key()
+        return request.remote_addr
+
+    def get_persisted_queries(self):
+        return self.persisted_queries
+
+    def get_batch_executor(self):
+        return self.batch_executor
+
+    def get_response_cache(self):
+        return self.response_cache
+
+    def get_introspection_cache(self):
+        return self.introspection_cache
+
+    def get_context(self):
+        context = super(GraphQLView, self).get_context()
+        if self.loaders and "loaders" not in context:
+            context["loaders"] = DataLoaderRegistry(self.loaders)
+        return context
+
+    @staticmethod
+    def request_accepts_multipart():
+        return any(
+            value.split(";", 1)[0].strip() == "multipart/mixed"
+            for value, _quality in request.accept_mimetypes
+        )
+
+    def request_has_uploads(self):
+        return self.multipart_uploads and request.mimetype == "multipart/form-data"
+
+    def should_use_event_loop(self):
+        # Data loaders need an event loop to collect the keys they batch.
+        return bool(self.loaders)
+
+    def get_execute_fn(self, data, show_graphiql=False):
+        if (
+            self.incremental_delivery
+            and not show_graphiql
+            and not isinstance(data, list)
+            and self.request_accepts_multipart()
+        ):
+            return execute_incrementally
+        return None
+
+    def parse_body(self):
+        """Parse the request body, enforcing the configured size limits.
+
+        Without limits, the body is parsed like in ``graphql_server``. Otherwise
+        it is read in chunks from the input stream and rejected as soon as it
+        exceeds ``max_body_size``, and JSON batches are decoded one operation at
+        a time while they are read. If ``multipart_uploads`` is enabled,
+        multipart requests are parsed according to the multipart request spec.
+        ``application/graphql`` bodies are always decoded here, so that invalid
+        UTF-8 is rejected with a 400 error.
+        """
+        content_type = request.mimetype
+        if (
+            content_type != "application/graphql"
+            and not self.request_has_uploads()
+            and self.max_body_size is None
+            and self.max_query_length is None
+            and self.max_variables_size is None
+        ):
+            return super(GraphQLView, self).parse_body()
+
+        sizes = [None]
+        if content_type == "application/graphql":
+            body = read_body(request.stream, request.content_length, self.max_body_size)
+            data = {"query": decode_query_body(body)}
+        elif content_type == "application/json":
+            data, sizes = load_json_body_stream(
+                iter_body(request.stream, request.content_length, self.max_body_size),
+                self.batch,
+                self.max_batch_size,
+            )
+        elif content_type in (
+            "application/x-www-form-urlencoded",
+            "multipart/form-data",
+        ):
+            if self.max_body_size is not None:
+                # Form data is parsed by Werkzeug, which reads at most the
+                # announced Content-Length.
+                if request.content_length is None:
+                    raise HttpQueryError(411, "Form data requires a Content-Length.")
+                if request.content_length > self.max_body_size:
+                    raise body_too_large(self.max_body_size)
+            if self.request_has_uploads():
+                data = load_multipart_request(
+                    request._get_current_object(),
+                    self.upload_spool_size,
+                    self.max_upload_file_size,
+                    self.max_upload_size,
+                )
+                if isinstance(data, list):
+                    sizes = [None] * len(data)
+            else:
+                data = request.form
+        else:
+            data = {}
+
+        entries = data if isinstance(data, list) else [data]
+        for entry, size in zip(entries, sizes):
+            check_params_size(
+                entry, size, self.max_query_length, self.max_variables_size
+            )
+        check_params_size(
+            request.args, None, self.max_query_length, self.max_variables_size
+        )
+        return data
+
+    def get_query_options(self, data, show_graphiql=False):
+        return dict(
+            execute_fn=self.get_execute_fn(data, show_graphiql),
+            batch_enabled=self.batch,
+            catch=show_graphiql,
+            document_cache=self.get_document_cache(),
+            persisted_queries=self.get_persisted_queries(),
+            trusted_documents=self.get_trusted_documents(),
+            batch_executor=self.get_batch_executor(),
+            batch_concurrency=self.batch_concurrency,
+            max_batch_size=self.max_batch_size,
+            max_depth=self.max_depth,
+            max_complexity=self.max_complexity,
+            field_cost=self.field_cost,
+            tracing=self.tracing,
+            compile_queries=self.compile_queries,
+            metrics=self.metrics,
+            single_flight=self.get_single_flight(),
+            single_flight_vary=self.coalesce_vary() if self.coalesce_vary else None,
+            rate_limit=self.rate_limit,
+            rate_limit_key=self.get_rate_limit_key() if self.rate_limit else None,
+            concurrency_limit=self.concurrency_limit,
+        )
+
+    def get_request_params(self, data, show_graphiql=False):
+        """Return the GraphQL params of a single operation for the caches.
+
+        Returns None unless ``response_cache``, ``http_caching`` or
+        ``introspection_cache`` is enabled, and for batches. The params are
+        passed on to the execution, so they are resolved only once.
+        """
+        if (
+            show_graphiql
+            or isinstance(data, list)
+            or (
+                self.get_response_cache() is None
+                and not self.http_caching
+                and self.get_introspection_cache() is None
+            )
+        ):
+            return None
+        try:
+            params = get_graphql_params(
+                data,
+                request.args,
+                self.get_persisted_queries(),
+                self.get_trusted_documents(),
+            )
+        except PersistedQueryError:
+            return None
+        if not params.query:
+            return None
+        # The cache policy, the conditional response and the execution all
+        # need the validated document of the operation.
+        self._request_document_cache = DocumentCache(1)
+        return params
+
+    def get_cacheable_params(self, params, data, show_graphiql=False):
+        """Return the GraphQL params if the response may be cached at all.
+
+        Only complete JSON responses to single operations can be cached.
+        """
+        if (
+            params is None
+            or self.request_has_uploads()
+            or self.stream_response
+            or self.get_execute_fn(data, show_graphiql) is not None
+        ):
+            return None
+        return params
+
+    def get_introspection_response(self, params):
+        """Return the cached response if the request is an introspection query."""
+        cache = self.get_introspection_cache()
+        if (
+            cache is None
+            or params is None
+            or not may_be_introspection_query(params.query)
+        ):
+            return None
+        rejected_key = cache.make_rejected_key(self.schema, params)
+        if rejected_key in cache:
+            return None
+        pretty = bool(self.pretty or request.args.get("pretty"))
+        key = cache.make_key(self.schema, params, pretty)
+        entry = cache.get(key)
+        if entry is None:
+            entry = self.execute_introspection_query(params, pretty)
+            if entry is None:
+                cache.set(rejected_key, True)
+                return None
+            cache.set(key, entry)
+        body, complexity = entry
+        if self.rate_limit:
+            self.rate_limit.charge(self.get_rate_limit_key(), complexity)
+        return Response(body, content_type="application/json")
+
+    def execute_introspection_query(self, params, pretty=False):
+        """Execute and encode the response to an introspection query.
+
+        Returns the encoded response and the complexity of the query charged to
+        the rate limit. Returns None if the query is not a valid introspection
+        query, if it exceeds the cost limits, or if its result has errors, so
+        that it is handled like any other query.
+        """
+        cached = parse_and_validate(
+            self.schema, params.query, document_cache=self.get_document_cache()
+        )
+        if (
+            cached.document is None
+            or cached.errors
+            or not is_introspection_query(cached.document, params.operation_name)
+        ):
+            return None
+        cost = cached.get_cost(
+            self.schema, params.operation_name, self.field_cost, params.variables
+        )
+        if check_query_cost(cost, self.max_depth, self.max_complexity):
+            return None
+        result = execute_document(self.schema, cached.document, params)
+        if result.errors:
+            return None
+        body, _status_code = encode_execution_results(
+            [result],
+            format_error=self.format_error,
+            encode=partial(self.encode, pretty=pretty),  # noqa
+        )
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        return body, max(cost.complexity if cost else 0, 1)
+
+    def get_any_cached_response(self, cache_key, params):
+        """Return the response from the response or the introspection cache."""
+        cache = "response"
+        response = self.get_cached_response(cache_key)
+        if response is None:
+            cache = "introspection"
+            response = self.get_introspection_response(params)
+        if response is not None and self.metrics is not None:
+            self.metrics.observe_cached_response(cache)
+        return response
+
+    def get_cache_policy(self, params):
+        return get_cache_policy(
+            self.schema, params, self.cache_default_max_age, self.get_document_cache()
+        )
+
+    def get_response_cache_key(self, params):
+        """Return the key of the cached response for this request.
+
+        Returns None if the response to this request must not be cached.
+        """
+        if (
+            params is None
+            or self.get_response_cache() is None
+            # Cached responses would carry the trace of another request.
+            or (self.tracing and not callable(self.tracing))
+        ):
+            return None
+        vary = self.response_cache_vary() if self.response_cache_vary else None
+        key = [
+            request.path,
+            get_schema_fingerprint(self.schema),
+            self.response_cache_version,
+            params.query,
+            params.operation_name,
+            params.variables,
+            vary,
+            bool(self.pretty or request.args.get("pretty")),
+        ]
+        encoded_key = json.dumps(key, sort_keys=True, default=str)
+        return sha256(encoded_key.encode("utf-8")).hexdigest()
+
+    def get_cached_response(self, cache_key):
+        if cache_key is None:
+            return None
+        body = self.get_response_cache().get(cache_key)
+        if body is None:
+            return None
+        return Response(body, content_type="application/json")
+
+    def cache_response(self, cache_key, response, params):
+        """Store the response if all fields of the query allow caching it."""
+        if cache_key is None or response.status_code != 200:
+            return
+        policy = self.get_cache_policy(params)
+        if policy is None or policy.max_age <= 0:
+            return
+        if policy.scope == CacheScope.PRIVATE and self.response_cache_vary is None:
+            return
+        self.get_response_cache().set(cache_key, response.get_data(), policy.max_age)
+
+    def get_cache_control(self, params):
+        """Return the Cache-Control header for the response to a query.
+
+        Returns None if the operation is not a query.
+        """
+        policy = self.get_cache_policy(params)
+        if policy is None:
+            return None
+        if self.cache_control is not None:
+            return self.cache_control
+        if policy.max_age <= 0:
+            return "no-cache"
+        return f"{policy.scope.value.lower()}, max-age={policy.max_age}"
+
+    def make_conditional(self, response, params):
+        """Add HTTP caching headers to a successful response to a GET query.
+
+        Clients sending a matching If-None-Match header get a 304 response.
+        """
+        if (
+            not self.http_caching
+            or params is None
+            or request.method != "GET"
+            or response.status_code != 200
+        ):
+            return response
+        cache_control = self.get_cache_control(params)
+        if cache_control is None:
+            return response
+        response.headers["Cache-Control"] = cache_control
+        response.add_etag()
+        return response.make_conditional(request)
+
+    def dispatch_request(self):
+        try:
+            request_method = request.method.lower()
+            data = self.parse_body()
+
+            show_graphiql = request_method == "get" and self.should_display_graphiql()
+            if show_graphiql and not self.graphiql_prefill_response:
+                return self.compress_response(self.render_graphiql_without_result())
+
+            request_params = self.get_request_params(data, show_graphiql)
+            params = self.get_cacheable_params(request_params, data, show_graphiql)
+            cache_key = self.get_response_cache_key(params)
+            cached_response = self.get_any_cached_response(cache_key, request_params)
+            if cached_response is not None:
+                return self.compress_response(
+                    self.make_conditional(cached_response, params)
+                )
+
+            execute_options = dict(
+                query_data=request.args,
+                resolved_params=request_params and [request_params],
+                **self.get_query_options(data, show_graphiql),
+                root_value=self.get_root_value(),
+                context_value=self.get_context(),
+                middleware=self.get_middleware(),
+            )
+
+            all_params: List[GraphQLParams]
+            if self.should_use_event_loop():
+                del execute_options["batch_executor"]
+                execution_results, all_params = run_until_complete(
+                    run_http_query_async(
+                        self.schema, request_method, data, **execute_options
+                    )
+                )
+            else:
+                execution_results, all_params = run_http_query(
+                    self.schema, request_method, data, **execute_options
+                )
+            response = self.build_response(
+                execution_results, all_params, data, show_graphiql
+            )
+            if params is not None and not has_errors(execution_results):
+                self.cache_response(cache_key, response, params)
+                response = self.make_conditional(response, params)
+            return self.compress_response(response)
+
+        except HttpQueryError as e:
+            return self.build_error_response(e)
+
+    def compress_response(self, response):
+        """Compress the response with the best codec accepted by the client.
+
+        Only successful responses are compressed, and buffered ones only if they
+        are at least ``compression_min_size`` bytes long.
+        """
+        if not self.compression or not isinstance(response, Response):
+            return response
+        response.vary.add("Accept-Encoding")
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        if not response.is_streamed:
+            if len(response.get_data()) < self.compression_min_size:
+                return response
+        codec = negotiate_codec(self.compression, request.accept_encodings)
+        if codec is None:
+            return response
+
+        if response.is_streamed:
+            response.response = iter_compress(
+                response.response, codec, self.compression_level
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(
+                codec.compress(response.get_data(), self.compression_level)
+            )
+        response.headers["Content-Encoding"] = codec.name
+        # The compressed body is only semantically equivalent to the ETag source.
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def build_response(self, execution_results, all_params, data, show_graphiql):
+        pretty = self.pretty or show_graphiql or request.args.get("pretty")
+        is_batch = isinstance(data, list)
+        if self.metrics is not None and is_batch:
+            self.metrics.observe_batch_size(len(all_params))
+
+        if isinstance(execution_results[0], IncrementalExecutionResult):
+            if execution_results[0].has_next:
+                return self.build_multipart_response(execution_results[0])
+
+        if self.stream_response and not pretty:
+            return self.build_streamed_response(execution_results, all_params, data)
+
+        start = perf_counter()
+        result, status_code = encode_execution_results(
+            execution_results,
+            is_batch=is_batch,
+            format_error=self.format_error,
+            encode=partial(self.encode, pretty=pretty),  # noqa
+        )
+        if self.metrics is not None:
+            operation_name = None if is_batch else all_params[0].operation_name
+            self.metrics.observe_encoding(operation_name, perf_counter() - start)
+            self.metrics.observe_response_size(
+                len(result if isinstance(result, bytes) else result.encode("utf-8"))
+            )
+
+        if show_graphiql:
+            if isinstance(result, bytes):
+                result = result.decode("utf-8")
+            return self.render_graphiql(all_params[0], result)
+
+        return Response(result, status=status_code, content_type="application/json")
+
+    def render_graphiql(self, params, result=None):
+        """Return the GraphiQL page for the given params and encoded result."""
+        page = self.graphiql_page or GraphiQLPage()
+        html = page.render(
+            self,
+            query=params.query,
+            variables=params.variables,
+            operation_name=params.operation_name,
+            result=result,
+        )
+        return Response(html, content_type="text/html; charset=utf-8")
+
+    def render_graphiql_without_result(self):
+        """Return the GraphiQL page for the request without executing the query."""
+        params = GraphQLParams(
+            request.args.get("query"),
+            request.args.get("variables"),
+            request.args.get("operationName"),
+        )
+        return self.render_graphiql(params)
+
+    def build_streamed_response(self, execution_results, all_params, data):
+        # The results of a batch are formatted one at a time while streaming.
+        results = (
+            format_execution_result(execution_result, self.format_error).result
+            for execution_result in execution_results
+        )
+        is_batch = isinstance(data, list)
+        result = results if is_batch else next(results)
+        chunks = iter_json_encode(result, self.encode)
+        if self.metrics is not None:
+            operation_name = None if is_batch else all_params[0].operation_name
+            chunks = self.metrics.observe_stream(chunks, operation_name)
+        return Response(
+            stream_with_context(chunks),
+            status=max(map(get_status_code, execution_results)),
+            content_type="application/json",
+        )
+
+    def build_multipart_response(self, execution_result):
+        initial, _status_code = format_execution_result(
+            execution_result, self.format_error
+        )
+        initial["hasNext"] = True
+        payloads = chain(
+            [initial], execution_result.subsequent_payloads(self.format_error)
+        )
+        return Response(
+            stream_with_context(iter_multipart_parts(payloads, self.encode)),
+            content_type=MULTIPART_CONTENT_TYPE,
+        )
+
+    def build_error_response(self, error):
+        if self.metrics is not None:
+            self.metrics.observe_rejected_request(error.status_code)
+        parsed_error = GraphQLError(error.message)
+        return Response(
+            self.encode(dict(errors=[self.format_error(parsed_error)])),
+            status=error.status_code,
+            headers=error.headers,
+            content_type="application/json",
+        )
+
+
+class AsyncGraphQLView(GraphQLView):
+    """GraphQL view that awaits async resolvers on the event loop.
+
+    This requires Flask 2 with async support installed (``flask[async]``).
+    ``get_root_value`` and ``get_context`` may be overridden by coroutine functions,
+    and the operations of a batch run concurrently on the event loop.
+    """
+
+    def get_query_options(self, data, show_graphiql=False):
+        options = super(AsyncGraphQLView, self).get_query_options(data, show_graphiql)
+        del options["batch_executor"]
+        return options
+
+    async def dispatch_request(self):
+        try:
+            request_method = request.method.lower()
+            data = self.parse_body()
+
+            show_graphiql = request_method == "get" and self.should_display_graphiql()
+            if show_graphiql and not self.graphiql_prefill_response:
+                return self.compress_response(self.render_graphiql_without_result())
+
+            request_params = self.get_request_params(data, show_graphiql)
+            params = self.get_cacheable_params(request_params, data, show_graphiql)
+            cache_key = self.get_response_cache_key(params)
+            cached_response = self.get_any_cached_response(cache_key, request_params)
+            if cached_response is not None:
+                return self.compress_response(
+                    self.make_conditional(cached_response, params)
+                )
+
+            all_params: List[GraphQLParams]
+            execution_results, all_params = await run_http_query_async(
+                self.schema,
+                request_method,
+                data,
+                query_data=request.args,
+                resolved_params=request_params and [request_params],
+                **self.get_query_options(data, show_graphiql),
+                # Execute options
+                root_value=await await_value(self.get_root_value()),
+                context_value=await await_value(self.get_context()),
+                middleware=self.get_middleware(),
+            )
+            response = self.build_response(
+                execution_results, all_params, data, show_graphiql
+            )
+            if params is not None and not has_errors(execution_results):
+                self.cache_response(cache_key, response, params)
+                response = self.make_conditional(response, params)
+            return self.compress_response(response)
+
+        except HttpQueryError as e:
+            return self.build_error_response(e)
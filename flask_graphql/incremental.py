@@ -0,0 +1,383 @@
+"""Incremental delivery of ``@defer`` and ``@stream`` results over multipart/mixed.
+
+GraphQL-core 3.1 and 3.2 do not execute ``@defer`` and ``@stream`` themselves, so
+the operation is split instead: the initial payload is computed from the query
+without its deferred fragments, and every deferred fragment is then executed as
+a separate query that selects only the path leading to it. Its results are sent
+as subsequent payloads in the incremental delivery format understood by Apollo
+Client and Relay (``deferSpec=20220824``). Items of ``@stream`` fields beyond
+``initialCount`` are moved from the initial payload to a subsequent payload.
+
+Add ``GraphQLDeferDirective`` and ``GraphQLStreamDirective`` to the directives of
+your schema so that queries using them pass validation.
+"""
+from collections import namedtuple
+from inspect import isawaitable
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from graphql_server import GraphQLParams
+
+from graphql.error import GraphQLError
+from graphql.execution import ExecutionResult
+from graphql.execution.values import get_directive_values
+from graphql.language import (REMOVE, DirectiveLocation, DocumentNode,
+                              FieldNode, FragmentDefinitionNode,
+                              FragmentSpreadNode, InlineFragmentNode,
+                              OperationDefinitionNode, OperationType,
+                              SelectionSetNode, Visitor, visit)
+from graphql.pyutils import AwaitableOrValue
+from graphql.type import (GraphQLArgument, GraphQLBoolean, GraphQLDirective,
+                          GraphQLInt, GraphQLNonNull, GraphQLSchema,
+                          GraphQLString)
+from graphql.utilities import get_operation_ast
+
+from .runtime import execute_document, run_until_complete
+
+__all__ = [
+    "GraphQLDeferDirective",
+    "GraphQLStreamDirective",
+    "IncrementalExecutionResult",
+    "IncrementalPlan",
+    "plan_incremental_delivery",
+    "execute_incrementally",
+    "MULTIPART_CONTENT_TYPE",
+    "iter_multipart_parts",
+]
+
+
+GraphQLDeferDirective = GraphQLDirective(
+    name="defer",
+    locations=[DirectiveLocation.FRAGMENT_SPREAD, DirectiveLocation.INLINE_FRAGMENT],
+    args={
+        "if": GraphQLArgument(
+            GraphQLNonNull(GraphQLBoolean),
+            default_value=True,
+            description="Deferred when true or undefined.",
+        ),
+        "label": GraphQLArgument(GraphQLString, description="Unique name"),
+    },
+    description="Directs the executor to defer this fragment when the `if`"
+    " argument is true or undefined.",
+)
+
+GraphQLStreamDirective = GraphQLDirective(
+    name="stream",
+    locations=[DirectiveLocation.FIELD],
+    args={
+        "if": GraphQLArgument(
+            GraphQLNonNull(GraphQLBoolean),
+            default_value=True,
+            description="Stream when true or undefined.",
+        ),
+        "label": GraphQLArgument(GraphQLString, description="Unique name"),
+        "initialCount": GraphQLArgument(
+            GraphQLInt,
+            default_value=0,
+            description="Number of items to return immediately",
+        ),
+    },
+    description="Directs the executor to stream plural fields when the `if`"
+    " argument is true or undefined.",
+)
+
+MULTIPART_CONTENT_TYPE = 'multipart/mixed; boundary="-"; deferSpec=20220824'
+
+DeferredFragment = namedtuple("DeferredFragment", "label keys document")
+StreamedField = namedtuple("StreamedField", "label keys initial_count")
+
+
+class IncrementalPlan:
+    """How an operation is split into its initial and subsequent payloads."""
+
+    __slots__ = ("initial_document", "deferred", "streamed")
+
+    def __init__(
+        self,
+        initial_document: DocumentNode,
+        deferred: List[DeferredFragment],
+        streamed: List[StreamedField],
+    ) -> None:
+        self.initial_document = initial_document
+        self.deferred = deferred
+        self.streamed = streamed
+
+
+class IncrementalExecutionResult(ExecutionResult):
+    """The initial result of an operation whose other parts are sent later.
+
+    Iterating ``subsequent_payloads()`` executes the deferred fragments one after
+    another and yields the subsequent payloads, ready to be serialized.
+    """
+
+    def __init__(
+        self,
+        initial: ExecutionResult,
+        plan: IncrementalPlan,
+        execute_patch: Callable[[DocumentNode], ExecutionResult],
+    ) -> None:
+        super().__init__(data=initial.data, errors=initial.errors)
+        self.plan = plan
+        self.execute_patch = execute_patch
+        self.streamed_items = split_streamed_items(initial.data, plan.streamed)
+
+    @property
+    def has_next(self) -> bool:
+        return bool(self.streamed_items or self.plan.deferred)
+
+    def subsequent_payloads(
+        self, format_error: Callable[[GraphQLError], Dict]
+    ) -> Iterator[Dict[str, Any]]:
+        deferred = self.plan.deferred
+        if self.streamed_items:
+            yield {"incremental": self.streamed_items, "hasNext": bool(deferred)}
+        for index, fragment in enumerate(deferred):
+            result = self.execute_patch(fragment.document)
+            incremental = [
+                dict(data=data, path=path)
+                for path, data in find_objects(result.data, fragment.keys)
+                if data
+            ]
+            if result.errors:
+                errors = [format_error(error) for error in result.errors]
+                if incremental:
+                    incremental[0]["errors"] = errors
+                else:
+                    incremental.append(dict(data=None, path=[], errors=errors))
+            if fragment.label:
+                for item in incremental:
+                    item["label"] = fragment.label
+            yield {"incremental": incremental, "hasNext": index < len(deferred) - 1}
+
+
+def is_active(
+    directive: GraphQLDirective, node: Any, variables: Optional[Dict]
+) -> Optional[Dict[str, Any]]:
+    """Return the arguments of the directive if it is applied to the node."""
+    values = get_directive_values(directive, node, variables)
+    if values is None or not values.get("if", True):
+        return None
+    return values
+
+
+def plan_incremental_delivery(
+    document: DocumentNode,
+    operation_name: Optional[str] = None,
+    variables: Optional[Dict] = None,
+) -> Optional[IncrementalPlan]:
+    """Split the selected operation of a document for incremental delivery.
+
+    Returns None if the operation does not use ``@defer`` or ``@stream``, or if it
+    is not a query, since only queries can be safely executed more than once.
+    Fragments deferred inside other deferred fragments are sent together with
+    their parent.
+    """
+    operation = get_operation_ast(document, operation_name)
+    if not operation or operation.operation != OperationType.QUERY:
+        return None
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    deferred: List[DeferredFragment] = []
+    streamed: List[StreamedField] = []
+
+    def collect(selection_set: SelectionSetNode, steps: List[Any]) -> None:
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                stream = is_active(GraphQLStreamDirective, selection, variables)
+                if stream:
+                    streamed.append(
+                        StreamedField(
+                            stream.get("label"),
+                            response_keys(steps + [selection]),
+                            stream.get("initialCount") or 0,
+                        )
+                    )
+                if selection.selection_set:
+                    collect(selection.selection_set, steps + [selection])
+                continue
+
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = fragments[selection.name.value]
+                inline = InlineFragmentNode(
+                    type_condition=fragment.type_condition,
+                    directives=[],
+                    selection_set=fragment.selection_set,
+                )
+            else:
+                inline = InlineFragmentNode(
+                    type_condition=selection.type_condition,
+                    directives=[],
+                    selection_set=selection.selection_set,
+                )
+            defer = is_active(GraphQLDeferDirective, selection, variables)
+            if defer:
+                deferred.append(
+                    DeferredFragment(
+                        defer.get("label"),
+                        response_keys(steps),
+                        build_patch_document(document, operation, steps, inline),
+                    )
+                )
+            else:
+                collect(inline.selection_set, steps + [inline])
+
+    collect(operation.selection_set, [])
+    if not deferred and not streamed:
+        return None
+
+    class RemoveDeferred(Visitor):
+        def enter_inline_fragment(self, node, *_args):
+            if is_active(GraphQLDeferDirective, node, variables):
+                return REMOVE
+
+        enter_fragment_spread = enter_inline_fragment
+
+    initial_document = visit(document, RemoveDeferred())
+    return IncrementalPlan(initial_document, deferred, streamed)
+
+
+def response_keys(steps: List[Any]) -> List[str]:
+    """Get the response keys of the fields among the given selections."""
+    return [
+        (step.alias or step.name).value for step in steps if isinstance(step, FieldNode)
+    ]
+
+
+def build_patch_document(
+    document: DocumentNode,
+    operation: OperationDefinitionNode,
+    steps: List[Any],
+    fragment: InlineFragmentNode,
+) -> DocumentNode:
+    """Build a query that selects only the given fragment at the end of the steps."""
+    selection = fragment
+    for step in reversed(steps):
+        selection_set = SelectionSetNode(selections=[selection])
+        if isinstance(step, FieldNode):
+            selection = FieldNode(
+                alias=step.alias,
+                name=step.name,
+                arguments=step.arguments,
+                directives=step.directives,
+                selection_set=selection_set,
+            )
+        else:
+            selection = InlineFragmentNode(
+                type_condition=step.type_condition,
+                directives=step.directives,
+                selection_set=selection_set,
+            )
+    patch_operation = OperationDefinitionNode(
+        operation=operation.operation,
+        name=operation.name,
+        variable_definitions=operation.variable_definitions,
+        directives=operation.directives,
+        selection_set=SelectionSetNode(selections=[selection]),
+    )
+    return DocumentNode(
+        definitions=[patch_operation]
+        + [
+            definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        ]
+    )
+
+
+def find_objects(data: Any, keys: List[str]) -> Iterator[Any]:
+    """Yield (path, value) pairs for all values found by following the keys.
+
+    Lists on the way are entered item by item, and None values are skipped.
+    """
+
+    def walk(value: Any, index: int, path: List[Any]) -> Iterator[Any]:
+        if value is None:
+            return
+        if isinstance(value, list):
+            for position, item in enumerate(value):
+                yield from walk(item, index, path + [position])
+            return
+        if index == len(keys):
+            yield path, value
+            return
+        key = keys[index]
+        if isinstance(value, dict) and key in value:
+            yield from walk(value[key], index + 1, path + [key])
+
+    return walk(data, 0, [])
+
+
+def split_streamed_items(
+    data: Any, streamed: List[StreamedField]
+) -> List[Dict[str, Any]]:
+    """Truncate streamed lists to their initial count and return the other items."""
+    incremental = []
+    for field in streamed:
+        parent_keys, key = field.keys[:-1], field.keys[-1]
+        for path, parent in find_objects(data, parent_keys):
+            items = parent.get(key) if isinstance(parent, dict) else None
+            if not isinstance(items, list) or len(items) <= field.initial_count:
+                continue
+            initial_count = field.initial_count
+            parent[key] = items[:initial_count]
+            item = dict(
+                items=items[initial_count:],
+                path=path + [key, initial_count],
+            )
+            if field.label:
+                item["label"] = field.label
+            incremental.append(item)
+    return incremental
+
+
+def execute_incrementally(
+    schema: GraphQLSchema,
+    document: DocumentNode,
+    params: GraphQLParams,
+    run_sync: bool = True,
+    **kwargs,
+) -> AwaitableOrValue[ExecutionResult]:
+    """Execute a document, splitting off its deferred and streamed parts.
+
+    If the operation uses ``@defer`` or ``@stream``, an IncrementalExecutionResult
+    is returned, otherwise the document is executed as usual.
+    """
+    plan = plan_incremental_delivery(document, params.operation_name, params.variables)
+    if plan is None:
+        return execute_document(schema, document, params, run_sync, **kwargs)
+
+    def execute_patch(patch_document: DocumentNode) -> ExecutionResult:
+        result = execute_document(schema, patch_document, params, run_sync, **kwargs)
+        if isawaitable(result):
+            # Patches are executed while the response is sent, after the event
+            # loop of the request is gone, so they get a loop of their own.
+            result = run_until_complete(result)
+        return result
+
+    initial = execute_document(
+        schema, plan.initial_document, params, run_sync, **kwargs
+    )
+    if isawaitable(initial):
+
+        async def await_initial() -> ExecutionResult:
+            return IncrementalExecutionResult(await initial, plan, execute_patch)
+
+        return await_initial()
+    return IncrementalExecutionResult(initial, plan, execute_patch)
+
+
+def iter_multipart_parts(
+    payloads: Iterator[Dict[str, Any]], encode: Callable[[Any], Any]
+) -> Iterator[bytes]:
+    """Serialize the payloads as the parts of a multipart/mixed response body."""
+    for payload in payloads:
+        encoded = encode(payload)
+        if isinstance(encoded, str):
+            encoded = encoded.encode("utf-8")
+        yield (
+            b"\r\n---\r\nContent-Type: application/json; charset=utf-8\r\n\r\n"
+            + encoded
+        )
+    yield b"\r\n-----\r\n"
@@ -0,0 +1,126 @@
+"""Cache of encoded responses to introspection queries.
+
+GraphiQL, code generators and many clients send the full introspection query
+when they start. Its result only depends on the schema, so queries that select
+nothing but ``__schema``, ``__type`` and ``__typename`` on the root type are
+executed and encoded once, and the encoded response is reused for later
+requests. Entries are keyed by the schema object, so replacing the schema of a
+view never serves the result of the old one.
+
+Cached responses are served without running the middleware of the view. They
+are charged to the rate limit of the view like executed queries.
+"""
+import json
+import re
+from typing import Any, Dict, Hashable, Optional, Set
+
+from graphql_server import GraphQLParams
+
+from graphql.language import (DocumentNode, FieldNode, FragmentDefinitionNode,
+                              FragmentSpreadNode, InlineFragmentNode,
+                              OperationType, SelectionSetNode)
+from graphql.utilities import get_operation_ast
+
+from .cache import LRUCache
+
+__all__ = [
+    "IntrospectionCache",
+    "is_introspection_query",
+    "make_introspection_cache",
+]
+
+INTROSPECTION_FIELDS = frozenset(["__schema", "__type", "__typename"])
+
+INTROSPECTION_FIELD_PATTERN = re.compile(r"\b__(schema|type)\b")
+
+
+class IntrospectionCache(LRUCache):
+    """Cache of encoded responses to introspection queries.
+
+    Entries hold the encoded response and the complexity of the query. Queries
+    that turned out not to be introspection queries, or whose results have
+    errors, are remembered by their text alone, so they are only parsed once for
+    this check however their variables change.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        super().__init__(maxsize)
+
+    @staticmethod
+    def make_key(schema: Any, params: GraphQLParams, pretty: bool) -> Hashable:
+        variables = (
+            json.dumps(params.variables, sort_keys=True) if params.variables else None
+        )
+        return schema, params.query, params.operation_name, variables, pretty
+
+    @staticmethod
+    def make_rejected_key(schema: Any, params: GraphQLParams) -> Hashable:
+        return schema, params.query
+
+
+def make_introspection_cache(value: Any) -> Optional[IntrospectionCache]:
+    """Build an introspection cache from the ``introspection_cache`` view option.
+
+    The option can be a cache instance, True for a cache of the default size,
+    an integer for a cache of that size, or a false value to disable caching.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return IntrospectionCache()
+    if isinstance(value, int):
+        return IntrospectionCache(value)
+    return value
+
+
+def may_be_introspection_query(query: Optional[str]) -> bool:
+    """Check the query text before parsing it, without false negatives."""
+    return query is not None and INTROSPECTION_FIELD_PATTERN.search(query) is not None
+
+
+def is_introspection_query(
+    document: DocumentNode, operation_name: Optional[str] = None
+) -> bool:
+    """Check whether the operation only selects introspection fields on the root.
+
+    At least one ``__schema`` or ``__type`` field must be selected.
+    """
+    operation = get_operation_ast(document, operation_name)
+    if operation is None or operation.operation != OperationType.QUERY:
+        return False
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    names: Set[str] = set()
+    if not _collect_root_field_names(operation.selection_set, fragments, names, set()):
+        return False
+    return bool(names) and names <= INTROSPECTION_FIELDS and names != {"__typename"}
+
+
+def _collect_root_field_names(
+    selection_set: SelectionSetNode,
+    fragments: Dict[str, FragmentDefinitionNode],
+    names: Set[str],
+    visited: Set[str],
+) -> bool:
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            names.add(selection.name.value)
+        elif isinstance(selection, InlineFragmentNode):
+            if not _collect_root_field_names(
+                selection.selection_set, fragments, names, visited
+            ):
+                return False
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            if name in visited:
+                continue
+            visited.add(name)
+            fragment = fragments.get(name)
+            if fragment is None or not _collect_root_field_names(
+                fragment.selection_set, fragments, names, visited
+            ):
+                return False
+    return True
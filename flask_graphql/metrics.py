@@ -0,0 +1,366 @@
+"""Request metrics of GraphQL views in the Prometheus text format.
+
+A ``GraphQLMetrics`` instance is passed to ``GraphQLView`` with the ``metrics``
+option, and exposed by a ``MetricsView`` registered next to it. Operations are
+labeled with the ``operationName`` sent by the client if it names an operation
+of a valid document, or an empty string. At most ``max_operation_names``
+distinct names are used as labels, later ones are counted as ``other``.
+
+Every process keeps its own values. If a ``directory`` is given, each process
+also writes them to its own file in that directory at most every
+``flush_interval`` seconds, and the values of all files are added up when the
+metrics are rendered, so any worker can report the totals of all of them.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from time import monotonic, perf_counter
+from typing import (Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence,
+                    Set, Tuple)
+
+from flask import Response
+from flask.views import View
+
+from graphql.execution import ExecutionResult
+
+__all__ = [
+    "GraphQLMetrics",
+    "MetricsView",
+    "DURATION_BUCKETS",
+    "BATCH_SIZE_BUCKETS",
+    "RESPONSE_SIZE_BUCKETS",
+]
+
+DURATION_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+RESPONSE_SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The label of operations whose names exceed max_operation_names.
+OTHER_OPERATIONS = "other"
+
+# Phases recorded by the tracer of an operation, and their metric label.
+TRACED_PHASES = (
+    ("parsing", "parse"),
+    ("validation", "validate"),
+    ("execution", "execute"),
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+SampleKey = Tuple[str, Labels]
+
+
+class GraphQLMetrics:
+    """Thread-safe counters and histograms of the requests of GraphQL views."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        prefix: str = "graphql",
+        flush_interval: float = 1.0,
+        duration_buckets: Sequence[float] = DURATION_BUCKETS,
+        batch_size_buckets: Sequence[float] = BATCH_SIZE_BUCKETS,
+        response_size_buckets: Sequence[float] = RESPONSE_SIZE_BUCKETS,
+        max_operation_names: int = 100,
+    ) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_operation_names = max_operation_names
+        self.operation_names: Set[str] = set()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.families: Dict[str, Tuple[str, str, Sequence[float]]] = {}
+        self.requests = self.add_family(
+            f"{prefix}_requests_total", "counter", "GraphQL operations executed."
+        )
+        self.errors = self.add_family(
+            f"{prefix}_errors_total", "counter", "GraphQL operations with errors."
+        )
+        self.cached_responses = self.add_family(
+            f"{prefix}_cached_responses_total",
+            "counter",
+            "GraphQL responses served from a cache.",
+        )
+        self.rejected_requests = self.add_family(
+            f"{prefix}_rejected_requests_total",
+            "counter",
+            "GraphQL requests rejected with an HTTP error.",
+        )
+        self.durations = self.add_family(
+            f"{prefix}_phase_duration_seconds",
+            "histogram",
+            "Duration of the phases of GraphQL operations.",
+            duration_buckets,
+        )
+        self.batch_sizes = self.add_family(
+            f"{prefix}_batch_size",
+            "histogram",
+            "Number of operations in batch requests.",
+            batch_size_buckets,
+        )
+        self.response_sizes = self.add_family(
+            f"{prefix}_response_size_bytes",
+            "histogram",
+            "Size of GraphQL responses.",
+            response_size_buckets,
+        )
+        self.reset()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush)
+
+    def add_family(
+        self, name: str, kind: str, help_text: str, buckets: Sequence[float] = ()
+    ) -> str:
+        self.families[name] = (kind, help_text, tuple(sorted(buckets)))
+        return name
+
+    def reset(self) -> None:
+        """Forget the values of this process and start a new metrics file."""
+        self.pid = os.getpid()
+        self.values: Dict[SampleKey, float] = defaultdict(float)
+        self.file_name = f"metrics-{self.pid}-{uuid.uuid4().hex}.json"
+        self.flushed = monotonic()
+
+    def inc(self, name: str, labels: Labels, amount: float = 1) -> None:
+        with self.lock:
+            self.check_process()
+            self.values[(name, labels)] += amount
+        self.maybe_flush()
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        """Add a value to a histogram.
+
+        Only the bucket of the value is counted here, the cumulative counts of
+        the Prometheus format are computed when rendering.
+        """
+        buckets = self.families[name][2]
+        index = bisect_left(buckets, value)
+        bound = str(buckets[index]) if index < len(buckets) else "+Inf"
+        with self.lock:
+            self.check_process()
+            values = self.values
+            values[(f"{name}_bucket", labels + (("le", bound),))] += 1
+            values[(f"{name}_sum", labels)] += value
+            values[(f"{name}_count", labels)] += 1
+        self.maybe_flush()
+
+    def check_process(self) -> None:
+        # Values inherited from the parent of a forked worker belong to the parent.
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def get_operation_label(
+        self, operation_name: Optional[str], add: bool = True
+    ) -> str:
+        """Return the label of an operation name, adding it if there is room.
+
+        Names that are not known yet are labeled ``other`` when ``add`` is
+        false, or when ``max_operation_names`` names are known already.
+        """
+        if not operation_name:
+            return ""
+        with self.lock:
+            if operation_name in self.operation_names:
+                return operation_name
+            if add and len(self.operation_names) < self.max_operation_names:
+                self.operation_names.add(operation_name)
+                return operation_name
+        return OTHER_OPERATIONS
+
+    def observe_operation(
+        self,
+        operation_name: Optional[str],
+        phases: Mapping[str, Mapping[str, int]],
+        result: Optional[ExecutionResult],
+    ) -> None:
+        """Count an operation and record the durations of its traced phases.
+
+        The operation name must name an operation of a valid document, or be
+        None, since every name becomes a separate label.
+        """
+        labels = (("operation", self.get_operation_label(operation_name)),)
+        self.inc(self.requests, labels)
+        if result is None or result.errors:
+            self.inc(self.errors, labels)
+        for phase, label in TRACED_PHASES:
+            duration = phases.get(phase, {}).get("duration")
+            if duration is not None:
+                phase_labels = labels + (("phase", label),)
+                self.observe(self.durations, phase_labels, duration / 1e9)
+
+    def observe_encoding(self, operation_name: Optional[str], duration: float) -> None:
+        # Only names recorded for executed operations are used.
+        operation_label = self.get_operation_label(operation_name, add=False)
+        labels = (("operation", operation_label), ("phase", "encode"))
+        self.observe(self.durations, labels, duration)
+
+    def observe_stream(
+        self, chunks: Iterable[bytes], operation_name: Optional[str] = None
+    ) -> Iterator[bytes]:
+        """Yield the chunks of a streamed response and record it once it ends.
+
+        Only the time spent producing the chunks counts as encoding, not the
+        time spent sending them. Streams closed early are not recorded.
+        """
+        iterator = iter(chunks)
+        duration = 0.0
+        size = 0
+        while True:
+            start = perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                duration += perf_counter() - start
+            size += len(chunk)
+            yield chunk
+        self.observe_encoding(operation_name, duration)
+        self.observe_response_size(size)
+
+    def observe_cached_response(self, cache: str) -> None:
+        self.inc(self.cached_responses, (("cache", cache),))
+
+    def observe_rejected_request(self, status_code: int) -> None:
+        self.inc(self.rejected_requests, (("status", str(status_code)),))
+
+    def observe_batch_size(self, size: int) -> None:
+        self.observe(self.batch_sizes, (), size)
+
+    def observe_response_size(self, size: int) -> None:
+        self.observe(self.response_sizes, (), size)
+
+    def maybe_flush(self) -> None:
+        if (
+            self.directory is not None
+            and monotonic() - self.flushed >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the values of this process to its file in the shared directory."""
+        if self.directory is None:
+            return
+        # Only one thread writes at a time, so an older snapshot never wins.
+        with self.flush_lock:
+            with self.lock:
+                self.check_process()
+                self.flushed = monotonic()
+                samples = [
+                    [name, list(map(list, labels)), value]
+                    for (name, labels), value in self.values.items()
+                ]
+                file_name = self.file_name
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as metrics_file:
+                    json.dump(samples, metrics_file)
+                os.replace(temp_path, os.path.join(self.directory, file_name))
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    def collect(self) -> Dict[SampleKey, float]:
+        """Return the values of all processes sharing the directory."""
+        self.flush()
+        if self.directory is None:
+            with self.lock:
+                return dict(self.values)
+        totals: Dict[SampleKey, float] = defaultdict(float)
+        for entry in os.scandir(self.directory):
+            if not (entry.name.startswith("metrics-") and entry.name.endswith(".json")):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as metrics_file:
+                    samples = json.load(metrics_file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in samples:
+                totals[(name, tuple(map(tuple, labels)))] += value
+        return totals
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        values = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                lines.extend(render_histogram(name, buckets, values))
+            else:
+                for (sample_name, labels), value in sorted(values.items()):
+                    if sample_name == name:
+                        lines.append(format_sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+def render_histogram(
+    name: str, buckets: Sequence[float], values: Mapping[SampleKey, float]
+) -> Iterable[str]:
+    bucket_name = f"{name}_bucket"
+    all_labels = sorted(
+        {labels for (sample_name, labels) in values if sample_name == f"{name}_count"}
+    )
+    for labels in all_labels:
+        cumulative = 0.0
+        for bound in [*map(str, buckets), "+Inf"]:
+            cumulative += values.get((bucket_name, labels + (("le", bound),)), 0)
+            yield format_sample(bucket_name, labels + (("le", bound),), cumulative)
+        yield format_sample(f"{name}_sum", labels, values[(f"{name}_sum", labels)])
+        yield format_sample(f"{name}_count", labels, values[(f"{name}_count", labels)])
+
+
+def format_sample(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        label_text = ",".join(
+            f'{label}="{escape_label_value(label_value)}"'
+            for label, label_value in labels
+        )
+        name = f"{name}{{{label_text}}}"
+    if value == int(value):
+        return f"{name} {int(value)}"
+    return f"{name} {value!r}"
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsView(View):
+    """Expose the given ``GraphQLMetrics`` in the Prometheus text format."""
+
+    methods = ["GET"]
+    metrics: Optional[GraphQLMetrics] = None
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__()
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    def dispatch_request(self) -> Response:
+        if self.metrics is None:
+            raise TypeError("MetricsView requires the metrics option.")
+        return Response(self.metrics.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,188 @@
+"""Automatic persisted queries (APQ) following the Apollo protocol.
+
+Clients send ``extensions.persistedQuery.sha256Hash`` instead of the query text.
+If the hash is not known yet, a ``PersistedQueryNotFound`` error is returned, and
+the client retries with both the query and the hash, so the query can be stored.
+"""
+import json
+import os
+import re
+import tempfile
+from collections.abc import MutableMapping
+from hashlib import sha256
+from typing import Any, Dict, Optional
+
+from graphql_server import HttpQueryError
+
+from graphql.error import GraphQLError
+
+from .cache import LRUCache
+
+__all__ = [
+    "PersistedQueryError",
+    "PersistedQueryNotFound",
+    "PersistedQueryNotSupported",
+    "PersistedQueryStore",
+    "MemoryPersistedQueryStore",
+    "DictPersistedQueryStore",
+    "FilePersistedQueryStore",
+    "make_persisted_query_store",
+    "resolve_persisted_query",
+]
+
+
+class PersistedQueryError(GraphQLError):
+    """Base class for errors reported by the persisted query protocol."""
+
+    code = "PERSISTED_QUERY_ERROR"
+
+    def __init__(self, message: Optional[str] = None) -> None:
+        super().__init__(
+            message or self.__class__.__name__, extensions={"code": self.code}
+        )
+
+
+class PersistedQueryNotFound(PersistedQueryError):
+    code = "PERSISTED_QUERY_NOT_FOUND"
+
+
+class PersistedQueryNotSupported(PersistedQueryError):
+    code = "PERSISTED_QUERY_NOT_SUPPORTED"
+
+
+class PersistedQueryStore:
+    """Interface for storing query texts by their SHA-256 hash."""
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, sha256_hash: str, query: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryPersistedQueryStore(PersistedQueryStore):
+    """Keep the most recently used queries in the memory of the current process."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.cache = LRUCache(maxsize)
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        return self.cache.get(sha256_hash)
+
+    def set(self, sha256_hash: str, query: str) -> None:
+        self.cache.set(sha256_hash, query)
+
+
+class DictPersistedQueryStore(PersistedQueryStore):
+    """Store queries in any mutable mapping.
+
+    This can be used with a ``multiprocessing.Manager().dict()`` to share the
+    stored queries between several worker processes.
+    """
+
+    def __init__(self, mapping: Optional[MutableMapping] = None):
+        self.mapping = {} if mapping is None else mapping
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        return self.mapping.get(sha256_hash)
+
+    def set(self, sha256_hash: str, query: str) -> None:
+        self.mapping[sha256_hash] = query
+
+
+_sha256_hex = re.compile(r"^[0-9a-f]{64}$")
+
+
+class FilePersistedQueryStore(PersistedQueryStore):
+    """Store every query as a file named after its hash in the given directory.
+
+    Files are written atomically, so the directory can be shared by all worker
+    processes on the same host.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, sha256_hash: str) -> str:
+        return os.path.join(self.directory, f"{sha256_hash}.graphql")
+
+    def get(self, sha256_hash: str) -> Optional[str]:
+        if not _sha256_hex.match(sha256_hash):
+            return None
+        try:
+            with open(self.path(sha256_hash), encoding="utf-8") as query_file:
+                return query_file.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, sha256_hash: str, query: str) -> None:
+        if not _sha256_hex.match(sha256_hash):
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as query_file:
+                query_file.write(query)
+            os.replace(temp_path, self.path(sha256_hash))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def make_persisted_query_store(value: Any) -> Optional[PersistedQueryStore]:
+    """Build a persisted query store from the ``persisted_queries`` view option.
+
+    The option can be a store instance, True for an in-memory store, or a false
+    value to disable automatic persisted queries.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return MemoryPersistedQueryStore()
+    return value
+
+
+def load_json_extensions(extensions: Any) -> Optional[Dict]:
+    """Return the given request extensions as a dictionary."""
+    if extensions and isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except Exception:
+            raise HttpQueryError(400, "Extensions are invalid JSON.")
+    return extensions if isinstance(extensions, dict) else None
+
+
+def resolve_persisted_query(
+    query: Optional[str],
+    extensions: Any,
+    store: Optional[PersistedQueryStore] = None,
+) -> Optional[str]:
+    """Return the query text for a request that may use a persisted query.
+
+    If the request extensions contain a persisted query hash, the query is looked
+    up in the given store, or stored there if the request also contains the query.
+    """
+    persisted_query = (load_json_extensions(extensions) or {}).get("persistedQuery")
+    if not isinstance(persisted_query, dict):
+        return query
+    if store is None:
+        if query:
+            return query
+        raise PersistedQueryNotSupported()
+    if persisted_query.get("version", 1) != 1:
+        raise PersistedQueryError("Unsupported persisted query version.")
+
+    sha256_hash = persisted_query.get("sha256Hash")
+    if not isinstance(sha256_hash, str):
+        raise PersistedQueryError("Persisted query hash must be a string.")
+
+    if not query:
+        query = store.get(sha256_hash)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+
+    if sha256(query.encode("utf-8")).hexdigest() != sha256_hash:
+        raise PersistedQueryError("Provided sha does not match query.")
+    store.set(sha256_hash, query)
+    return query
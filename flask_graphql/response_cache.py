@@ -0,0 +1,229 @@
+"""Caching of complete responses to queries, limited by cache control hints.
+
+The maximum age of a response is derived from ``@cacheControl(maxAge:, scope:)``
+hints in the schema, following the rules of Apollo Server: every root field and
+every field returning an object, interface or union gets the hint of the field,
+the hint of its type, or the default maximum age otherwise. Fields returning
+scalars or enums do not restrict the age of their parent. The response may be
+cached for the smallest maximum age of all these fields.
+
+Hints can be set with the ``GraphQLCacheControlDirective`` in a schema defined in
+SDL, or in the ``cacheControl`` extension of fields and types, e.g.
+``GraphQLField(..., extensions={"cacheControl": {"maxAge": 30}})``.
+"""
+import os
+import tempfile
+import time
+from collections import namedtuple
+from enum import Enum
+from hashlib import sha256
+from typing import Any, Dict, Optional
+from weakref import WeakKeyDictionary
+
+from graphql.execution.values import get_directive_values
+from graphql.language import (DirectiveLocation, DocumentNode, FieldNode,
+                              Visitor, visit)
+from graphql.type import (GraphQLArgument, GraphQLDirective, GraphQLEnumType,
+                          GraphQLInt, GraphQLSchema, get_named_type,
+                          is_composite_type)
+from graphql.utilities import TypeInfo, TypeInfoVisitor, print_schema
+
+from .cache import LRUCache
+
+__all__ = [
+    "CacheScope",
+    "CachePolicy",
+    "GraphQLCacheControlDirective",
+    "calculate_cache_policy",
+    "ResponseCache",
+    "MemoryResponseCache",
+    "FileResponseCache",
+    "make_response_cache",
+]
+
+
+class CacheScope(Enum):
+    PUBLIC = "PUBLIC"
+    PRIVATE = "PRIVATE"
+
+
+CachePolicy = namedtuple("CachePolicy", "max_age scope")
+
+GraphQLCacheControlScope = GraphQLEnumType(
+    "CacheControlScope", {"PUBLIC": CacheScope.PUBLIC, "PRIVATE": CacheScope.PRIVATE}
+)
+
+GraphQLCacheControlDirective = GraphQLDirective(
+    name="cacheControl",
+    locations=[
+        DirectiveLocation.FIELD_DEFINITION,
+        DirectiveLocation.OBJECT,
+        DirectiveLocation.INTERFACE,
+        DirectiveLocation.UNION,
+    ],
+    args={
+        "maxAge": GraphQLArgument(GraphQLInt),
+        "scope": GraphQLArgument(GraphQLCacheControlScope),
+    },
+    description="Limits the time for which responses containing the field"
+    " or type may be cached.",
+)
+
+
+def get_cache_hint(definition: Any) -> Dict[str, Any]:
+    """Return the cache control hint of a field or type definition."""
+    hint = (definition.extensions or {}).get("cacheControl")
+    if hint is None and definition.ast_node is not None:
+        hint = get_directive_values(GraphQLCacheControlDirective, definition.ast_node)
+    if not hint:
+        return {}
+    scope = hint.get("scope")
+    if isinstance(scope, str):
+        scope = CacheScope(scope)
+    return {"maxAge": hint.get("maxAge"), "scope": scope}
+
+
+def calculate_cache_policy(
+    schema: GraphQLSchema, document: DocumentNode, default_max_age: int = 0
+) -> CachePolicy:
+    """Calculate the cache policy of all operations in the given valid document."""
+    root_types = {schema.query_type, schema.mutation_type, schema.subscription_type}
+    policy = {"max_age": None, "scope": CacheScope.PUBLIC}
+
+    class CacheHintVisitor(Visitor):
+        def enter_field(self, node: FieldNode, *_args) -> None:
+            parent_type = type_info.get_parent_type()
+            field = type_info.get_field_def()
+            if field is None or node.name.value.startswith("__"):
+                return
+            field_type = get_named_type(field.type)
+            hint = get_cache_hint(field)
+            if is_composite_type(field_type):
+                type_hint = get_cache_hint(field_type)
+                hint = dict(
+                    type_hint, **{k: v for k, v in hint.items() if v is not None}
+                )
+            max_age = hint.get("maxAge")
+            if max_age is None and (
+                parent_type in root_types or is_composite_type(field_type)
+            ):
+                max_age = default_max_age
+            if max_age is not None:
+                if policy["max_age"] is None or max_age < policy["max_age"]:
+                    policy["max_age"] = max_age
+            if hint.get("scope") == CacheScope.PRIVATE:
+                policy["scope"] = CacheScope.PRIVATE
+
+    type_info = TypeInfo(schema)
+    visit(document, TypeInfoVisitor(type_info, CacheHintVisitor()))
+    max_age = policy["max_age"]
+    return CachePolicy(default_max_age if max_age is None else max_age, policy["scope"])
+
+
+_schema_fingerprints: "WeakKeyDictionary[GraphQLSchema, str]" = WeakKeyDictionary()
+
+
+def get_schema_fingerprint(schema: GraphQLSchema) -> str:
+    """Return a hash of the printed schema, calculated once per schema object.
+
+    It is part of the key of cached responses, so a cache shared by several
+    views or processes never returns a response made for a different schema.
+    """
+    fingerprint = _schema_fingerprints.get(schema)
+    if fingerprint is None:
+        printed_schema = print_schema(schema).encode("utf-8")
+        fingerprint = _schema_fingerprints[schema] = sha256(printed_schema).hexdigest()
+    return fingerprint
+
+
+class ResponseCache:
+    """Interface for storing encoded responses for a limited time."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, body: bytes, max_age: int) -> None:
+        raise NotImplementedError
+
+
+class MemoryResponseCache(ResponseCache):
+    """Keep the most recently used responses in the memory of the current process.
+
+    Expired responses are removed when they are requested.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.cache = LRUCache(maxsize)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        expires, body = entry
+        if expires <= time.monotonic():
+            self.cache.delete(key)
+            return None
+        return body
+
+    def set(self, key: str, body: bytes, max_age: int) -> None:
+        self.cache.set(key, (time.monotonic() + max_age, body))
+
+
+class FileResponseCache(ResponseCache):
+    """Store every response as a file in the given directory.
+
+    The expiry time is stored in the first line of the file. Files are written
+    atomically, so the directory can be shared by all worker processes on the
+    same host. Expired files are removed when they are requested.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.response")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as response_file:
+                expires = float(response_file.readline())
+                if expires <= time.time():
+                    body = None
+                else:
+                    body = response_file.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        if body is None:
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+        return body
+
+    def set(self, key: str, body: bytes, max_age: int) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as response_file:
+                response_file.write(b"%f\n" % (time.time() + max_age))
+                response_file.write(body)
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def make_response_cache(value: Any) -> Optional[ResponseCache]:
+    """Build a response cache from the ``response_cache`` view option.
+
+    The option can be a cache instance, True for an in-memory cache of the
+    default size, an integer for an in-memory cache of that size, or a false
+    value to disable caching of responses.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return MemoryResponseCache()
+    if isinstance(value, int):
+        return MemoryResponseCache(value)
+    return value
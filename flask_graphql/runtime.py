@@ -0,0 +1,768 @@
+"""Request pipeline used by the Flask GraphQL view.
+
+This mirrors ``graphql_server.run_http_query`` but gives the view control over the
+individual steps, so that parsed documents can be reused between requests.
+"""
+import asyncio
+from collections import namedtuple
+from collections.abc import MutableMapping
+from concurrent.futures import Executor
+from functools import partial
+from inspect import isawaitable
+from typing import (TYPE_CHECKING, Any, Awaitable, Callable, Collection, Dict,
+                    List, Optional, Tuple, Type, TypeVar, Union)
+
+from graphql_server import (FormattedResult, GraphQLParams, GraphQLResponse,
+                            HttpQueryError, ServerResponse,
+                            assume_not_awaitable, format_error_default)
+from graphql_server import \
+    format_execution_result as format_result_without_extensions
+from graphql_server import json_encode, load_json_variables
+
+from graphql.error import GraphQLError
+from graphql.execution import ExecutionResult, execute
+from graphql.language import DocumentNode, OperationType, parse
+from graphql.pyutils import AwaitableOrValue
+from graphql.type import GraphQLSchema, validate_schema
+from graphql.utilities import get_operation_ast
+from graphql.validation import ASTValidationRule, validate
+
+from .admission import ConcurrencyLimit, RateLimit
+from .batch import await_value, execute_batch, execute_batch_async
+from .cache import DocumentCache
+from .coalescing import SingleFlight
+from .complexity import (FieldCostFunction, QueryCost, calculate_query_cost,
+                         check_query_cost)
+from .execution_plan import ExecutionPlan
+from .metrics import GraphQLMetrics
+from .persisted_queries import (PersistedQueryError, PersistedQueryStore,
+                                resolve_persisted_query)
+from .response_cache import CachePolicy, calculate_cache_policy
+from .tracing import Tracer, TraceSink, finish_trace
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .trusted_documents import TrustedDocuments
+
+__all__ = [
+    "CachedDocument",
+    "parse_and_validate",
+    "PreparedQuery",
+    "run_http_query",
+    "run_http_query_async",
+    "prepare_http_query",
+    "run_until_complete",
+    "get_graphql_params",
+    "get_response",
+    "execute_document",
+    "get_cache_policy",
+    "format_execution_result",
+    "get_status_code",
+    "encode_execution_results",
+]
+
+
+class _NoException(Exception):
+    """Private exception used when we don't want to catch any real exception."""
+
+
+class CachedDocument:
+    """A parsed document together with the errors found while validating it.
+
+    If the query could not be parsed, ``document`` is None and ``errors`` holds
+    the syntax error. The costs and cache policies of its operations and its
+    execution plan are calculated on demand and kept with the document. The
+    cost of an operation with variables depends on the request, so only the
+    cost for the most recent variables is kept.
+    """
+
+    __slots__ = (
+        "document",
+        "errors",
+        "costs",
+        "variables_cost",
+        "cache_policies",
+        "execution_plan",
+    )
+
+    def __init__(
+        self, document: Optional[DocumentNode], errors: List[GraphQLError]
+    ) -> None:
+        self.document = document
+        self.errors = errors
+        self.costs: Dict[Any, Optional[QueryCost]] = {}
+        self.variables_cost: Optional[Tuple[Any, Any, Optional[QueryCost]]] = None
+        self.cache_policies: Dict[int, CachePolicy] = {}
+        self.execution_plan: Optional[ExecutionPlan] = None
+
+    def get_cost(
+        self,
+        schema: GraphQLSchema,
+        operation_name: Optional[str] = None,
+        field_cost: Optional[FieldCostFunction] = None,
+        variables: Optional[Dict[str, Any]] = None,
+    ) -> Optional[QueryCost]:
+        """Return the cost of the given operation of the valid document."""
+        key = (operation_name, field_cost)
+        try:
+            return self.costs[key]
+        except KeyError:
+            pass
+        operation = get_operation_ast(self.document, operation_name)  # type: ignore
+        if operation is None or not operation.variable_definitions:
+            cost = calculate_query_cost(
+                schema, self.document, operation_name, field_cost  # type: ignore
+            )
+            self.costs[key] = cost
+            return cost
+        # The rate limit and the cost limits of a request use the same cost.
+        variables_cost = self.variables_cost
+        if (
+            variables_cost is not None
+            and variables_cost[0] == key
+            and variables_cost[1] is variables
+        ):
+            return variables_cost[2]
+        cost = calculate_query_cost(
+            schema,
+            self.document,  # type: ignore
+            operation_name,
+            field_cost,
+            variables,
+        )
+        self.variables_cost = (key, variables, cost)
+        return cost
+
+    def get_cache_policy(
+        self, schema: GraphQLSchema, default_max_age: int = 0
+    ) -> CachePolicy:
+        """Return the cache policy of the valid document."""
+        try:
+            return self.cache_policies[default_max_age]
+        except KeyError:
+            policy = calculate_cache_policy(
+                schema, self.document, default_max_age  # type: ignore
+            )
+            self.cache_policies[default_max_age] = policy
+            return policy
+
+    def get_execution_plan(self, schema: GraphQLSchema) -> ExecutionPlan:
+        """Return the execution plan of the valid document."""
+        plan = self.execution_plan
+        if plan is None or plan.schema is not schema:
+            plan = ExecutionPlan(schema, self.document)  # type: ignore
+            self.execution_plan = plan
+        return plan
+
+
+def parse_and_validate(
+    schema: GraphQLSchema,
+    query: str,
+    validation_rules: Optional[Collection[Type[ASTValidationRule]]] = None,
+    max_errors: Optional[int] = None,
+    document_cache: Optional[DocumentCache] = None,
+    tracer: Optional[Tracer] = None,
+) -> CachedDocument:
+    """Parse and validate the given query, reusing a cached result if possible.
+
+    Both the parsed document and its validation errors are stored in the given
+    document cache, so that repeated queries skip parsing and validation entirely.
+    The time spent in both phases is recorded by the given tracer.
+    """
+    if tracer is not None:
+        tracer.start_phase("parsing")
+    if document_cache is not None:
+        key = document_cache.make_key(schema, query, validation_rules, max_errors)
+        cached = document_cache.get(key)
+        if cached is not None:
+            if tracer is not None:
+                tracer.end_phase("parsing")
+                tracer.start_phase("validation")
+                tracer.end_phase("validation")
+            return cached
+
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        cached = CachedDocument(None, [e])
+    except Exception as e:
+        cached = CachedDocument(None, [GraphQLError(str(e), original_error=e)])
+    else:
+        if tracer is not None:
+            tracer.end_phase("parsing")
+            tracer.start_phase("validation")
+        errors = validate(
+            schema, document, rules=validation_rules, max_errors=max_errors
+        )
+        if tracer is not None:
+            tracer.end_phase("validation")
+        cached = CachedDocument(document, errors)
+
+    if document_cache is not None:
+        document_cache.set(key, cached)
+    return cached
+
+
+T = TypeVar("T")
+
+PreparedQuery = namedtuple("PreparedQuery", "calls params concurrent")
+
+
+def run_http_query(
+    schema: GraphQLSchema,
+    request_method: str,
+    data: Union[Dict, List[Dict]],
+    query_data: Optional[Dict] = None,
+    batch_enabled: bool = False,
+    catch: bool = False,
+    run_sync: bool = True,
+    batch_executor: Optional[Executor] = None,
+    batch_concurrency: Optional[int] = None,
+    concurrency_limit: Optional[ConcurrencyLimit] = None,
+    **execute_options,
+) -> GraphQLResponse:
+    """Execute GraphQL coming from an HTTP query against a given schema.
+
+    This works like ``graphql_server.run_http_query``, but additionally accepts the
+    options of ``prepare_http_query``.
+
+    If a batch_executor is given, the operations of a batch are executed
+    concurrently, with at most batch_concurrency of them running at the same time.
+    Batches containing a mutation are always executed one operation after another.
+    If a concurrency_limit is given, a slot is reserved while executing.
+
+    Returns a GraphQLResponse tuple with the list of ExecutionResults as first item
+    and the list of parameters that have been used for execution as second item.
+    """
+    calls, all_params, concurrent = prepare_http_query(
+        schema,
+        request_method,
+        data,
+        query_data,
+        batch_enabled,
+        catch,
+        run_sync,
+        **execute_options,
+    )
+
+    results: List[Optional[AwaitableOrValue[ExecutionResult]]]
+    if concurrency_limit is not None:
+        concurrency_limit.acquire()
+    try:
+        if concurrent and batch_executor is not None:
+            results = execute_batch(calls, batch_executor, batch_concurrency)
+        else:
+            results = [call() for call in calls]
+    finally:
+        if concurrency_limit is not None:
+            concurrency_limit.release()
+    return GraphQLResponse(results, all_params)
+
+
+async def run_http_query_async(
+    schema: GraphQLSchema,
+    request_method: str,
+    data: Union[Dict, List[Dict]],
+    query_data: Optional[Dict] = None,
+    batch_enabled: bool = False,
+    catch: bool = False,
+    batch_concurrency: Optional[int] = None,
+    concurrency_limit: Optional[ConcurrencyLimit] = None,
+    **execute_options,
+) -> GraphQLResponse:
+    """Execute GraphQL coming from an HTTP query, awaiting async resolvers.
+
+    The operations of a batch are executed concurrently on the running event loop,
+    with at most batch_concurrency of them running at the same time. Batches
+    containing a mutation are executed one operation after another. If a
+    concurrency_limit is given, a slot is reserved while executing, waiting for
+    it without blocking the event loop.
+
+    Returns a GraphQLResponse tuple with the list of ExecutionResults as first item
+    and the list of parameters that have been used for execution as second item.
+    """
+    calls, all_params, concurrent = prepare_http_query(
+        schema,
+        request_method,
+        data,
+        query_data,
+        batch_enabled,
+        catch,
+        False,
+        **execute_options,
+    )
+
+    results: List[Optional[ExecutionResult]]
+    if concurrency_limit is not None:
+        await concurrency_limit.acquire_async()
+    try:
+        if concurrent:
+            results = await execute_batch_async(calls, batch_concurrency)
+        else:
+            results = [await await_value(call()) for call in calls]
+    finally:
+        if concurrency_limit is not None:
+            concurrency_limit.release()
+    return GraphQLResponse(results, all_params)
+
+
+def run_until_complete(coroutine: Awaitable[T]) -> T:
+    """Run the given coroutine on a private event loop and return its result.
+
+    This lets the synchronous view execute operations that need an event loop,
+    e.g. because they use data loaders or async resolvers.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def prepare_http_query(
+    schema: GraphQLSchema,
+    request_method: str,
+    data: Union[Dict, List[Dict]],
+    query_data: Optional[Dict] = None,
+    batch_enabled: bool = False,
+    catch: bool = False,
+    run_sync: bool = True,
+    persisted_queries: Optional[PersistedQueryStore] = None,
+    max_batch_size: Optional[int] = None,
+    trusted_documents: Optional["TrustedDocuments"] = None,
+    rate_limit: Optional[RateLimit] = None,
+    rate_limit_key: Any = None,
+    resolved_params: Optional[List[GraphQLParams]] = None,
+    **execute_options,
+) -> PreparedQuery:
+    """Check an HTTP query and prepare the execution of its operations.
+
+    Besides the arguments of ``graphql_server.run_http_query``, this accepts a
+    ``document_cache`` that is used when parsing and validating, a store for
+    automatic persisted queries, the maximum number of operations in a batch and
+    a registry of trusted documents. Persisted query and trusted document errors
+    are reported as the result of the operation they belong to. If a rate_limit
+    is given, the cost of all operations is charged to the client identified by
+    rate_limit_key before any of them is executed. If the params of the
+    operations have been resolved before, they are passed as resolved_params
+    and not resolved from the data again.
+
+    Returns a PreparedQuery tuple with a list of callables that each return the
+    ExecutionResult of one operation, the list of parameters that will be used
+    for execution, and whether the operations may run concurrently.
+    """
+    if not isinstance(schema, GraphQLSchema):
+        raise TypeError(f"Expected a GraphQL schema, but received {schema!r}.")
+    if request_method not in ("get", "post"):
+        raise HttpQueryError(
+            405,
+            "GraphQL only supports GET and POST requests.",
+            headers={"Allow": "GET, POST"},
+        )
+    if catch:
+        catch_exc: Union[Type[HttpQueryError], Type[_NoException]] = HttpQueryError
+    else:
+        catch_exc = _NoException
+    is_batch = isinstance(data, list)
+
+    allow_only_query = request_method == "get"
+
+    if not is_batch:
+        if not isinstance(data, (dict, MutableMapping)):
+            raise HttpQueryError(
+                400, f"GraphQL params should be a dict. Received {data!r}."
+            )
+        data = [data]
+    elif not batch_enabled:
+        raise HttpQueryError(400, "Batch GraphQL requests are not enabled.")
+
+    if not data:
+        raise HttpQueryError(400, "Received an empty list in the batch request.")
+    if is_batch and max_batch_size is not None and len(data) > max_batch_size:
+        raise HttpQueryError(
+            400,
+            "Batch GraphQL requests may contain"
+            f" at most {max_batch_size} operations.",
+        )
+
+    extra_data: Dict[str, Any] = {}
+    # If is a batch request, we don't consume the data from the query
+    if not is_batch:
+        extra_data = query_data or {}
+
+    all_params: List[GraphQLParams] = []
+    params_errors: List[Optional[GraphQLError]] = []
+    if resolved_params is not None:
+        all_params.extend(resolved_params)
+        params_errors.extend([None] * len(resolved_params))
+        data = []
+    for entry in data:
+        try:
+            params = get_graphql_params(
+                entry, extra_data, persisted_queries, trusted_documents
+            )
+        except PersistedQueryError as error:
+            all_params.append(GraphQLParams(None, None, None))
+            params_errors.append(error)
+        else:
+            all_params.append(params)
+            params_errors.append(None)
+
+    concurrent = len(all_params) > 1
+    if concurrent or rate_limit is not None:
+        # Keep the documents parsed while looking at the operations for execution.
+        if execute_options.get("document_cache") is None:
+            execute_options["document_cache"] = DocumentCache(len(all_params))
+    if rate_limit is not None:
+        rate_limit.charge(
+            rate_limit_key, get_operations_cost(schema, all_params, execute_options)
+        )
+    if concurrent:
+        concurrent = not contains_mutation(schema, all_params, execute_options)
+
+    calls = [
+        partial(ExecutionResult, data=None, errors=[error])
+        if error
+        else partial(
+            get_response,
+            schema,
+            params,
+            catch_exc,
+            allow_only_query,
+            run_sync,
+            **execute_options,
+        )
+        for params, error in zip(all_params, params_errors)
+    ]
+    return PreparedQuery(calls, all_params, concurrent)
+
+
+def finish_operation(
+    tracer: Tracer,
+    result: AwaitableOrValue[ExecutionResult],
+    tracing: Union[bool, TraceSink] = False,
+    metrics: Optional[GraphQLMetrics] = None,
+    operation_name: Optional[str] = None,
+) -> AwaitableOrValue[ExecutionResult]:
+    """Finish the trace of an executed operation and report it.
+
+    The trace is handled by ``finish_trace`` if ``tracing`` is enabled, and the
+    operation is recorded in the given metrics.
+    """
+    if isawaitable(result):
+
+        async def await_result() -> ExecutionResult:
+            return finish_operation(  # type: ignore
+                tracer, await result, tracing, metrics, operation_name  # type: ignore
+            )
+
+        return await_result()
+
+    if tracing:
+        sink = tracing if callable(tracing) else None
+        result = finish_trace(tracer, result, sink)
+    else:
+        tracer.finish()
+    if metrics is not None:
+        metrics.observe_operation(operation_name, tracer.phases, result)  # type: ignore
+    return result
+
+
+def execute_document(
+    schema: GraphQLSchema,
+    document: DocumentNode,
+    params: GraphQLParams,
+    run_sync: bool = True,
+    **kwargs,
+) -> AwaitableOrValue[ExecutionResult]:
+    """Execute a validated document with the given GraphQL params."""
+    return execute(
+        schema,
+        document,
+        variable_values=params.variables,
+        operation_name=params.operation_name,
+        is_awaitable=assume_not_awaitable if run_sync else None,
+        **kwargs,
+    )
+
+
+def contains_mutation(
+    schema: GraphQLSchema, all_params: List[GraphQLParams], execute_options: Dict
+) -> bool:
+    """Check whether any of the given operations is a mutation.
+
+    The documents are parsed using the document cache from the execute options.
+    """
+    for params in all_params:
+        if not params.query:
+            continue
+        document = parse_and_validate(
+            schema,
+            params.query,
+            execute_options.get("validation_rules"),
+            execute_options.get("max_errors"),
+            execute_options.get("document_cache"),
+        ).document
+        operation_ast = document and get_operation_ast(
+            document, params.operation_name
+        )
+        if operation_ast and operation_ast.operation == OperationType.MUTATION:
+            return True
+    return False
+
+
+def is_query(document: DocumentNode, operation_name: Optional[str] = None) -> bool:
+    """Check whether the operation to execute is a query."""
+    operation_ast = get_operation_ast(document, operation_name)
+    return operation_ast is not None and operation_ast.operation == OperationType.QUERY
+
+
+def get_operations_cost(
+    schema: GraphQLSchema, all_params: List[GraphQLParams], execute_options: Dict
+) -> int:
+    """Return the total complexity of the given operations, at least 1 for each.
+
+    The documents are parsed using the document cache from the execute options.
+    """
+    total = 0
+    for params in all_params:
+        complexity = 0
+        if params.query:
+            cached = parse_and_validate(
+                schema,
+                params.query,
+                execute_options.get("validation_rules"),
+                execute_options.get("max_errors"),
+                execute_options.get("document_cache"),
+            )
+            if cached.document is not None and not cached.errors:
+                cost = cached.get_cost(
+                    schema,
+                    params.operation_name,
+                    execute_options.get("field_cost"),
+                    params.variables,
+                )
+                complexity = cost.complexity if cost else 0
+        total += max(complexity, 1)
+    return total
+
+
+def get_cache_policy(
+    schema: GraphQLSchema,
+    params: GraphQLParams,
+    default_max_age: int = 0,
+    document_cache: Optional[DocumentCache] = None,
+) -> Optional[CachePolicy]:
+    """Return the cache policy for the response to the given query.
+
+    Returns None if the response must not be cached, because the document is not
+    valid or the operation is not a query.
+    """
+    if not params.query:
+        return None
+    cached = parse_and_validate(schema, params.query, document_cache=document_cache)
+    if cached.document is None or cached.errors:
+        return None
+    operation_ast = get_operation_ast(cached.document, params.operation_name)
+    if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+        return None
+    return cached.get_cache_policy(schema, default_max_age)
+
+
+def get_graphql_params(
+    data: Dict,
+    query_data: Dict,
+    persisted_queries: Optional[PersistedQueryStore] = None,
+    trusted_documents: Optional["TrustedDocuments"] = None,
+) -> GraphQLParams:
+    """Fetch GraphQL query, variables and operation name parameters from given data.
+
+    Params from the request body take precedence over those from the query string.
+    If the request refers to a persisted query, the query text is resolved using
+    the given store. If trusted documents are given, the query text is always
+    taken from the registry, and persisted queries are not used.
+    """
+    query = data.get("query") or query_data.get("query")
+    variables = data.get("variables") or query_data.get("variables")
+    operation_name = data.get("operationName") or query_data.get("operationName")
+    extensions = data.get("extensions") or query_data.get("extensions")
+    if trusted_documents is not None:
+        document_id = data.get("documentId") or query_data.get("documentId")
+        query = trusted_documents.resolve(query, document_id, extensions)
+    elif extensions:
+        query = resolve_persisted_query(query, extensions, persisted_queries)
+
+    return GraphQLParams(query, load_json_variables(variables), operation_name)
+
+
+def get_response(
+    schema: GraphQLSchema,
+    params: GraphQLParams,
+    catch_exc: Type[BaseException],
+    allow_only_query: bool = False,
+    run_sync: bool = True,
+    validation_rules: Optional[Collection[Type[ASTValidationRule]]] = None,
+    max_errors: Optional[int] = None,
+    document_cache: Optional[DocumentCache] = None,
+    execute_fn: Optional[Callable[..., AwaitableOrValue[ExecutionResult]]] = None,
+    max_depth: Optional[int] = None,
+    max_complexity: Optional[int] = None,
+    field_cost: Optional[FieldCostFunction] = None,
+    tracing: Union[bool, TraceSink] = False,
+    compile_queries: bool = False,
+    metrics: Optional[GraphQLMetrics] = None,
+    single_flight: Optional[SingleFlight] = None,
+    single_flight_vary: Any = None,
+    **kwargs,
+) -> Optional[AwaitableOrValue[ExecutionResult]]:
+    """Get an individual execution result as response, with option to catch errors.
+
+    The query is parsed and validated through ``parse_and_validate``, then checked
+    against ``allow_only_query``, ``max_depth`` and ``max_complexity``, and executed
+    with ``execute_fn``, which defaults to ``execute_document``. All errors that
+    belong to the exception class specified by catch_exc are caught and turned
+    into None.
+
+    If ``tracing`` is enabled, the timing of the operation is added to the
+    extensions of the result, or passed to ``tracing`` if it is a callable.
+    If ``compile_queries`` is set, the document is executed using the execution
+    plan kept with the parsed document. Operations that reach parsing are counted
+    in the given ``metrics``, together with the duration of their phases, and
+    labeled with their name if the document is valid and contains it.
+    If a ``single_flight`` is given, queries that are already being executed with
+    the same params and ``single_flight_vary`` value wait for the running
+    execution and share its result. This is skipped for custom ``execute_fn``
+    functions and if ``tracing`` is enabled.
+    """
+    if execute_fn is not None or tracing:
+        single_flight = None
+    if execute_fn is None:
+        execute_fn = execute_document
+    tracer = Tracer() if tracing or metrics is not None else None
+    # Only names of operations in valid documents are recorded in the metrics.
+    operation_name: Optional[str] = None
+
+    def failed(errors: List[GraphQLError]) -> ExecutionResult:
+        result = ExecutionResult(data=None, errors=errors)
+        if tracer is not None and metrics is not None:
+            tracer.finish()
+            metrics.observe_operation(operation_name, tracer.phases, result)
+        return result
+
+    # noinspection PyBroadException
+    try:
+        if not params.query:
+            raise HttpQueryError(400, "Must provide query string.")
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return failed(schema_validation_errors)
+
+        cached = parse_and_validate(
+            schema, params.query, validation_rules, max_errors, document_cache, tracer
+        )
+        document = cached.document
+        if document is None:
+            return failed(cached.errors)
+
+        if allow_only_query:
+            operation_ast = get_operation_ast(document, params.operation_name)
+            if operation_ast:
+                operation = operation_ast.operation.value
+                if operation != OperationType.QUERY.value:
+                    raise HttpQueryError(
+                        405,
+                        f"Can only perform a {operation} operation"
+                        " from a POST request.",
+                        headers={"Allow": "POST"},
+                    )
+
+        if cached.errors:
+            return failed(cached.errors)
+
+        if metrics is not None and params.operation_name:
+            if get_operation_ast(document, params.operation_name) is not None:
+                operation_name = params.operation_name
+
+        if max_depth is not None or max_complexity is not None:
+            cost = cached.get_cost(
+                schema, params.operation_name, field_cost, params.variables
+            )
+            cost_errors = check_query_cost(cost, max_depth, max_complexity)
+            if cost_errors:
+                return failed(cost_errors)
+
+        if compile_queries:
+            plan = cached.get_execution_plan(schema)
+            kwargs["execution_context_class"] = plan.execution_context_class
+
+        if tracer is not None:
+            if tracing:
+                kwargs["middleware"] = tracer.add_middleware(kwargs.get("middleware"))
+            tracer.start_phase("execution")
+
+        if single_flight is not None and is_query(document, params.operation_name):
+            execution_result = single_flight.do(
+                single_flight.make_key(schema, params, single_flight_vary),
+                partial(execute_fn, schema, document, params, run_sync, **kwargs),
+                run_sync,
+            )
+        else:
+            execution_result = execute_fn(
+                schema, document, params, run_sync, **kwargs
+            )
+
+        if tracer is not None:
+            execution_result = finish_operation(
+                tracer, execution_result, tracing, metrics, operation_name
+            )
+
+    except catch_exc:
+        return None
+
+    return execution_result
+
+
+def format_execution_result(
+    execution_result: Optional[ExecutionResult],
+    format_error: Callable[[GraphQLError], Dict] = format_error_default,
+) -> FormattedResult:
+    """Format an execution result like ``graphql_server.format_execution_result``.
+
+    The extensions of the result are included in the formatted response.
+    """
+    formatted = format_result_without_extensions(execution_result, format_error)
+    if execution_result and execution_result.extensions and formatted.result:
+        formatted.result["extensions"] = execution_result.extensions
+    return formatted
+
+
+def get_status_code(execution_result: Optional[ExecutionResult]) -> int:
+    """Return the status code ``format_execution_result`` gives the result."""
+    if execution_result and any(
+        not getattr(error, "path", None) for error in execution_result.errors or ()
+    ):
+        return 400
+    return 200
+
+
+def encode_execution_results(
+    execution_results: List[Optional[ExecutionResult]],
+    format_error: Callable[[GraphQLError], Dict] = format_error_default,
+    is_batch: bool = False,
+    encode: Callable[[Dict], Any] = json_encode,
+) -> ServerResponse:
+    """Serialize execution results like ``graphql_server.encode_execution_results``.
+
+    The extensions of the results are included in the serialized response.
+    """
+    results = [
+        format_execution_result(execution_result, format_error)
+        for execution_result in execution_results
+    ]
+    result, status_codes = zip(*results)
+    status_code = max(status_codes)
+
+    if not is_batch:
+        result = result[0]
+
+    return ServerResponse(encode(result), status_code)
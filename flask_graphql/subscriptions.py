@@ -0,0 +1,465 @@
+"""GraphQL subscriptions over Server-Sent Events, with pluggable pub/sub brokers.
+
+A ``SubscriptionView`` is registered next to the ``GraphQLView`` and executes
+subscription operations, streaming every result as a ``next`` event of a
+``text/event-stream`` response, followed by a ``complete`` event when the
+subscription ends, like the distinct connections mode of the GraphQL over SSE
+protocol. Comments are sent every ``heartbeat_interval`` seconds, so that proxies
+keep the connection open and disconnected clients are noticed.
+
+Subscription fields get their events from a broker, which the view adds to the
+context as ``context["broker"]``::
+
+    GraphQLField(
+        Message,
+        subscribe=lambda root, info: info.context["broker"].subscribe("messages"),
+        resolve=lambda message, info: message,
+    )
+
+Mutations publish events with ``broker.publish("messages", message)`` from any
+thread. The ``InMemoryBroker`` only reaches subscribers of the same process,
+while the ``SocketBroker`` also delivers events to all other processes on the
+same host that use the same directory.
+
+Every subscription keeps a worker thread busy while it is open, so the
+application must be served by a server with enough threads or greenlets.
+"""
+import asyncio
+import atexit
+import json
+import os
+import socket
+import uuid
+from collections.abc import MutableMapping
+from threading import Lock, Thread
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Set, Union
+
+from flask import Response, request, stream_with_context
+from graphql_server import GraphQLParams, HttpQueryError
+
+from graphql import subscribe
+from graphql.execution import ExecutionResult
+from graphql.language import DocumentNode, OperationType
+from graphql.utilities import get_operation_ast
+
+from .complexity import check_query_cost
+from .graphqlview import GraphQLView
+from .persisted_queries import PersistedQueryError
+from .runtime import (encode_execution_results, format_execution_result,
+                      get_graphql_params, parse_and_validate)
+
+__all__ = [
+    "Broker",
+    "InMemoryBroker",
+    "SocketBroker",
+    "Subscription",
+    "SubscriptionView",
+    "format_event",
+    "make_broker",
+]
+
+EVENT_STREAM_CONTENT_TYPE = "text/event-stream"
+
+HEARTBEAT = b":\n\n"
+
+# Messages sent between processes must fit into a single datagram.
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+def format_event(event: str, data: Union[str, bytes] = b"") -> bytes:
+    """Return a Server-Sent Event with the given name and single-line data."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + data + b"\n\n"
+
+
+class Subscription:
+    """Async iterator over the messages published to a channel of a broker.
+
+    Messages are queued on the event loop that created the subscription. If a
+    subscriber falls more than ``max_queue_size`` messages behind, the oldest
+    messages are dropped.
+    """
+
+    def __init__(
+        self, broker: "InMemoryBroker", channel: str, max_queue_size: int = 100
+    ) -> None:
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(max_queue_size)
+        self.closed = False
+
+    def put(self, message: Any) -> None:
+        """Queue a message for the subscriber, from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.put_nowait, message)
+        except RuntimeError:  # the event loop has been closed
+            self.close()
+
+    def put_nowait(self, message: Any) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self.closed:
+            raise StopAsyncIteration
+        return await self.queue.get()
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Interface for publishing messages to the subscribers of a channel."""
+
+    def publish(self, channel: str, message: Any) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        """Return an async iterator over the messages published to the channel.
+
+        This must be called on the event loop the messages are consumed on,
+        e.g. in the subscribe function of a subscription field.
+        """
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """Deliver messages to the subscribers in the current process."""
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self.subscriptions: Dict[str, Set[Subscription]] = {}
+        self.lock = Lock()
+
+    def publish(self, channel: str, message: Any) -> None:
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel, self.max_queue_size)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.channel]
+
+
+class SocketBroker(Broker):
+    """Deliver messages to the subscribers of all processes on the same host.
+
+    Every process binds a Unix datagram socket in the given directory, and
+    messages are sent to all sockets in it as JSON, so they must be JSON
+    serializable and at most ``MAX_MESSAGE_SIZE`` bytes long. Sockets of
+    processes that are gone are removed when publishing. Messages for a process
+    that cannot keep up are dropped instead of blocking the publisher.
+    """
+
+    def __init__(self, directory: str, max_queue_size: int = 100):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("SocketBroker requires Unix domain sockets.")
+        self.directory = directory
+        self.max_queue_size = max_queue_size
+        self.local = InMemoryBroker(max_queue_size)
+        self.pid: Optional[int] = None
+        self.path: Optional[str] = None
+        self.receiver: Optional[socket.socket] = None
+        self.sender: Optional[socket.socket] = None
+        self.lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+
+    def check_process(self) -> None:
+        """Bind the socket of the current process, again after a fork."""
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # Subscribers and the socket of the parent process are not inherited.
+            self.local = InMemoryBroker(self.max_queue_size)
+            path = os.path.join(
+                self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock"
+            )
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(path)
+            sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sender.setblocking(False)
+            self.path, self.receiver, self.sender = path, receiver, sender
+            self.pid = os.getpid()
+            thread = Thread(target=self.receive, args=(receiver, self.local))
+            thread.daemon = True
+            thread.start()
+
+    @staticmethod
+    def receive(receiver: socket.socket, local: InMemoryBroker) -> None:
+        while True:
+            try:
+                data = receiver.recv(MAX_MESSAGE_SIZE)
+            except OSError:  # the socket has been closed
+                return
+            try:
+                channel, message = json.loads(data)
+            except (ValueError, TypeError):
+                continue
+            local.publish(channel, message)
+
+    def publish(self, channel: str, message: Any) -> None:
+        self.check_process()
+        data = json.dumps([channel, message]).encode("utf-8")
+        if len(data) > MAX_MESSAGE_SIZE:
+            raise ValueError(
+                f"Message is too large, the limit is {MAX_MESSAGE_SIZE} bytes."
+            )
+        self.local.publish(channel, message)
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".sock") or path == self.path:
+                continue
+            try:
+                self.sender.sendto(data, path)  # type: ignore
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                pass
+
+    def subscribe(self, channel: str) -> Subscription:
+        self.check_process()
+        return self.local.subscribe(channel)
+
+    def close(self) -> None:
+        """Remove the socket of the current process."""
+        with self.lock:
+            if self.pid != os.getpid():
+                return
+            self.pid = None
+            for sock in (self.receiver, self.sender):
+                if sock is not None:
+                    sock.close()
+            try:
+                os.unlink(self.path)  # type: ignore
+            except FileNotFoundError:
+                pass
+
+
+def make_broker(value: Any) -> Optional[Broker]:
+    """Build a broker from the ``broker`` view option.
+
+    The option can be a broker instance, True for an ``InMemoryBroker``, the
+    path of a directory for a ``SocketBroker``, or a false value for no broker.
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return InMemoryBroker()
+    if isinstance(value, (str, os.PathLike)):
+        return SocketBroker(os.fspath(value))
+    return value
+
+
+class SubscriptionView(GraphQLView):
+    """Execute subscription operations and stream their results as events.
+
+    Besides the options of ``GraphQLView``, this accepts a ``broker`` that is
+    added to the context, and the ``heartbeat_interval`` in seconds, or None to
+    send no heartbeats. Batches and other operations are rejected.
+
+    Subscriptions are checked against ``max_depth`` and ``max_complexity`` and
+    charged to the ``rate_limit`` once when they start. Each open subscription
+    holds a slot of the ``concurrency_limit`` until it ends, and is counted
+    once in the ``metrics``.
+    """
+
+    methods = ["GET", "POST"]
+    broker = None
+    heartbeat_interval: Optional[float] = 15.0
+
+    shared_options = dict(GraphQLView.shared_options, broker=make_broker)
+
+    def get_context(self):
+        context = super(SubscriptionView, self).get_context()
+        if (
+            self.broker is not None
+            and isinstance(context, MutableMapping)
+            and "broker" not in context
+        ):
+            context["broker"] = self.broker
+        return context
+
+    def dispatch_request(self):
+        try:
+            data = self.parse_body()
+            if isinstance(data, list):
+                raise HttpQueryError(
+                    400, "Batch GraphQL requests are not supported for subscriptions."
+                )
+            try:
+                params = get_graphql_params(
+                    data,
+                    request.args,
+                    self.get_persisted_queries(),
+                    self.get_trusted_documents(),
+                )
+            except PersistedQueryError as error:
+                return self.build_result_response(ExecutionResult(None, [error]))
+            if not params.query:
+                raise HttpQueryError(400, "Must provide query string.")
+
+            cached = parse_and_validate(
+                self.schema, params.query, document_cache=self.get_document_cache()
+            )
+            cost = None
+            if cached.document is not None and not cached.errors:
+                cost = cached.get_cost(
+                    self.schema,
+                    params.operation_name,
+                    self.field_cost,
+                    params.variables,
+                )
+            if self.rate_limit:
+                complexity = cost.complexity if cost else 0
+                self.rate_limit.charge(self.get_rate_limit_key(), max(complexity, 1))
+            if cached.errors:
+                return self.build_failed_response(None, cached.errors)
+            operation = get_operation_ast(cached.document, params.operation_name)
+            if operation and operation.operation != OperationType.SUBSCRIPTION:
+                raise HttpQueryError(
+                    400, "Only subscription operations can be sent to this endpoint."
+                )
+            operation_name = params.operation_name if operation else None
+            cost_errors = check_query_cost(cost, self.max_depth, self.max_complexity)
+            if cost_errors:
+                return self.build_failed_response(operation_name, cost_errors)
+
+            concurrency_limit = self.concurrency_limit
+            if concurrency_limit is not None:
+                concurrency_limit.acquire()
+            try:
+                events = self.iter_events(
+                    cached.document,  # type: ignore
+                    params,
+                    self.get_root_value(),
+                    self.get_context(),
+                    operation_name,
+                )
+                response = Response(
+                    stream_with_context(events),
+                    content_type=EVENT_STREAM_CONTENT_TYPE,
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                )
+            except BaseException:
+                if concurrency_limit is not None:
+                    concurrency_limit.release()
+                raise
+            if concurrency_limit is not None:
+                # The slot is held until the subscription ends.
+                response.call_on_close(concurrency_limit.release)
+            return response
+
+        except HttpQueryError as e:
+            return self.build_error_response(e)
+
+    def build_failed_response(self, operation_name, errors):
+        result = ExecutionResult(None, errors)
+        self.observe_subscription(operation_name, result)
+        return self.build_result_response(result)
+
+    def observe_subscription(self, operation_name, result):
+        """Count a subscription that has been started or failed to start."""
+        if self.metrics is not None:
+            self.metrics.observe_operation(operation_name, {}, result)
+
+    def build_result_response(self, result):
+        body, status_code = encode_execution_results(
+            [result], format_error=self.format_error, encode=self.encode
+        )
+        return Response(body, status=status_code, content_type="application/json")
+
+    def iter_events(
+        self,
+        document: DocumentNode,
+        params: GraphQLParams,
+        root_value: Any = None,
+        context_value: Any = None,
+        operation_name: Optional[str] = None,
+    ) -> Iterator[bytes]:
+        """Run the subscription on its own event loop and yield its events.
+
+        The subscription is started before the first heartbeat is sent, and it
+        is closed as soon as the client disconnects. Starting it is counted in
+        the metrics under the given operation name.
+        """
+        loop = asyncio.new_event_loop()
+        results = None
+        pending = None
+        try:
+            results = loop.run_until_complete(
+                subscribe(
+                    self.schema,
+                    document,
+                    root_value,
+                    context_value,
+                    params.variables,
+                    params.operation_name,
+                )
+            )
+            self.observe_subscription(
+                operation_name,
+                results
+                if isinstance(results, ExecutionResult)
+                else ExecutionResult(None, None),
+            )
+            yield HEARTBEAT
+            if isinstance(results, ExecutionResult):
+                yield self.format_result(results)
+                results = None
+            else:
+                while True:
+                    if pending is None:
+                        pending = loop.create_task(results.__anext__())
+                    done, _pending = loop.run_until_complete(
+                        asyncio.wait({pending}, timeout=self.heartbeat_interval)
+                    )
+                    if not done:
+                        yield HEARTBEAT
+                        continue
+                    task, pending = pending, None
+                    try:
+                        result = task.result()
+                    except StopAsyncIteration:
+                        break
+                    yield self.format_result(result)
+            yield format_event("complete")
+        finally:
+            if pending is not None:
+                pending.cancel()
+                loop.run_until_complete(asyncio.gather(pending, return_exceptions=True))
+            aclose = getattr(results, "aclose", None)
+            if aclose is not None:
+                loop.run_until_complete(aclose())
+            loop.close()
+
+    def format_result(self, result: ExecutionResult) -> bytes:
+        formatted, _status_code = format_execution_result(result, self.format_error)
+        return format_event("next", self.encode(formatted))
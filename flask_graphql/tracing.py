@@ -0,0 +1,149 @@
+"""Timing of the request phases and resolvers in the Apollo tracing format.
+
+A ``Tracer`` is created for every operation when tracing is enabled. It records
+the duration of parsing, validation and execution, and its ``middleware``
+records the start offset and duration of every resolver. The finished trace is
+added to the ``extensions`` of the result or passed to a sink function.
+Nothing is recorded, and no middleware is added, when tracing is disabled.
+"""
+from datetime import datetime, timezone
+from inspect import isawaitable
+from typing import Any, Callable, Dict, List, Optional
+
+from graphql.execution import ExecutionResult, MiddlewareManager
+from graphql.pyutils import AwaitableOrValue
+
+try:
+    from time import perf_counter_ns
+except ImportError:  # pragma: no cover
+    from time import perf_counter
+
+    def perf_counter_ns() -> int:
+        return int(perf_counter() * 1e9)
+
+
+__all__ = ["Tracer", "TracingMiddleware", "TraceSink", "finish_trace"]
+
+TraceSink = Callable[[Dict[str, Any]], None]
+
+
+def format_time(time: datetime) -> str:
+    return time.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class Tracer:
+    """Record the timing of a single operation.
+
+    All offsets and durations are given in nanoseconds, relative to the creation
+    of the tracer.
+    """
+
+    def __init__(self) -> None:
+        self.start_time = datetime.now(timezone.utc)
+        self.start = perf_counter_ns()
+        self.end_time: Optional[datetime] = None
+        self.end: Optional[int] = None
+        self.phases: Dict[str, Dict[str, int]] = {}
+        self.resolvers: List[Dict[str, Any]] = []
+        self.middleware = TracingMiddleware(self)
+
+    def start_phase(self, name: str) -> None:
+        self.phases[name] = {"startOffset": perf_counter_ns() - self.start}
+
+    def end_phase(self, name: str) -> None:
+        phase = self.phases.get(name)
+        if phase is not None and "duration" not in phase:
+            phase["duration"] = perf_counter_ns() - self.start - phase["startOffset"]
+
+    def add_middleware(self, middleware: Any) -> Any:
+        """Return the given execution middleware with the tracing middleware added.
+
+        The tracing middleware is the innermost one, so that it only measures the
+        resolvers themselves.
+        """
+        if middleware is None:
+            return [self.middleware]
+        if isinstance(middleware, MiddlewareManager):
+            return MiddlewareManager(*middleware.middlewares, self.middleware)
+        return [*middleware, self.middleware]
+
+    def finish(self) -> None:
+        for name in list(self.phases):
+            self.end_phase(name)
+        self.end = perf_counter_ns()
+        self.end_time = datetime.now(timezone.utc)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the trace in the Apollo tracing format."""
+        empty_phase = {"startOffset": 0, "duration": 0}
+        execution = dict(self.phases.get("execution", empty_phase))
+        execution["resolvers"] = list(self.resolvers)
+        return {
+            "version": 1,
+            "startTime": format_time(self.start_time),
+            "endTime": format_time(self.end_time or self.start_time),
+            "duration": (self.end or self.start) - self.start,
+            "parsing": self.phases.get("parsing", empty_phase),
+            "validation": self.phases.get("validation", empty_phase),
+            "execution": execution,
+        }
+
+
+class TracingMiddleware:
+    """Execution middleware recording the timing of every resolver."""
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+
+    def resolve(self, next_, root, info, **args):
+        start = perf_counter_ns()
+        result = next_(root, info, **args)
+        if isawaitable(result):
+            return self.resolve_async(result, info, start)
+        self.add_resolver(info, start)
+        return result
+
+    async def resolve_async(self, result, info, start):
+        try:
+            return await result
+        finally:
+            self.add_resolver(info, start)
+
+    def add_resolver(self, info, start: int) -> None:
+        tracer = self.tracer
+        tracer.resolvers.append(
+            {
+                "path": info.path.as_list(),
+                "parentType": str(info.parent_type),
+                "fieldName": info.field_name,
+                "returnType": str(info.return_type),
+                "startOffset": start - tracer.start,
+                "duration": perf_counter_ns() - start,
+            }
+        )
+
+
+def finish_trace(
+    tracer: Tracer,
+    result: AwaitableOrValue[ExecutionResult],
+    sink: Optional[TraceSink] = None,
+) -> AwaitableOrValue[ExecutionResult]:
+    """Finish the trace once the result is available and report it.
+
+    The trace is passed to the given sink if there is one, and added to the
+    ``tracing`` entry of the result extensions otherwise.
+    """
+    if isawaitable(result):
+
+        async def await_result() -> ExecutionResult:
+            return finish_trace(tracer, await result, sink)  # type: ignore
+
+        return await_result()
+
+    tracer.finish()
+    trace = tracer.to_dict()
+    if sink is not None:
+        sink(trace)
+    elif result is not None:
+        result.extensions = dict(result.extensions or {}, tracing=trace)
+    return result
@@ -0,0 +1,179 @@
+"""Trusted documents: only execute operations from a registry of known documents.
+
+The registry is loaded from a manifest when the view is created. Every document
+is parsed and validated once against the schema of the view, and requests refer
+to documents by their id, either with a ``documentId`` param or with the hash of
+an Apollo persisted query in ``extensions.persistedQuery.sha256Hash``. Requests
+sending query text that is not part of the registry are rejected, so parsing and
+validation never happen while handling a request.
+
+Manifests are JSON files that either map ids to query texts, or follow the
+format of Apollo persisted query manifests::
+
+    {
+        "format": "apollo-persisted-query-manifest",
+        "version": 1,
+        "operations": [{"id": "...", "name": "...", "type": "query", "body": "..."}]
+    }
+"""
+import json
+import os
+from threading import Lock
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Set, Tuple
+
+from graphql import GraphQLSchema
+
+from .cache import DocumentCache
+from .persisted_queries import PersistedQueryError, load_json_extensions
+from .runtime import parse_and_validate
+
+__all__ = [
+    "TrustedDocuments",
+    "TrustedDocumentNotFound",
+    "OperationNotTrusted",
+    "load_manifest",
+    "make_trusted_documents",
+]
+
+
+class TrustedDocumentNotFound(PersistedQueryError):
+    code = "PERSISTED_QUERY_NOT_IN_LIST"
+
+
+class OperationNotTrusted(PersistedQueryError):
+    code = "OPERATION_NOT_IN_PERSISTED_QUERY_LIST"
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    """Read the documents of a manifest file as a mapping of ids to query texts."""
+    with open(path, encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    if isinstance(manifest, dict) and "operations" in manifest:
+        operations = manifest["operations"]
+        if not isinstance(operations, list) or not all(
+            isinstance(operation, dict) for operation in operations
+        ):
+            raise ValueError(f"Invalid operations in trusted document manifest {path}.")
+        documents = {
+            operation.get("id"): operation.get("body") for operation in operations
+        }
+    elif isinstance(manifest, dict):
+        documents = manifest
+    else:
+        raise ValueError(f"Invalid trusted document manifest {path}.")
+    for document_id, query in documents.items():
+        if not isinstance(document_id, str) or not isinstance(query, str):
+            raise ValueError(
+                f"Invalid trusted document {document_id!r} in manifest {path}."
+            )
+    return documents
+
+
+class TrustedDocuments:
+    """Registry of the documents a view is allowed to execute, keyed by their id.
+
+    The documents are parsed and validated once per schema, and kept in a
+    document cache that is large enough to never evict them.
+    """
+
+    def __init__(self, documents: Mapping[str, str]):
+        self.documents = dict(documents)
+        self.document_cache = DocumentCache(max(len(self.documents), 1))
+        self.schemas: Set[Hashable] = set()
+        self.lock = Lock()
+
+    @classmethod
+    def from_manifest(cls, path: str) -> "TrustedDocuments":
+        return cls(load_manifest(path))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, document_id: str) -> bool:
+        return self.get(document_id) is not None
+
+    def get(self, document_id: str) -> Optional[str]:
+        """Return the query text of a document.
+
+        Ids may carry a ``sha256:`` prefix like in the GraphQL over HTTP spec.
+        """
+        query = self.documents.get(document_id)
+        if query is None and document_id.startswith("sha256:"):
+            query = self.documents.get(document_id[7:])
+        return query
+
+    def prepare(self, schema: GraphQLSchema) -> DocumentCache:
+        """Parse and validate all documents against the schema, once per schema.
+
+        Raises a ValueError listing every document that is not valid.
+        """
+        if schema in self.schemas:
+            return self.document_cache
+        with self.lock:
+            if schema not in self.schemas:
+                self.document_cache.maxsize = max(
+                    len(self.documents) * (len(self.schemas) + 1), 1
+                )
+                errors: List[Tuple[str, str]] = []
+                for document_id, query in self.documents.items():
+                    cached = parse_and_validate(
+                        schema, query, document_cache=self.document_cache
+                    )
+                    errors.extend(
+                        (document_id, error.message) for error in cached.errors
+                    )
+                if errors:
+                    raise ValueError(
+                        "Invalid trusted documents:\n"
+                        + "\n".join(f"{id_}: {message}" for id_, message in errors)
+                    )
+                self.schemas.add(schema)
+        return self.document_cache
+
+    def resolve(
+        self,
+        query: Optional[str],
+        document_id: Optional[str],
+        extensions: Any = None,
+    ) -> Optional[str]:
+        """Return the query text of the document a request refers to.
+
+        The id is taken from ``document_id`` or from the persisted query hash in
+        the extensions. Query text is only accepted together with the id of a
+        document with the same text.
+        """
+        if not document_id and extensions:
+            persisted_query = (load_json_extensions(extensions) or {}).get(
+                "persistedQuery"
+            )
+            if isinstance(persisted_query, dict):
+                document_id = persisted_query.get("sha256Hash")
+        if not document_id:
+            if query:
+                raise OperationNotTrusted(
+                    "Only trusted documents may be executed, send a documentId."
+                )
+            return None
+        if not isinstance(document_id, str):
+            raise PersistedQueryError("Document id must be a string.")
+        trusted_query = self.get(document_id)
+        if trusted_query is None:
+            raise TrustedDocumentNotFound(f"Unknown document id '{document_id}'.")
+        if query and query != trusted_query:
+            raise OperationNotTrusted("Provided query does not match the document.")
+        return trusted_query
+
+
+def make_trusted_documents(value: Any) -> Optional[TrustedDocuments]:
+    """Build the registry from the ``trusted_documents`` view option.
+
+    The option can be the path of a manifest file, a mapping of ids to query
+    texts, a registry instance, or a false value to accept any query.
+    """
+    if value is None or value is False:
+        return None
+    if isinstance(value, (str, os.PathLike)):
+        return TrustedDocuments.from_manifest(value)  # type: ignore
+    if isinstance(value, Mapping):
+        return TrustedDocuments(value)
+    return value
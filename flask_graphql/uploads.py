@@ -0,0 +1,202 @@
+"""File uploads following the GraphQL multipart request specification.
+
+A multipart request carries the JSON encoded operations in its ``operations``
+field, which are a single operation or a batch, and a ``map`` field that maps
+every file field to the paths of the variables it is used for, e.g.
+``{"0": ["variables.file"]}``, or ``{"0": ["1.variables.files.0"]}`` in a batch.
+The files are inserted into the variables as Werkzeug ``FileStorage`` objects,
+which are accepted by the ``GraphQLUpload`` scalar.
+
+Files are written to a ``SpooledTemporaryFile`` while the body is parsed, so
+they are kept in memory up to the spool size and moved to disk beyond it. The
+size of every file and the total size of all files of a request can be limited,
+in which case a request is rejected with a 413 error as soon as a limit is
+reached. Werkzeug closes the files when the request ends.
+"""
+import json
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Callable, Dict, List, Optional
+
+from flask import Request
+from graphql_server import HttpQueryError
+from werkzeug.datastructures import FileStorage
+
+from graphql.error import GraphQLError
+from graphql.type import GraphQLScalarType
+
+__all__ = [
+    "GraphQLUpload",
+    "DEFAULT_SPOOL_SIZE",
+    "UploadLimits",
+    "load_multipart_request",
+]
+
+DEFAULT_SPOOL_SIZE = 512 * 1024
+
+
+def parse_upload_value(value: Any) -> FileStorage:
+    if not isinstance(value, FileStorage):
+        raise GraphQLError("Upload value is not a file.")
+    return value
+
+
+def parse_upload_literal(*_args: Any) -> Any:
+    raise GraphQLError("Upload literals are not supported, upload a file instead.")
+
+
+def serialize_upload(_value: Any) -> Any:
+    raise GraphQLError("Upload values cannot be serialized.")
+
+
+GraphQLUpload = GraphQLScalarType(
+    name="Upload",
+    description="A file sent in a multipart request.",
+    serialize=serialize_upload,
+    parse_value=parse_upload_value,
+    parse_literal=parse_upload_literal,
+)
+
+
+class UploadLimits:
+    """Count the bytes of the files uploaded by one request."""
+
+    def __init__(
+        self, max_file_size: Optional[int] = None, max_total_size: Optional[int] = None
+    ) -> None:
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.total_size = 0
+
+    def add(self, file_size: int, size: int) -> None:
+        """Add the size of a chunk to a file with the given size so far."""
+        if self.max_file_size is not None and file_size + size > self.max_file_size:
+            raise HttpQueryError(
+                413,
+                "Uploaded file is too large,"
+                f" the limit is {self.max_file_size} bytes.",
+            )
+        self.total_size += size
+        if self.max_total_size is not None and self.total_size > self.max_total_size:
+            raise HttpQueryError(
+                413,
+                "Uploaded files are too large,"
+                f" the limit is {self.max_total_size} bytes in total.",
+            )
+
+
+class SpooledUpload(SpooledTemporaryFile):
+    """Temporary file of an upload, kept in memory up to the spool size."""
+
+    def __init__(self, limits: UploadLimits, spool_size: int) -> None:
+        super().__init__(max_size=spool_size, mode="rb+")
+        self.limits = limits
+        self.size = 0
+
+    def write(self, data: bytes) -> int:  # type: ignore
+        self.limits.add(self.size, len(data))
+        self.size += len(data)
+        return super().write(data)
+
+
+def make_stream_factory(
+    limits: UploadLimits, spool_size: int, files: List[IO[bytes]]
+) -> Callable[..., IO[bytes]]:
+    def stream_factory(*_args: Any, **_kwargs: Any) -> IO[bytes]:
+        file = SpooledUpload(limits, spool_size)
+        files.append(file)
+        return file  # type: ignore
+
+    return stream_factory
+
+
+def invalid_multipart(message: str) -> HttpQueryError:
+    return HttpQueryError(400, f"Invalid multipart request: {message}")
+
+
+def set_path(operations: Any, path: str, file: FileStorage) -> None:
+    """Set the value at the dotted path within the operations to the file."""
+    *keys, last_key = path.split(".")
+    target = operations
+    try:
+        if not keys:
+            raise KeyError(last_key)
+        for key in keys:
+            target = target[int(key) if isinstance(target, list) else key]
+        if isinstance(target, list):
+            target[int(last_key)] = file
+        elif isinstance(target, dict):
+            target[last_key] = file
+        else:
+            raise TypeError
+    except (KeyError, IndexError, TypeError, ValueError):
+        raise invalid_multipart(f"The path '{path}' does not exist in the operations.")
+
+
+def load_json_field(form: Any, name: str) -> Any:
+    value = form.get(name)
+    if value is None:
+        raise invalid_multipart(f"The '{name}' field is missing.")
+    try:
+        return json.loads(value)
+    except ValueError:
+        raise invalid_multipart(f"The '{name}' field is not valid JSON.")
+
+
+def load_multipart_request(
+    request: Request,
+    spool_size: int = DEFAULT_SPOOL_SIZE,
+    max_file_size: Optional[int] = None,
+    max_total_size: Optional[int] = None,
+) -> Any:
+    """Parse a multipart request and return its operations with the files.
+
+    The form data of the request is replaced by the parsed form, so that the
+    files are closed with the request. Requests without an ``operations`` field
+    are returned as form data.
+    """
+    files: List[IO[bytes]] = []
+    limits = UploadLimits(max_file_size, max_total_size)
+    parser = request.form_data_parser_class(
+        make_stream_factory(limits, spool_size, files),
+        request.charset,
+        request.encoding_errors,
+        request.max_form_memory_size,
+        request.max_content_length,
+        request.parameter_storage_class,
+    )
+    try:
+        parsed = parser.parse(
+            request._get_stream_for_parsing(),
+            request.mimetype,
+            request.content_length,
+            request.mimetype_params,
+        )
+    except BaseException:
+        for file in files:
+            file.close()
+        raise
+    # Like Request._load_form_data, which bypasses the cached properties.
+    d = request.__dict__
+    d["stream"], d["form"], d["files"] = parsed
+    _stream, form, uploaded_files = parsed
+    if "operations" not in form:
+        return form
+
+    operations = load_json_field(form, "operations")
+    if not isinstance(operations, (dict, list)):
+        raise invalid_multipart("The operations must be an object or an array.")
+    file_map = load_json_field(form, "map")
+    if not isinstance(file_map, dict):
+        raise invalid_multipart("The map must be an object.")
+    file_paths: Dict[str, List[str]] = file_map
+    for name, paths in file_paths.items():
+        file = uploaded_files.get(name)
+        if file is None:
+            raise invalid_multipart(f"The file '{name}' is missing.")
+        if not isinstance(paths, list) or not all(
+            isinstance(path, str) for path in paths
+        ):
+            raise invalid_multipart(f"The paths of the file '{name}' must be a list.")
+        for path in paths:
+            set_path(operations, path, file)
+    return operations
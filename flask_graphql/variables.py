@@ -0,0 +1,234 @@
+"""Coercion of variable values planned once per operation.
+
+``graphql.execute`` coerces the variables of every request generically: the
+types of the variable definitions are looked up in the schema, default values
+are converted from their literals, and every input value is checked against its
+type by walking the type wrappers again for each item of a list.
+
+A ``VariablesPlan`` resolves the variable definitions of an operation once and
+builds a specialized coercion function for every type, with shortcuts for the
+built-in scalars. Lists of input objects are checked and coerced in one pass
+over the data. Coercion stops as soon as a value is not a plain valid value, in
+which case the variables are coerced by graphql-core again, so that errors are
+reported exactly as without the plan.
+"""
+from collections.abc import Iterable
+from math import isfinite
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from graphql.language import OperationDefinitionNode
+from graphql.pyutils import Undefined
+from graphql.type import (GraphQLBoolean, GraphQLFloat, GraphQLID,
+                          GraphQLInputType, GraphQLInt, GraphQLNamedType,
+                          GraphQLSchema, GraphQLString, is_input_object_type,
+                          is_input_type, is_list_type, is_non_null_type)
+from graphql.utilities import type_from_ast, value_from_ast
+
+__all__ = ["VariablesPlan", "build_coercer"]
+
+Coercer = Callable[[Any], Any]
+
+# The range of the Int type, named differently by graphql-core 3.1 and 3.2.
+MAX_INT = 2 ** 31 - 1
+MIN_INT = -(2 ** 31)
+
+
+class _InvalidValue(Exception):
+    """Private exception raised when a value needs the generic coercion."""
+
+
+def coerce_string(value: Any) -> Any:
+    if value is None or type(value) is str:
+        return value
+    raise _InvalidValue
+
+
+def coerce_int(value: Any) -> Any:
+    if value is None or (type(value) is int and MIN_INT <= value <= MAX_INT):
+        return value
+    raise _InvalidValue
+
+
+def coerce_float(value: Any) -> Any:
+    if value is None:
+        return None
+    if type(value) is float and isfinite(value):
+        return value
+    if type(value) is int:
+        return float(value)
+    raise _InvalidValue
+
+
+def coerce_boolean(value: Any) -> Any:
+    if value is None or type(value) is bool:
+        return value
+    raise _InvalidValue
+
+
+def coerce_id(value: Any) -> Any:
+    if value is None or type(value) is str:
+        return value
+    if type(value) is int:
+        return str(value)
+    raise _InvalidValue
+
+
+BUILT_IN_COERCERS: Dict[GraphQLNamedType, Coercer] = {
+    GraphQLString: coerce_string,
+    GraphQLInt: coerce_int,
+    GraphQLFloat: coerce_float,
+    GraphQLBoolean: coerce_boolean,
+    GraphQLID: coerce_id,
+}
+
+
+def build_coercer(
+    type_: GraphQLInputType, coercers: Optional[Dict[Any, Coercer]] = None
+) -> Coercer:
+    """Build a function coercing valid input values of the given input type.
+
+    The function raises an internal exception for values that are invalid or
+    that it cannot coerce itself. Coercers of named types are shared through the
+    ``coercers`` dict, which also makes recursive input objects possible.
+    """
+    if coercers is None:
+        coercers = {}
+
+    if is_non_null_type(type_):
+        coerce_nullable = build_coercer(type_.of_type, coercers)  # type: ignore
+
+        def coerce_non_null(value: Any) -> Any:
+            if value is None:
+                raise _InvalidValue
+            return coerce_nullable(value)
+
+        return coerce_non_null
+
+    if is_list_type(type_):
+        coerce_item = build_coercer(type_.of_type, coercers)  # type: ignore
+
+        def coerce_list(value: Any) -> Any:
+            if value is None:
+                return None
+            if isinstance(value, list):
+                return [coerce_item(item) for item in value]
+            if isinstance(value, Iterable) and not isinstance(value, str):
+                raise _InvalidValue
+            # Lists accept a non-list value as a list of one.
+            return [coerce_item(value)]
+
+        return coerce_list
+
+    coerce = coercers.get(type_) or BUILT_IN_COERCERS.get(type_)  # type: ignore
+    if coerce is not None:
+        return coerce
+
+    if is_input_object_type(type_):
+        coerce = coercers[type_] = build_input_object_coercer(type_, coercers)
+        return coerce
+
+    parse_value = type_.parse_value  # type: ignore
+
+    def coerce_scalar(value: Any) -> Any:
+        if value is None:
+            return None
+        try:
+            result = parse_value(value)
+        except Exception:
+            raise _InvalidValue
+        if result is Undefined:
+            raise _InvalidValue
+        return result
+
+    coercers[type_] = coerce_scalar
+    return coerce_scalar
+
+
+def build_input_object_coercer(type_: Any, coercers: Dict[Any, Coercer]) -> Coercer:
+    """Build the coercer of an input object type, and of the types of its fields."""
+    field_names = frozenset(type_.fields)
+    fields: List[Tuple[str, str, Coercer, Any, bool]] = []
+    out_type = type_.out_type
+
+    def coerce_input_object(value: Any) -> Any:
+        if value is None:
+            return None
+        if not isinstance(value, dict) or not field_names.issuperset(value):
+            raise _InvalidValue
+        coerced = {}
+        for name, out_name, coerce, default_value, required in fields:
+            field_value = value.get(name, Undefined)
+            if field_value is not Undefined:
+                coerced[out_name] = coerce(field_value)
+            elif default_value is not Undefined:
+                coerced[out_name] = default_value
+            elif required:
+                raise _InvalidValue
+        return out_type(coerced)
+
+    # Register the coercer before building the fields, which may refer to it.
+    coercers[type_] = coerce_input_object
+    for name, field in type_.fields.items():
+        fields.append(
+            (
+                name,
+                field.out_name or name,
+                build_coercer(field.type, coercers),
+                field.default_value,
+                is_non_null_type(field.type),
+            )
+        )
+    return coerce_input_object
+
+
+class VariablesPlan:
+    """The resolved variable definitions of an operation of a valid document."""
+
+    def __init__(self, schema: GraphQLSchema, operation: OperationDefinitionNode):
+        self.variables: List[Tuple[str, Coercer, bool, Any, bool]] = []
+        self.valid = True
+        coercers: Dict[Any, Coercer] = {}
+        for node in operation.variable_definitions or ():
+            type_ = type_from_ast(schema, node.type)
+            if not is_input_type(type_):
+                # Reported by graphql-core, validation should prevent this.
+                self.valid = False
+                break
+            has_default = node.default_value is not None
+            default_value = (
+                value_from_ast(node.default_value, type_) if has_default else None
+            )
+            self.variables.append(
+                (
+                    node.variable.name.value,
+                    build_coercer(type_, coercers),  # type: ignore
+                    has_default,
+                    default_value,
+                    is_non_null_type(type_),
+                )
+            )
+
+    def coerce(self, inputs: Any) -> Optional[Dict[str, Any]]:
+        """Return the coerced variable values.
+
+        Returns None if the values are invalid or need to be coerced by
+        graphql-core for another reason.
+        """
+        if not self.valid:
+            return None
+        if inputs is None:
+            inputs = {}
+        elif not isinstance(inputs, dict):
+            return None
+        coerced: Dict[str, Any] = {}
+        try:
+            for name, coerce, has_default, default_value, non_null in self.variables:
+                if name in inputs:
+                    coerced[name] = coerce(inputs[name])
+                elif has_default:
+                    coerced[name] = default_value
+                elif non_null:
+                    return None
+        except _InvalidValue:
+            return None
+        return coerced
@@ -4,10 +4,23 @@ install_requires = [
     "graphql-server[flask]>=3.0.0b1",
 ]
 
+async_requires = [
+    "flask[async]>=2.0",
+]
+
+fast_json_requires = [
+    "orjson>=3",
+]
+
+compression_requires = [
+    "brotli>=1",
+    "zstandard>=0.15",
+]
+
 tests_requires = [
     "pytest>=5.4,<5.5",
     "pytest-cov>=2.8,<3",
-]
+] + async_requires
 
 dev_requires = [
     "flake8>=3.7,<4",
@@ -39,10 +52,13 @@ setup(
         "License :: OSI Approved :: MIT License",
     ],
     keywords="api graphql protocol rest flask",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     install_requires=install_requires,
     tests_require=tests_requires,
     extras_require={
+        'async': async_requires,
+        'fast-json': fast_json_requires,
+        'compression': compression_requires,
         'test': tests_requires,
         'dev': dev_requires,
     },
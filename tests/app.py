@@ -4,12 +4,11 @@ from flask_graphql import GraphQLView
 from tests.schema import Schema
 
 
-def create_app(path="/graphql", **kwargs):
+def create_app(path="/graphql", view_class=GraphQLView, **kwargs):
+    kwargs.setdefault("schema", Schema)
     app = Flask(__name__)
     app.debug = True
-    app.add_url_rule(
-        path, view_func=GraphQLView.as_view("graphql", schema=Schema, **kwargs)
-    )
+    app.add_url_rule(path, view_func=view_class.as_view("graphql", **kwargs))
     return app
 
 
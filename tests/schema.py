@@ -1,3 +1,5 @@
+import asyncio
+
 from graphql.type.definition import (GraphQLArgument, GraphQLField,
                                      GraphQLNonNull, GraphQLObjectType)
 from graphql.type.scalars import GraphQLString
@@ -45,3 +47,30 @@ MutationRootType = GraphQLObjectType(
 )
 
 Schema = GraphQLSchema(QueryRootType, MutationRootType)
+
+
+async def resolve_field(value):
+    await asyncio.sleep(0.001)
+    return value
+
+
+AsyncQueryType = GraphQLObjectType(
+    name="AsyncQueryType",
+    fields={
+        "a": GraphQLField(GraphQLString, resolve=lambda *_: resolve_field("hey")),
+        "b": GraphQLField(GraphQLString, resolve=lambda *_: resolve_field("hey2")),
+        "c": GraphQLField(GraphQLString, resolve=lambda *_: "hey3"),
+        "request": GraphQLField(
+            GraphQLString,
+            resolve=lambda obj, info: resolve_field(
+                info.context["request"].args.get("q")
+            ),
+        ),
+        "session": GraphQLField(
+            GraphQLString,
+            resolve=lambda obj, info: resolve_field(info.context.get("session")),
+        ),
+    },
+)
+
+AsyncSchema = GraphQLSchema(AsyncQueryType)
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+from flask import request
+from graphql_server import HttpQueryError
+
+from flask_graphql import AsyncGraphQLView
+from flask_graphql.admission import (ConcurrencyLimit, MemoryTokenBucketStore,
+                                     RateLimit, SQLiteTokenBucketStore)
+from graphql import (GraphQLField, GraphQLObjectType, GraphQLSchema,
+                     GraphQLString)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+
+def create_rate_limited_app(**kwargs):
+    return create_app(
+        batch=True,
+        rate_limit=RateLimit(rate=0.001, burst=3),
+        rate_limit_key=lambda: request.headers.get("X-Api-Key"),
+        **kwargs,
+    )
+
+
+def post(app, body, api_key="a"):
+    return app.test_client().post(
+        url_string(app), json=body, headers={"X-Api-Key": api_key}
+    )
+
+
+def assert_rate_limited(response):
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 900
+    assert response_json(response) == {
+        "errors": [
+            {
+                "message": "Rate limit exceeded, try again later.",
+                "locations": None,
+                "path": None,
+            }
+        ]
+    }
+
+
+def test_rate_limits_clients_separately():
+    app = create_rate_limited_app()
+
+    for _ in range(3):
+        assert post(app, {"query": "{ test }"}).status_code == 200
+    assert_rate_limited(post(app, {"query": "{ test }"}))
+    assert post(app, {"query": "{ test }"}, api_key="b").status_code == 200
+
+
+def test_charges_the_cost_of_operations():
+    app = create_rate_limited_app()
+
+    response = post(app, {"query": "{ a: test b: test }"})
+    assert response.status_code == 200
+    assert_rate_limited(post(app, {"query": "{ a: test b: test }"}))
+    # Invalid operations cost 1.
+    assert post(app, {"query": "{ unknown }"}).status_code == 400
+    assert_rate_limited(post(app, {"query": "{ unknown }"}))
+
+
+def test_charges_batches_before_executing_them():
+    executed = []
+    app = create_rate_limited_app(
+        schema=GraphQLSchema(
+            GraphQLObjectType(
+                "Query",
+                {
+                    "test": GraphQLField(
+                        GraphQLString, resolve=lambda *_: executed.append(1)
+                    )
+                },
+            )
+        )
+    )
+
+    assert post(app, {"query": "{ test }"}).status_code == 200
+    assert_rate_limited(post(app, [{"query": "{ test }"}] * 3))
+    assert len(executed) == 1
+    assert post(app, [{"query": "{ test }"}] * 2).status_code == 200
+    assert len(executed) == 3
+
+
+def test_charges_operations_costing_more_than_the_burst_as_debt():
+    rate_limit = RateLimit(rate=1, burst=2)
+
+    rate_limit.charge("a", 5)
+    with pytest.raises(HttpQueryError) as exc_info:
+        rate_limit.charge("a", 1)
+
+    assert exc_info.value.headers == {"Retry-After": "4"}
+    # Only a full bucket admits them.
+    rate_limit.charge("b", 1)
+    with pytest.raises(HttpQueryError):
+        rate_limit.charge("b", 5)
+
+
+def test_refills_buckets_over_time():
+    store = MemoryTokenBucketStore()
+
+    assert store.take("a", 2, rate=100, capacity=2) == 0
+    assert store.take("a", 2, rate=100, capacity=2) > 0
+    time.sleep(0.03)
+    assert store.take("a", 2, rate=100, capacity=2) == 0
+
+
+def test_shares_buckets_between_processes_in_sqlite(tmp_path):
+    path = str(tmp_path / "buckets.sqlite")
+    worker = RateLimit(rate=0.001, burst=2, store=SQLiteTokenBucketStore(path))
+    other_worker = RateLimit(rate=0.001, burst=2, store=SQLiteTokenBucketStore(path))
+
+    worker.charge("a", 1)
+    other_worker.charge("a", 1)
+    with pytest.raises(HttpQueryError):
+        worker.charge("a", 1)
+    other_worker.charge("b", 2)
+
+
+class Gate:
+    def __init__(self):
+        self.entered = Event()
+        self.release = Event()
+
+    def resolve(self, *_args):
+        self.entered.set()
+        assert self.release.wait(5)
+        return "done"
+
+
+def create_gated_app(gate, concurrency_limit, view_class=None):
+    schema = GraphQLSchema(
+        GraphQLObjectType(
+            "Query", {"wait": GraphQLField(GraphQLString, resolve=gate.resolve)}
+        )
+    )
+    kwargs = {"view_class": view_class} if view_class else {}
+    return create_app(schema=schema, concurrency_limit=concurrency_limit, **kwargs)
+
+
+@pytest.mark.parametrize("view_class", [None, AsyncGraphQLView])
+def test_rejects_requests_over_the_concurrency_limit(view_class):
+    gate = Gate()
+    app = create_gated_app(gate, 1, view_class)
+
+    with ThreadPoolExecutor(1) as executor:
+        first = executor.submit(post, app, {"query": "{ wait }"})
+        assert gate.entered.wait(5)
+        response = post(app, {"query": "{ wait }"})
+        gate.release.set()
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response_json(response)["errors"][0]["message"] == (
+        "Too many operations are being executed, try again later."
+    )
+    assert response_json(first.result()) == {"data": {"wait": "done"}}
+    assert post(app, {"query": "{ wait }"}).status_code == 200
+
+
+def test_queues_requests_up_to_the_limit():
+    gate = Gate()
+    limit = ConcurrencyLimit(1, max_waiting=1, timeout=5)
+    app = create_gated_app(gate, limit)
+
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(post, app, {"query": "{ wait }"})
+        assert gate.entered.wait(5)
+        second = executor.submit(post, app, {"query": "{ wait }"})
+        deadline = time.monotonic() + 5
+        while limit.waiting < 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+        third = post(app, {"query": "{ wait }"})
+        gate.release.set()
+
+    assert third.status_code == 429
+    assert first.result().status_code == 200
+    assert second.result().status_code == 200
+    assert (limit.running, limit.waiting) == (0, 0)
+
+
+def test_releases_slots_acquired_for_cancelled_tasks():
+    limit = ConcurrencyLimit(1, max_waiting=1, timeout=5)
+
+    async def cancel_waiting_task():
+        task = asyncio.ensure_future(limit.acquire_async())
+        while limit.waiting < 1:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        limit.release()
+
+    limit.acquire()
+    asyncio.run(cancel_waiting_task())
+
+    deadline = time.monotonic() + 5
+    while limit.running or limit.waiting:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    assert limit.running == 0
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from flask_graphql import AsyncGraphQLView
+
+from .app import create_app
+from .schema import AsyncSchema
+from .test_graphqlview import response_json, url_string
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(view_class=AsyncGraphQLView, schema=AsyncSchema)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_awaits_async_resolvers(app, client):
+    response = client.get(url_string(app, query="{a,b,c}"))
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"a": "hey", "b": "hey2", "c": "hey3"}}
+
+
+def test_passes_request_into_context(app, client):
+    response = client.get(url_string(app, query="{request}", q="testing"))
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"request": "testing"}}
+
+
+def test_reports_validation_errors(app, client):
+    response = client.get(url_string(app, query="{ unknown }"))
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Cannot query field 'unknown' on type 'AsyncQueryType'."
+    )
+
+
+class AsyncContextView(AsyncGraphQLView):
+    async def get_context(self):
+        context = super(AsyncContextView, self).get_context()
+        context["session"] = "async session"
+        return context
+
+
+@pytest.mark.parametrize(
+    "app", [create_app(view_class=AsyncContextView, schema=AsyncSchema)]
+)
+def test_awaits_async_get_context(app, client):
+    response = client.get(url_string(app, query="{session}"))
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"session": "async session"}}
+
+
+@pytest.mark.parametrize(
+    "app",
+    [
+        create_app(
+            view_class=AsyncGraphQLView,
+            schema=AsyncSchema,
+            batch=True,
+            batch_concurrency=2,
+        )
+    ],
+)
+def test_batch_runs_on_event_loop(app, client):
+    response = client.post(
+        url_string(app, q="testing"),
+        data=json.dumps(
+            [dict(query="{a}"), dict(query="{b}"), dict(query="{request}")]
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == [
+        {"data": {"a": "hey"}},
+        {"data": {"b": "hey2"}},
+        {"data": {"request": "testing"}},
+    ]
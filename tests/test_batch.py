@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from flask_graphql.batch import execute_batch
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+executor = ThreadPoolExecutor(4)
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(batch=True, batch_executor=executor, max_batch_size=3)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_batch_results_keep_request_order(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps(
+            [
+                dict(query='{test(who: "One")}'),
+                dict(query='{test(who: "Two")}'),
+                dict(query='{test(who: "Three")}'),
+            ]
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == [
+        {"data": {"test": "Hello One"}},
+        {"data": {"test": "Hello Two"}},
+        {"data": {"test": "Hello Three"}},
+    ]
+
+
+def test_batch_resolvers_can_access_request(app, client):
+    response = client.post(
+        url_string(app, q="testing"),
+        data=json.dumps([dict(query="{request}"), dict(query="{request}")]),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == [
+        {"data": {"request": "testing"}},
+        {"data": {"request": "testing"}},
+    ]
+
+
+def test_batch_with_mutation_is_executed(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps(
+            [
+                dict(query="mutation TestMutation { writeTest { test } }"),
+                dict(query="{test}"),
+            ]
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == [
+        {"data": {"writeTest": {"test": "Hello World"}}},
+        {"data": {"test": "Hello World"}},
+    ]
+
+
+def test_rejects_batch_exceeding_max_batch_size(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps([dict(query="{test}")] * 4),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        "errors": [
+            {
+                "message": "Batch GraphQL requests may contain at most 3 operations.",
+                "locations": None,
+                "path": None,
+            }
+        ]
+    }
+
+
+def test_execute_batch_limits_concurrency():
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def call(index):
+        with lock:
+            running.append(index)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(index)
+        return index
+
+    calls = [lambda index=index: call(index) for index in range(8)]
+    results = execute_batch(calls, executor, max_concurrency=2)
+
+    assert results == list(range(8))
+    assert max(peak) <= 2
+
+
+def test_execute_batch_releases_slots_when_submit_fails(monkeypatch):
+    semaphores = []
+
+    class RecordingSemaphore(threading.BoundedSemaphore):
+        def __init__(self, value):
+            super().__init__(value)
+            semaphores.append(self)
+
+    monkeypatch.setattr("flask_graphql.batch.BoundedSemaphore", RecordingSemaphore)
+    stopped = ThreadPoolExecutor(1)
+    stopped.shutdown()
+
+    with pytest.raises(RuntimeError):
+        execute_batch([lambda: 1], stopped, max_concurrency=1)
+
+    # The slot is free again, so it can be acquired without blocking.
+    assert semaphores[0].acquire(blocking=False)
@@ -0,0 +1,193 @@
+import json
+from io import BytesIO
+
+import pytest
+from graphql_server import HttpQueryError
+
+from flask_graphql.body import (iter_body, iter_json_array,
+                                load_json_body_stream)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(
+        batch=True,
+        max_batch_size=3,
+        max_body_size=1000,
+        max_query_length=100,
+        max_variables_size=50,
+    )
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_accepts_requests_within_limits(app, client):
+    response = client.post(
+        url_string(app),
+        json={
+            "query": "query helloWho($who: String){ test(who: $who) }",
+            "variables": {"who": "Dolly"},
+        },
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"test": "Hello Dolly"}}
+
+
+def test_accepts_batches_within_limits(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps([{"query": "{ test }"}] * 3, indent=2),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == [{"data": {"test": "Hello World"}}] * 3
+
+
+def test_rejects_large_bodies(app, client):
+    query = "{ %s }" % ("test " * 300)
+
+    for content_type in ("application/json", "application/graphql"):
+        data = json.dumps({"query": query}) if "json" in content_type else query
+        response = client.post(url_string(app), data=data, content_type=content_type)
+        assert response.status_code == 413
+        assert response_json(response) == {
+            "errors": [
+                {
+                    "message": "Request body is too large, the limit is 1000 bytes.",
+                    "locations": None,
+                    "path": None,
+                }
+            ]
+        }
+
+
+@pytest.mark.parametrize("limits", [{}, {"max_body_size": 1000}])
+def test_rejects_graphql_bodies_that_are_not_utf8(limits):
+    app = create_app(**limits)
+
+    response = app.test_client().post(
+        url_string(app),
+        data=b'{ test(who: "\xff") }',
+        content_type="application/graphql",
+    )
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "POST body sent invalid UTF-8."
+    )
+
+
+def test_rejects_large_bodies_without_content_length(app, client):
+    body = json.dumps({"query": "{ %s }" % ("test " * 300)}).encode()
+    response = client.post(
+        url_string(app),
+        input_stream=BytesIO(body),
+        content_type="application/json",
+        environ_overrides={"wsgi.input_terminated": True},
+    )
+
+    assert response.status_code == 413
+
+
+def test_rejects_large_form_bodies(app, client):
+    response = client.post(url_string(app), data={"query": "{ %s }" % ("test " * 300)})
+
+    assert response.status_code == 413
+
+
+def test_rejects_long_queries(app, client):
+    query = "{ %s }" % ("test " * 30)
+    for response in (
+        client.get(url_string(app, query=query)),
+        client.post(url_string(app), json={"query": query}),
+        client.post(url_string(app), data={"query": query}),
+    ):
+        assert response.status_code == 400
+        assert response_json(response) == {
+            "errors": [
+                {
+                    "message": "The query is too long, the limit is 100 characters.",
+                    "locations": None,
+                    "path": None,
+                }
+            ]
+        }
+
+
+def test_rejects_large_variables(app, client):
+    query = "query helloWho($who: String){ test(who: $who) }"
+    variables = {"who": "x" * 60}
+    for response in (
+        client.get(url_string(app, query=query, variables=json.dumps(variables))),
+        client.post(url_string(app), json={"query": query, "variables": variables}),
+        client.post(url_string(app), json=[dict(query=query, variables=variables)]),
+    ):
+        assert response.status_code == 400
+        assert response_json(response) == {
+            "errors": [
+                {
+                    "message": "The variables are too large, the limit is 50 bytes.",
+                    "locations": None,
+                    "path": None,
+                }
+            ]
+        }
+
+
+def test_rejects_large_batches_while_reading():
+    chunks = [b'[{"query": "{ test }"}', b', {"query": "{ test }"}']
+
+    def body():
+        yield from chunks
+        raise AssertionError("The rest of the body should not be read.")
+
+    with pytest.raises(HttpQueryError) as exc_info:
+        load_json_body_stream(body(), batch_enabled=True, max_batch_size=1)
+
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.message == (
+        "Batch GraphQL requests may contain at most 1 operations."
+    )
+
+
+def test_rejects_batches_when_disabled():
+    with pytest.raises(HttpQueryError) as exc_info:
+        load_json_body_stream([b' [{"query": "{ test }"}]'])
+
+    assert exc_info.value.message == "Batch GraphQL requests are not enabled."
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 1000])
+def test_decodes_arrays_split_at_any_position(chunk_size):
+    items = [{"query": "{ test }", "variables": {"n": 12345}}, 67890, "ünïcødé", []]
+    data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+    chunks = iter_body(BytesIO(data), chunk_size=chunk_size)
+
+    decoded = list(iter_json_array(chunks))
+
+    assert [item for item, _size in decoded] == items
+    assert [size for _item, size in decoded] == [
+        len(json.dumps(item, ensure_ascii=False)) for item in items
+    ]
+
+
+@pytest.mark.parametrize(
+    "body", [b"[1,]", b"[1 2]", b"[1", b"[", b"[1] x", b"[\xff]", b'{"query"']
+)
+def test_rejects_invalid_json(body):
+    with pytest.raises(HttpQueryError) as exc_info:
+        load_json_body_stream([body], batch_enabled=True)
+
+    assert exc_info.value.message == "POST body sent invalid JSON."
@@ -0,0 +1,94 @@
+import pytest
+
+from flask_graphql import DocumentCache
+from flask_graphql.cache import make_document_cache
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+document_cache = DocumentCache(maxsize=2)
+
+
+@pytest.fixture
+def app(request):
+    document_cache.clear()
+    app = create_app(document_cache=document_cache)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = DocumentCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.info() == (1, 1, 1, 2, 2)
+
+
+def test_lru_cache_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        DocumentCache(maxsize=0)
+
+
+def test_reuses_parsed_document(app, client):
+    for _ in range(3):
+        response = client.get(url_string(app, query="{test}"))
+        assert response.status_code == 200
+        assert response_json(response) == {"data": {"test": "Hello World"}}
+
+    assert document_cache.info() == (2, 1, 0, 2, 1)
+
+
+def test_caches_validation_errors(app, client):
+    for _ in range(2):
+        response = client.get(url_string(app, query="{ unknownOne }"))
+        assert response.status_code == 400
+        assert response_json(response) == {
+            "errors": [
+                {
+                    "message": "Cannot query field 'unknownOne' on type 'QueryRoot'.",
+                    "locations": [{"line": 1, "column": 3}],
+                    "path": None,
+                }
+            ]
+        }
+
+    assert document_cache.hits == 1
+
+
+def test_caches_syntax_errors(app, client):
+    for _ in range(2):
+        response = client.get(url_string(app, query="syntaxerror"))
+        assert response.status_code == 400
+
+    assert document_cache.hits == 1
+
+
+def test_cached_mutation_is_still_rejected_via_get(app, client):
+    query = "mutation TestMutation { writeTest { test } }"
+    response = client.post(url_string(app, query=query))
+    assert response.status_code == 200
+
+    response = client.get(url_string(app, query=query))
+    assert response.status_code == 405
+    assert document_cache.hits == 1
+
+
+def test_make_document_cache_from_view_option():
+    assert make_document_cache(None) is None
+    assert make_document_cache(False) is None
+    assert make_document_cache(True).maxsize == 1024
+    assert make_document_cache(10).maxsize == 10
+    assert make_document_cache(document_cache) is document_cache
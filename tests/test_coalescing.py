@@ -0,0 +1,263 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+import pytest
+
+from flask_graphql import AsyncGraphQLView
+from flask_graphql.coalescing import SingleFlight
+from graphql import (GraphQLArgument, GraphQLField, GraphQLInt,
+                     GraphQLObjectType, GraphQLSchema, GraphQLString)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+        self.lock = Lock()
+        self.release = Event()
+
+    def resolve(self, _root, _info, who="World"):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        assert self.release.wait(5)
+        return f"Hello {who} #{calls}"
+
+    async def resolve_async(self, root, info, who="World"):
+        return self.resolve(root, info, who)
+
+    def resolve_count(self, root, info):
+        self.resolve(root, info)
+        return self.calls
+
+
+def create_schema(counter, resolve):
+    field = GraphQLField(
+        GraphQLString, args={"who": GraphQLArgument(GraphQLString)}, resolve=resolve
+    )
+    return GraphQLSchema(
+        query=GraphQLObjectType("Query", {"hello": field}),
+        mutation=GraphQLObjectType(
+            "Mutation",
+            {"count": GraphQLField(GraphQLInt, resolve=counter.resolve_count)},
+        ),
+    )
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def counter():
+    return Counter()
+
+
+@pytest.fixture
+def single_flight():
+    return SingleFlight()
+
+
+@pytest.fixture
+def app(counter, single_flight):
+    return create_app(
+        schema=create_schema(counter, counter.resolve),
+        coalesce_queries=single_flight,
+        coalesce_vary=lambda: None,
+    )
+
+
+def post_concurrently(app, bodies, ready, release):
+    """Post the bodies in parallel and release the resolvers once all are ready."""
+    with ThreadPoolExecutor(len(bodies)) as executor:
+        futures = [
+            executor.submit(app.test_client().post, url_string(app), json=body)
+            for body in bodies
+        ]
+        try:
+            wait_until(ready)
+        finally:
+            release.set()
+        return [future.result() for future in futures]
+
+
+def test_coalesces_identical_queries(app, counter, single_flight):
+    responses = post_concurrently(
+        app,
+        [{"query": "{ hello }"}] * 5,
+        lambda: counter.calls == 1 and single_flight.coalesced == 4,
+        counter.release,
+    )
+
+    for response in responses:
+        assert response_json(response) == {"data": {"hello": "Hello World #1"}}
+    assert counter.calls == 1
+    assert len(single_flight) == 0
+
+
+def test_executes_different_variables_separately(app, counter, single_flight):
+    query = "query Q($who: String) { hello(who: $who) }"
+    responses = post_concurrently(
+        app,
+        [{"query": query, "variables": {"who": who}} for who in ("A", "B", "A")],
+        lambda: counter.calls == 2 and single_flight.coalesced == 1,
+        counter.release,
+    )
+
+    results = sorted(response_json(r)["data"]["hello"] for r in responses)
+    assert results[0] == results[1]
+    assert counter.calls == 2
+
+
+def test_never_coalesces_mutations(app, counter, single_flight):
+    responses = post_concurrently(
+        app,
+        [{"query": "mutation { count }"}] * 3,
+        lambda: counter.calls == 3,
+        counter.release,
+    )
+
+    for response in responses:
+        assert response.status_code == 200
+    assert single_flight.coalesced == 0
+
+
+def test_vary_separates_queries(counter):
+    single_flight = SingleFlight()
+    app = create_app(
+        schema=create_schema(counter, counter.resolve),
+        coalesce_queries=single_flight,
+        coalesce_vary=lambda: time.monotonic(),
+    )
+
+    post_concurrently(
+        app,
+        [{"query": "{ hello }"}, {"query": "{ hello }"}],
+        lambda: counter.calls == 2,
+        counter.release,
+    )
+
+    assert single_flight.coalesced == 0
+
+
+def test_does_not_coalesce_queries_without_vary(counter, single_flight):
+    app = create_app(
+        schema=create_schema(counter, counter.resolve), coalesce_queries=single_flight
+    )
+
+    post_concurrently(
+        app,
+        [{"query": "{ hello }"}, {"query": "{ hello }"}],
+        lambda: counter.calls == 2,
+        counter.release,
+    )
+
+    assert single_flight.coalesced == 0
+
+
+def test_coalesces_queries_of_async_views(counter, single_flight):
+    app = create_app(
+        view_class=AsyncGraphQLView,
+        schema=create_schema(counter, counter.resolve_async),
+        coalesce_queries=single_flight,
+        coalesce_vary=lambda: None,
+    )
+
+    responses = post_concurrently(
+        app,
+        [{"query": "{ hello }"}] * 3,
+        lambda: counter.calls == 1 and single_flight.coalesced == 2,
+        counter.release,
+    )
+
+    for response in responses:
+        assert response_json(response) == {"data": {"hello": "Hello World #1"}}
+
+
+def test_shares_results_on_one_event_loop():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        return await asyncio.gather(
+            *(single_flight.do("key", execute, run_sync=False) for _ in range(3))
+        )
+
+    assert asyncio.run(run()) == [1, 1, 1]
+    assert single_flight.coalesced == 2
+
+
+def test_shares_errors_with_waiting_calls():
+    single_flight = SingleFlight()
+    started = Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(2) as executor:
+        first = executor.submit(single_flight.do, "key", fail)
+        started.wait(5)
+        second = executor.submit(single_flight.do, "key", fail)
+        for future in (first, second):
+            with pytest.raises(ValueError):
+                future.result()
+
+    assert len(single_flight) == 0
+
+
+def test_executes_calls_that_waited_too_long():
+    single_flight = SingleFlight(timeout=0.01)
+    started, release = Event(), Event()
+
+    def execute():
+        if not started.is_set():
+            started.set()
+            assert release.wait(5)
+            return "first"
+        return "second"
+
+    with ThreadPoolExecutor(1) as executor:
+        first = executor.submit(single_flight.do, "key", execute)
+        assert started.wait(5)
+        assert single_flight.do("key", execute) == "second"
+        release.set()
+        assert first.result() == "first"
+
+    assert (single_flight.coalesced, single_flight.timed_out) == (1, 1)
+
+
+def test_executes_async_calls_that_waited_too_long():
+    single_flight = SingleFlight(timeout=0.01)
+    release = Event()
+
+    def hang():
+        assert release.wait(5)
+
+    async def execute():
+        return "second"
+
+    async def run():
+        return await single_flight.do("key", execute, run_sync=False)
+
+    with ThreadPoolExecutor(1) as executor:
+        first = executor.submit(single_flight.do, "key", hang)
+        wait_until(lambda: len(single_flight) == 1)
+        assert asyncio.run(run()) == "second"
+        release.set()
+        first.result()
+
+    assert single_flight.timed_out == 1
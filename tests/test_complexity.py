@@ -0,0 +1,193 @@
+import pytest
+
+from flask_graphql import DocumentCache
+from flask_graphql.admission import RateLimit
+from flask_graphql.complexity import calculate_query_cost, default_field_cost
+from graphql.language import parse
+
+from .app import create_app
+from .schema import Schema
+from .test_graphqlview import response_json, url_string
+
+document_cache = DocumentCache()
+field_costs = []
+
+
+def field_cost(parent_type, field_name, args, child_complexity):
+    field_costs.append((parent_type.name, field_name, args))
+    if field_name == "test" and args.get("who") == "everyone":
+        return 100
+    return default_field_cost(parent_type, field_name, args, child_complexity)
+
+
+@pytest.fixture
+def app(request):
+    document_cache.clear()
+    field_costs.clear()
+    app = create_app(
+        document_cache=document_cache,
+        max_depth=2,
+        max_complexity=10,
+        field_cost=field_cost,
+    )
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_calculates_depth_and_complexity():
+    document = parse(
+        """
+        query Q { test context { session ...Request } }
+        fragment Request on context { request ... on context { session } }
+        """
+    )
+
+    assert calculate_query_cost(Schema, document) == (2, 5)
+
+
+def test_counts_fragments_spread_several_times_once_per_spread():
+    document = parse(
+        """
+        { context { ...Fields ...Fields } }
+        fragment Fields on context { session request }
+        """
+    )
+
+    assert calculate_query_cost(Schema, document) == (2, 5)
+
+
+def test_counts_introspection_fields_except_typename():
+    document = parse(
+        """
+        { __typename __schema { types { fields { name } } } __type(name: "A") { kind } }
+        """
+    )
+
+    assert calculate_query_cost(Schema, document) == (4, 6)
+
+
+def test_selects_operation_by_name():
+    document = parse("query A { test } mutation B { writeTest { test thrower } }")
+
+    assert calculate_query_cost(Schema, document, "B") == (2, 3)
+    assert calculate_query_cost(Schema, document, "C") is None
+
+
+def test_allows_queries_within_limits(app, client):
+    response = client.get(url_string(app, query="{ context { session } }"))
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"context": {"session": None}}}
+
+
+def test_rejects_too_deep_queries(app, client):
+    query = "mutation { writeTest { context { session } } }"
+    response = client.post(url_string(app), data={"query": query})
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        "errors": [
+            {
+                "message": "Query depth of 3 exceeds the maximum allowed depth of 2.",
+                "locations": None,
+                "path": None,
+                "extensions": {"code": "QUERY_TOO_DEEP"},
+            }
+        ]
+    }
+
+
+def test_rejects_too_complex_queries_before_execution(app, client):
+    response = client.get(url_string(app, query='{ thrower test(who: "everyone") }'))
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        "errors": [
+            {
+                "message": "Query complexity of 101 exceeds"
+                " the maximum allowed complexity of 10.",
+                "locations": None,
+                "path": None,
+                "extensions": {"code": "QUERY_TOO_COMPLEX"},
+            }
+        ]
+    }
+
+
+@pytest.mark.parametrize("introspection_cache", [False, True])
+def test_rejects_too_deep_introspection_queries(introspection_cache):
+    app = create_app(max_depth=2, introspection_cache=introspection_cache)
+    query = "{ __schema { types { fields { name } } } }"
+
+    response = app.test_client().get(url_string(app, query=query))
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Query depth of 4 exceeds the maximum allowed depth of 2."
+    )
+
+
+def test_passes_arguments_given_as_variables(app, client):
+    query = "query($who: String) { a: test(who: $who) b: test(who: \"you\") }"
+    response = client.get(url_string(app, query=query, variables='{"who": "you"}'))
+    assert response.status_code == 200
+
+    response = client.get(
+        url_string(app, query=query, variables='{"who": "everyone"}')
+    )
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Query complexity of 101 exceeds the maximum allowed complexity of 10."
+    )
+
+    assert field_costs == [
+        ("QueryRoot", "test", {"who": "you"}),
+        ("QueryRoot", "test", {"who": "you"}),
+        ("QueryRoot", "test", {"who": "everyone"}),
+        ("QueryRoot", "test", {"who": "you"}),
+    ]
+
+
+def test_charges_rate_limit_with_cost_of_variables():
+    field_costs.clear()
+    rate_limit = RateLimit(rate=0.001, burst=100)
+    app = create_app(
+        max_complexity=1000, field_cost=field_cost, rate_limit=rate_limit
+    )
+    query = "query($who: String) { test(who: $who) }"
+    client = app.test_client()
+
+    response = client.get(
+        url_string(app, query=query, variables='{"who": "everyone"}')
+    )
+    assert response.status_code == 200
+    assert field_costs == [("QueryRoot", "test", {"who": "everyone"})]
+
+    response = client.get(url_string(app, query=query, variables='{"who": "you"}'))
+    assert response.status_code == 429
+
+
+def test_uses_default_values_of_variables():
+    query = 'query($who: String = "everyone") { test(who: $who) }'
+    document = parse(query)
+
+    assert calculate_query_cost(Schema, document, field_cost=field_cost) == (1, 100)
+    assert calculate_query_cost(
+        Schema, document, field_cost=field_cost, variables={"who": "you"}
+    ) == (1, 1)
+
+
+def test_caches_cost_with_document(app, client):
+    for _ in range(3):
+        response = client.get(url_string(app, query="{ test }"))
+        assert response.status_code == 200
+
+    assert len(field_costs) == 1
+    assert document_cache.info().hits == 2
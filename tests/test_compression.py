@@ -0,0 +1,141 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from werkzeug.datastructures import Accept
+
+from flask_graphql.compression import (GzipCodec, available_codecs,
+                                       iter_compress, make_codecs,
+                                       negotiate_codec)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+LARGE_QUERY = "{ %s }" % " ".join(f"a{i}: test" for i in range(100))
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(compression=["gzip"], http_caching=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_compresses_large_responses(app, client):
+    response = client.get(
+        url_string(app, query=LARGE_QUERY), headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    result = json.loads(gzip.decompress(response.data))
+    assert result["data"]["a99"] == "Hello World"
+
+
+def test_does_not_compress_small_responses(app, client):
+    response = client.get(
+        url_string(app, query="{ test }"), headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+
+
+def test_does_not_compress_unless_accepted(app, client):
+    for accept_encoding in (None, "identity", "gzip;q=0"):
+        headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+        response = client.get(url_string(app, query=LARGE_QUERY), headers=headers)
+        assert "Content-Encoding" not in response.headers
+
+
+def test_does_not_compress_errors(app, client):
+    query = "{ %s }" % " ".join(f"a{i}: unknown" for i in range(100))
+    response = client.get(
+        url_string(app, query=query), headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 400
+    assert "Content-Encoding" not in response.headers
+
+
+def test_revalidates_compressed_responses_with_weak_etag(app, client):
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get(url_string(app, query=LARGE_QUERY), headers=headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/")
+
+    headers["If-None-Match"] = etag
+    response = client.get(url_string(app, query=LARGE_QUERY), headers=headers)
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize(
+    "app", [create_app(compression=True, stream_response=True, batch=True)]
+)
+def test_compresses_streamed_responses(app, client):
+    response = client.post(
+        url_string(app),
+        json=[{"query": "{ test }"}] * 3,
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert json.loads(gzip.decompress(response.data)) == [
+        {"data": {"test": "Hello World"}}
+    ] * 3
+
+
+def test_negotiates_best_accepted_codec():
+    codecs = make_codecs(["br", "zstd", "gzip", "unknown"])
+    available = available_codecs()
+    assert [codec.name for codec in codecs] == list(available)
+
+    accept = Accept([("gzip", 1), ("br", 0.5)])
+    assert negotiate_codec(codecs, accept).name == "gzip"
+    accept = Accept([("*", 1)])
+    assert negotiate_codec(codecs, accept) is codecs[0]
+    assert negotiate_codec(codecs, Accept([("deflate", 1)])) is None
+
+
+def test_streamed_chunks_are_flushed():
+    chunks = iter_compress(iter([b"first ", b"second"]), GzipCodec(), 9)
+
+    first = next(chunks)
+    decompressor = zlib.decompressobj(31)
+    assert decompressor.decompress(first) == b"first "
+    assert decompressor.decompress(b"".join(chunks)) == b"second"
+
+
+@pytest.mark.parametrize("name", ["br", "zstd"])
+def test_optional_codecs_round_trip(name):
+    if name not in available_codecs():
+        pytest.skip(f"{name} is not installed")
+    codec = available_codecs()[name]
+    data = b'{"data": "%s"}' % (b"x" * 10000)
+
+    compressed = codec.compress(data)
+    streamed = b"".join(iter_compress([data[:5000], data[5000:]], codec))
+
+    if name == "br":
+        import brotli
+
+        assert brotli.decompress(compressed) == data
+        assert brotli.decompress(streamed) == data
+    else:
+        import zstandard
+
+        decompressor = zstandard.ZstdDecompressor()
+        assert decompressor.decompress(compressed) == data
+        assert decompressor.decompressobj().decompress(streamed) == data
@@ -0,0 +1,170 @@
+import asyncio
+import json
+
+import pytest
+
+from flask_graphql import AsyncGraphQLView, DataLoader, GraphQLView
+from graphql.type.definition import (GraphQLArgument, GraphQLField,
+                                     GraphQLList, GraphQLObjectType)
+from graphql.type.scalars import GraphQLInt, GraphQLString
+from graphql.type.schema import GraphQLSchema
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+batches = []
+
+
+def load_users(ids):
+    batches.append(sorted(ids))
+    return [{"id": user_id, "friend_id": user_id + 1} for user_id in ids]
+
+
+class AsyncUserLoader(DataLoader):
+    async def batch_load_fn(self, ids):
+        await asyncio.sleep(0)
+        return load_users(ids)
+
+
+UserType = GraphQLObjectType(
+    name="User",
+    fields=lambda: {
+        "id": GraphQLField(GraphQLInt),
+        "friend": GraphQLField(
+            UserType,
+            resolve=lambda user, info: info.context["loaders"]["user"].load(
+                user["friend_id"]
+            ),
+        ),
+    },
+)
+
+LoaderSchema = GraphQLSchema(
+    GraphQLObjectType(
+        name="Query",
+        fields={
+            "users": GraphQLField(
+                GraphQLList(UserType),
+                args={"ids": GraphQLArgument(GraphQLList(GraphQLInt))},
+                resolve=lambda obj, info, ids: info.context["loaders"][
+                    "user"
+                ].load_many(ids),
+            ),
+            "hello": GraphQLField(GraphQLString, resolve=lambda *_: "world"),
+        },
+    )
+)
+
+QUERY = "{ users(ids: [1, 2, 3]) { id friend { id friend { id } } } }"
+EXPECTED = {
+    "data": {
+        "users": [
+            {"id": 1, "friend": {"id": 2, "friend": {"id": 3}}},
+            {"id": 2, "friend": {"id": 3, "friend": {"id": 4}}},
+            {"id": 3, "friend": {"id": 4, "friend": {"id": 5}}},
+        ]
+    }
+}
+
+
+@pytest.fixture
+def app(request):
+    batches.clear()
+    app = create_app(schema=LoaderSchema, loaders={"user": load_users}, batch=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_batches_loads_per_level(app, client):
+    response = client.get(url_string(app, query=QUERY))
+
+    assert response.status_code == 200
+    assert response_json(response) == EXPECTED
+    # Keys that were already loaded come from the cache of the request.
+    assert batches == [[1, 2, 3], [4], [5]]
+
+
+def test_loaders_are_request_scoped(app, client):
+    client.get(url_string(app, query="{ users(ids: [1]) { id } }"))
+    client.get(url_string(app, query="{ users(ids: [1]) { id } }"))
+
+    assert batches == [[1], [1]]
+
+
+def test_loader_cache_is_shared_by_batch_operations(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps(
+            [
+                dict(query="{ users(ids: [1, 2]) { id } }"),
+                dict(query="{ users(ids: [2, 3]) { id } }"),
+            ]
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert batches == [[1, 2, 3]]
+
+
+@pytest.mark.parametrize(
+    "view_class, loaders",
+    [
+        (GraphQLView, {"user": AsyncUserLoader}),
+        (AsyncGraphQLView, {"user": load_users}),
+    ],
+)
+def test_loaders_work_with_both_views(view_class, loaders):
+    batches.clear()
+    app = create_app(view_class=view_class, schema=LoaderSchema, loaders=loaders)
+    with app.test_request_context():
+        response = app.test_client().get(url_string(app, query=QUERY))
+
+    assert response_json(response) == EXPECTED
+    assert batches == [[1, 2, 3], [4], [5]]
+
+
+def test_dataloader_reports_errors_per_key():
+    def load(keys):
+        return [ValueError(f"No {key}") if key == 2 else key for key in keys]
+
+    async def main():
+        loader = DataLoader(load)
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+        return results
+
+    one, two = asyncio.run(main())
+    assert one == 1
+    assert isinstance(two, ValueError)
+
+
+def test_dataloader_rejects_wrong_number_of_values():
+    async def load_one():
+        return await DataLoader(lambda keys: []).load(1)
+
+    with pytest.raises(TypeError):
+        asyncio.run(load_one())
+
+
+def test_dataloader_splits_batches_by_max_batch_size():
+    calls = []
+
+    def load(keys):
+        calls.append(keys)
+        return keys
+
+    async def main():
+        loader = DataLoader(load, max_batch_size=2)
+        return await loader.load_many([1, 2, 3])
+
+    assert asyncio.run(main()) == [1, 2, 3]
+    assert calls == [[1, 2], [3]]
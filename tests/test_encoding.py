@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from flask_graphql.encoding import (iter_json_encode, json_encode_bytes,
+                                    orjson, orjson_encode, stdlib_json_encode,
+                                    ujson, ujson_encode)
+
+from .app import create_app
+from .test_graphqlview import url_string
+
+encoders = [stdlib_json_encode]
+if orjson is not None:
+    encoders.append(orjson_encode)
+if ujson is not None:
+    encoders.append(ujson_encode)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+DATA = {"data": {"items": [{"name": "Ünïcødé", "n": 1, "x": 1.5, "ok": True}]}}
+
+
+@pytest.mark.parametrize("encode", encoders)
+def test_encoders_return_utf8_bytes(encode):
+    encoded = encode(DATA)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded.decode("utf-8")) == DATA
+    assert "Ünïcødé".encode("utf-8") in encoded
+
+
+@pytest.mark.parametrize("encode", [stdlib_json_encode] + encoders[1:2])
+def test_encoders_pretty_print(encode):
+    assert encode({"data": {"test": "Hello World"}}, pretty=True) == (
+        b"{\n" b'  "data": {\n' b'    "test": "Hello World"\n' b"  }\n" b"}"
+    )
+
+
+def test_falls_back_to_stdlib_for_big_integers():
+    assert json_encode_bytes({"n": 2 ** 70}) == b'{"n":1180591620717411303424}'
+
+
+@pytest.mark.parametrize("app", [create_app()])
+def test_view_sends_encoded_bytes(app, client):
+    response = client.get(url_string(app, query="{test}"))
+
+    assert response.data == b'{"data":{"test":"Hello World"}}'
+    assert response.content_length == len(response.data)
+
+
+@pytest.mark.parametrize("encode", encoders)
+def test_iter_json_encode_matches_buffered_encoding(encode):
+    data = {"data": {"items": [{"id": n, "tags": ["a", "b"]} for n in range(100)]}}
+    chunks = list(iter_json_encode(data, encode, chunk_size=256))
+
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks).decode("utf-8")) == data
+
+
+def test_iter_json_encode_walks_nested_lists_and_iterators():
+    encoded = []
+
+    def encode(data):
+        encoded.append(data)
+        return json.dumps(data, separators=(",", ":"))
+
+    results = ({"data": {"items": [[{"id": n}], [1, 2]]}} for n in range(2))
+    chunks = iter_json_encode(results, encode)
+
+    assert b"".join(chunks) == (
+        b'[{"data":{"items":[[{"id":0}],[1,2]]}},{"data":{"items":[[{"id":1}],[1,2]]}}]'
+    )
+    assert [value for value in encoded if not isinstance(value, str)] == [
+        {"id": 0},
+        [1, 2],
+        {"id": 1},
+        [1, 2],
+    ]
+
+
+def test_iter_json_encode_accepts_str_encoders():
+    chunks = iter_json_encode([{"a": None}, "b"], json.dumps)
+
+    assert b"".join(chunks) == b'[{"a": null},"b"]'
+
+
+@pytest.mark.parametrize("app", [create_app(stream_response=True, batch=True)])
+def test_view_streams_response(app, client):
+    response = client.get(url_string(app, query="{test}"))
+
+    assert response.is_streamed
+    assert response.status_code == 200
+    assert response.data == b'{"data":{"test":"Hello World"}}'
+
+
+@pytest.mark.parametrize("app", [create_app(stream_response=True, batch=True)])
+def test_view_streams_batch_response(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps([dict(query="{test}"), dict(query="{ unknown }")]),
+        content_type="application/json",
+    )
+
+    assert response.is_streamed
+    assert response.status_code == 400
+    first, second = json.loads(response.data.decode())
+    assert first == {"data": {"test": "Hello World"}}
+    assert "errors" in second
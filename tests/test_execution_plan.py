@@ -0,0 +1,247 @@
+import asyncio
+from types import MappingProxyType
+
+import pytest
+
+from flask_graphql import DocumentCache, execution_plan
+from flask_graphql.execution_plan import ExecutionPlan
+from graphql import execute, parse
+from graphql.execution import ExecutionContext
+from graphql.type import (GraphQLArgument, GraphQLField, GraphQLInt,
+                          GraphQLList, GraphQLNonNull, GraphQLObjectType,
+                          GraphQLScalarType, GraphQLSchema, GraphQLString)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+arguments = []
+
+
+class Item:
+    def __init__(self, index):
+        self.index = index
+        self.name = f"item {index}"
+
+    def label(self, info, prefix="#"):
+        return f"{prefix}{self.index}"
+
+
+def resolve_item_tag(item, info, upper=False):
+    arguments.append(upper)
+    tag = f"tag{item.index}"
+    return tag.upper() if upper else tag
+
+
+async def resolve_later(item, info):
+    await asyncio.sleep(0)
+    return item.name
+
+
+ItemType = GraphQLObjectType(
+    "Item",
+    lambda: {
+        "index": GraphQLField(GraphQLNonNull(GraphQLInt)),
+        "name": GraphQLField(GraphQLString),
+        "label": GraphQLField(
+            GraphQLString, args={"prefix": GraphQLArgument(GraphQLString)}
+        ),
+        "tag": GraphQLField(
+            GraphQLString,
+            args={"upper": GraphQLArgument(GraphQLNonNull(GraphQLString))},
+            resolve=resolve_item_tag,
+        ),
+        "missing": GraphQLField(GraphQLNonNull(GraphQLString)),
+        "broken": GraphQLField(GraphQLInt),
+        "later": GraphQLField(GraphQLString, resolve=resolve_later),
+        "next": GraphQLField(ItemType, resolve=lambda item, info: Item(item.index + 1)),
+    },
+)
+
+PlanSchema = GraphQLSchema(
+    GraphQLObjectType(
+        "Query",
+        {
+            "items": GraphQLField(
+                GraphQLList(ItemType),
+                resolve=lambda *_: [Item(index) for index in range(3)],
+            ),
+            "data": GraphQLField(
+                GraphQLString, resolve=lambda *_: {"value": "from dict"}["value"]
+            ),
+        },
+    )
+)
+
+QUERY = """
+query Items($withName: Boolean!, $upper: String!) {
+  items {
+    ...ItemFields
+    name @include(if: $withName)
+    tag(upper: $upper)
+    label(prefix: "no. ")
+    next { index next { ...ItemFields } }
+  }
+}
+
+fragment ItemFields on Item {
+  index
+  label
+}
+"""
+
+
+def execute_both(document, variables=None, is_awaitable=None):
+    plan = ExecutionPlan(PlanSchema, document)
+    expected = execute(
+        PlanSchema, document, variable_values=variables, is_awaitable=is_awaitable
+    )
+    result = execute(
+        PlanSchema,
+        document,
+        variable_values=variables,
+        execution_context_class=plan.execution_context_class,
+        is_awaitable=is_awaitable,
+    )
+    return plan, expected, result
+
+
+@pytest.mark.parametrize("with_name", [True, False])
+def test_results_match_plain_execution(with_name):
+    document = parse(QUERY)
+    variables = {"withName": with_name, "upper": ""}
+
+    plan, expected, result = execute_both(document, variables)
+
+    assert result == expected
+    assert ("name" in result.data["items"][0]) == with_name
+    assert result.data["items"][1]["next"]["next"] == {"index": 3, "label": "#3"}
+
+
+def test_reuses_plan_between_executions():
+    document = parse(QUERY)
+    plan = ExecutionPlan(PlanSchema, document)
+    context_class = plan.execution_context_class
+
+    def run(with_name, upper):
+        return execute(
+            PlanSchema,
+            document,
+            variable_values={"withName": with_name, "upper": upper},
+            execution_context_class=context_class,
+        ).data
+
+    first = run(True, "")
+    fields = dict(plan.fields)
+    assert run(True, "") == first
+    assert plan.fields == fields
+    assert plan.condition_variables == ("withName",)
+
+    assert "name" not in run(False, "")["items"][0]
+    assert len(plan.fields) > len(fields)
+
+    arguments.clear()
+    assert run(True, "yes")["items"][0]["tag"] == "TAG0"
+    assert arguments == ["yes"] * 3
+
+
+def test_reports_errors_like_plain_execution():
+    document = parse("{ items { index broken missing } data }")
+
+    _plan, expected, result = execute_both(document)
+
+    assert result == expected
+    assert result.data == {"items": [None, None, None], "data": "from dict"}
+    assert result.errors[0].message == (
+        "Cannot return null for non-nullable field Item.missing."
+    )
+    assert result.errors[0].path == ["items", 0, "missing"]
+
+
+def test_resolves_leaf_fields_like_the_default_resolver():
+    NullableType = GraphQLScalarType("Nullable", serialize=lambda value: None)
+    RecordType = GraphQLObjectType(
+        "Record",
+        {
+            "name": GraphQLField(GraphQLString),
+            "nullable": GraphQLField(NullableType),
+            "required": GraphQLField(GraphQLNonNull(NullableType)),
+        },
+    )
+    schema = GraphQLSchema(
+        GraphQLObjectType(
+            "Query",
+            {
+                "record": GraphQLField(
+                    RecordType,
+                    resolve=lambda *_: MappingProxyType(
+                        {"name": "mapping", "nullable": 1, "required": 2}
+                    ),
+                )
+            },
+        )
+    )
+    document = parse("{ record { name nullable } other: record { required } }")
+    plan = ExecutionPlan(schema, document)
+
+    result = execute(
+        schema, document, execution_context_class=plan.execution_context_class
+    )
+
+    assert result == execute(schema, document)
+    assert result.data == {"record": {"name": "mapping", "nullable": None}, "other": None}
+    assert result.errors[0].message == (
+        "Cannot return null for non-nullable field Record.required."
+    )
+
+
+def test_uses_the_stock_execution_context_without_plan_support(monkeypatch):
+    monkeypatch.setattr(execution_plan, "PLANS_SUPPORTED", False)
+
+    plan = ExecutionPlan(PlanSchema, parse("{ data }"))
+
+    assert plan.execution_context_class is ExecutionContext
+
+
+def test_executes_async_resolvers():
+    document = parse("{ items { index later } }")
+    plan = ExecutionPlan(PlanSchema, document)
+
+    async def run():
+        return await execute(
+            PlanSchema, document, execution_context_class=plan.execution_context_class
+        )
+
+    result = asyncio.run(run())
+
+    assert result.errors is None
+    assert result.data["items"][2] == {"index": 2, "later": "item 2"}
+
+
+def test_executes_other_documents_as_usual():
+    plan = ExecutionPlan(PlanSchema, parse("{ data }"))
+
+    result = execute(
+        PlanSchema,
+        parse("{ items { index } }"),
+        execution_context_class=plan.execution_context_class,
+    )
+
+    assert result.data == {"items": [{"index": 0}, {"index": 1}, {"index": 2}]}
+    assert plan.fields == {}
+
+
+@pytest.fixture
+def app(request):
+    return create_app(document_cache=DocumentCache(), compile_queries=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_view_executes_compiled_queries(app, client):
+    for _ in range(2):
+        response = client.get(url_string(app, query='{ test(who: "Dolly") }'))
+        assert response.status_code == 200
+        assert response_json(response) == {"data": {"test": "Hello Dolly"}}
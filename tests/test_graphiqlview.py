@@ -1,8 +1,13 @@
 import pytest
 from flask import url_for
 
+from flask_graphql.graphiql import (GraphiQLPage, add_graphiql_assets_url_rule,
+                                    get_asset_paths)
+
 from .app import create_app
 
+HTML = {"Accept": "text/html"}
+
 
 @pytest.fixture
 def app():
@@ -58,3 +63,76 @@ def test_graphiql_custom_title(app, client):
     with app.test_request_context():
         response = client.get(url_for("graphql"), headers={"Accept": "text/html"})
     assert "<title>Awesome</title>" in response.data.decode("utf-8")
+
+
+page = GraphiQLPage()
+
+
+@pytest.mark.parametrize("app", [create_app(graphiql=True, graphiql_page=page)])
+def test_graphiql_renders_template_once(app, client):
+    with app.test_request_context():
+        first = client.get(url_for("graphql", query="{test}"), headers=HTML)
+        parts = page.parts
+        second = client.get(url_for("graphql", query="{ a: test }"), headers=HTML)
+
+    assert parts is not None and page.parts is parts
+    assert '"{test}"' in first.data.decode("utf-8")
+    assert '"{ a: test }"' in second.data.decode("utf-8")
+    assert "__graphiql_" not in second.data.decode("utf-8")
+
+
+def test_graphiql_escapes_request_values(app, client):
+    with app.test_request_context():
+        response = client.get(
+            url_for("graphql", query="{test} # </script>{{ config }}"), headers=HTML
+        )
+    html = response.data.decode("utf-8")
+    assert "\\u003c/script\\u003e{{ config }}" in html
+    assert "</script>{{" not in html
+
+
+@pytest.mark.parametrize(
+    "app", [create_app(graphiql=True, graphiql_prefill_response=False)]
+)
+def test_graphiql_without_prefilled_response(app, client):
+    with app.test_request_context():
+        response = client.get(url_for("graphql", query="{thrower}"), headers=HTML)
+    html = response.data.decode("utf-8")
+    assert response.status_code == 200
+    assert '"{thrower}"' in html
+    assert "response: null" in html
+
+
+@pytest.mark.parametrize(
+    "app", [create_app(graphiql=True, graphiql_assets_url="/assets/")]
+)
+def test_graphiql_loads_local_assets(app, client, tmp_path):
+    with app.test_request_context():
+        response = client.get(url_for("graphql"), headers=HTML)
+    html = response.data.decode("utf-8")
+    assert "cdn.jsdelivr.net" not in html
+    assert '<script src="/assets/graphiql@1.0.3/graphiql.min.js">' in html
+
+
+def test_serves_graphiql_assets(tmp_path):
+    asset = tmp_path / "graphiql@1.0.3" / "graphiql.min.js"
+    asset.parent.mkdir()
+    asset.write_text("window.GraphiQL = {};")
+    app = create_app(graphiql=True)
+    add_graphiql_assets_url_rule(app, str(tmp_path), "/assets")
+
+    response = app.test_client().get("/assets/graphiql@1.0.3/graphiql.min.js")
+
+    assert response.status_code == 200
+    assert response.data == b"window.GraphiQL = {};"
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    assert response.cache_control.immutable
+    response.close()
+    assert app.test_client().get("/assets/../app.py").status_code == 404
+
+
+def test_lists_assets_of_the_template():
+    paths = get_asset_paths("1.0.3")
+    assert "graphiql@1.0.3/graphiql.css" in paths
+    assert "react@16.13.1/umd/react.production.min.js" in paths
+    assert len(paths) == 8
@@ -0,0 +1,122 @@
+import pytest
+
+from graphql.validation import validate
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+from .test_response_cache import CacheSchema, calls
+
+
+@pytest.fixture
+def app(request):
+    calls.clear()
+    app = create_app(schema=CacheSchema, http_caching=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_adds_etag_and_cache_control_from_hints(app, client):
+    response = client.get(url_string(app, query="{ counter }"))
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=60"
+    assert response.headers["ETag"]
+
+
+def test_uses_private_scope_and_no_cache(app, client):
+    response = client.get(url_string(app, query="{ user { visits } }"))
+    assert response.headers["Cache-Control"] == "private, max-age=10"
+
+    response = client.get(url_string(app, query="{ uncached }"))
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_returns_not_modified_for_matching_etag(app, client):
+    response = client.get(url_string(app, query="{ user { name } }"))
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        url_string(app, query="{ user { name } }"), headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_validates_the_document_once_per_request(app, client, monkeypatch):
+    validated = []
+
+    def counting_validate(*args, **kwargs):
+        validated.append(args[1])
+        return validate(*args, **kwargs)
+
+    monkeypatch.setattr("flask_graphql.runtime.validate", counting_validate)
+    response = client.get(url_string(app, query="{ user { name } }"))
+
+    assert response.headers["ETag"]
+    assert len(validated) == 1
+
+
+def test_returns_body_for_changed_result(app, client):
+    response = client.get(url_string(app, query="{ uncached }"))
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        url_string(app, query="{ uncached }"), headers={"If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"uncached": 2}}
+    assert response.headers["ETag"] != etag
+
+
+def test_does_not_add_headers_to_post_requests(app, client):
+    response = client.post(url_string(app), json={"query": "{ counter }"})
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert "Cache-Control" not in response.headers
+
+
+def test_does_not_add_headers_to_errors(app, client):
+    response = client.get(url_string(app, query="{ unknown }"))
+
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
+
+
+@pytest.mark.parametrize(
+    "app",
+    [
+        create_app(
+            schema=CacheSchema,
+            http_caching=True,
+            response_cache=True,
+            cache_control="public, max-age=5, stale-while-revalidate=30",
+        )
+    ],
+)
+def test_uses_configured_policy_for_cached_responses(app, client):
+    calls.clear()
+    responses = [client.get(url_string(app, query="{ counter }")) for _ in range(2)]
+
+    assert calls == ["counter"]
+    for response in responses:
+        assert response.headers["Cache-Control"] == (
+            "public, max-age=5, stale-while-revalidate=30"
+        )
+    assert responses[0].headers["ETag"] == responses[1].headers["ETag"]
+
+    response = client.get(
+        url_string(app, query="{ counter }"),
+        headers={"If-None-Match": responses[0].headers["ETag"]},
+    )
+    assert response.status_code == 304
@@ -0,0 +1,169 @@
+import json
+
+import pytest
+
+from flask_graphql import AsyncGraphQLView
+from flask_graphql.incremental import (GraphQLDeferDirective,
+                                       GraphQLStreamDirective,
+                                       plan_incremental_delivery)
+from graphql.language import parse
+from graphql.type.definition import (GraphQLField, GraphQLList,
+                                     GraphQLObjectType)
+from graphql.type.directives import specified_directives
+from graphql.type.scalars import GraphQLInt, GraphQLString
+from graphql.type.schema import GraphQLSchema
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+
+def resolve_slow(obj, info):
+    return "slow %s" % obj["id"]
+
+
+ItemType = GraphQLObjectType(
+    name="Item",
+    fields={
+        "id": GraphQLField(GraphQLInt, resolve=lambda obj, info: obj["id"]),
+        "slow": GraphQLField(GraphQLString, resolve=resolve_slow),
+    },
+)
+
+IncrementalSchema = GraphQLSchema(
+    GraphQLObjectType(
+        name="Query",
+        fields={
+            "hello": GraphQLField(GraphQLString, resolve=lambda *_: "world"),
+            "slow": GraphQLField(GraphQLString, resolve=lambda obj, info: "slow"),
+            "items": GraphQLField(
+                GraphQLList(ItemType),
+                resolve=lambda *_: [{"id": 1}, {"id": 2}],
+            ),
+            "numbers": GraphQLField(
+                GraphQLList(GraphQLInt), resolve=lambda *_: [1, 2, 3]
+            ),
+        },
+    ),
+    directives=specified_directives + (GraphQLDeferDirective, GraphQLStreamDirective),
+)
+
+MULTIPART = "multipart/mixed;deferSpec=20220824, application/json"
+
+
+def multipart_payloads(response):
+    body = response.data.decode()
+    assert body.endswith("\r\n-----\r\n")
+    parts = body[: -len("\r\n-----\r\n")].split("\r\n---\r\n")[1:]
+    return [json.loads(part.split("\r\n\r\n", 1)[1]) for part in parts]
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(schema=IncrementalSchema, incremental_delivery=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_defers_fragment(app, client):
+    response = client.get(
+        url_string(app, query="{ hello ... @defer { slow } }"),
+        headers={"Accept": MULTIPART},
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "multipart/mixed"
+    assert "deferSpec=20220824" in response.headers["Content-Type"]
+    assert multipart_payloads(response) == [
+        {"data": {"hello": "world"}, "hasNext": True},
+        {"incremental": [{"data": {"slow": "slow"}, "path": []}], "hasNext": False},
+    ]
+
+
+def test_defers_fragment_spread_within_list(app, client):
+    query = """
+    { items { id ...Slow @defer(label: "slow") } }
+    fragment Slow on Item { slow }
+    """
+    response = client.post(
+        url_string(app),
+        data=json.dumps(dict(query=query)),
+        content_type="application/json",
+        headers={"Accept": MULTIPART},
+    )
+
+    assert multipart_payloads(response) == [
+        {"data": {"items": [{"id": 1}, {"id": 2}]}, "hasNext": True},
+        {
+            "incremental": [
+                {"data": {"slow": "slow 1"}, "path": ["items", 0], "label": "slow"},
+                {"data": {"slow": "slow 2"}, "path": ["items", 1], "label": "slow"},
+            ],
+            "hasNext": False,
+        },
+    ]
+
+
+def test_streams_list_items(app, client):
+    response = client.get(
+        url_string(app, query="{ numbers @stream(initialCount: 1) }"),
+        headers={"Accept": MULTIPART},
+    )
+
+    assert multipart_payloads(response) == [
+        {"data": {"numbers": [1]}, "hasNext": True},
+        {"incremental": [{"items": [2, 3], "path": ["numbers", 1]}], "hasNext": False},
+    ]
+
+
+def test_returns_json_if_client_does_not_accept_multipart(app, client):
+    response = client.get(url_string(app, query="{ hello ... @defer { slow } }"))
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"hello": "world", "slow": "slow"}}
+
+
+def test_returns_json_if_defer_is_disabled(app, client):
+    response = client.get(
+        url_string(app, query="{ hello ... @defer(if: false) { slow } }"),
+        headers={"Accept": MULTIPART},
+    )
+
+    assert response.mimetype == "application/json"
+    assert response_json(response) == {"data": {"hello": "world", "slow": "slow"}}
+
+
+def test_does_not_split_mutations():
+    document = parse("mutation { writeTest ... @defer { test } }")
+
+    assert plan_incremental_delivery(document) is None
+
+
+@pytest.mark.parametrize(
+    "app",
+    [
+        create_app(
+            view_class=AsyncGraphQLView,
+            schema=IncrementalSchema,
+            incremental_delivery=True,
+        )
+    ],
+)
+def test_async_view_defers_fragment(app, client):
+    response = client.get(
+        url_string(app, query="{ items { id ... @defer { slow } } }"),
+        headers={"Accept": MULTIPART},
+    )
+
+    payloads = multipart_payloads(response)
+    assert payloads[0] == {"data": {"items": [{"id": 1}, {"id": 2}]}, "hasNext": True}
+    assert payloads[1]["incremental"][1] == {
+        "data": {"slow": "slow 2"},
+        "path": ["items", 1],
+    }
@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from flask_graphql.admission import RateLimit
+from flask_graphql.introspection import (IntrospectionCache,
+                                         is_introspection_query,
+                                         may_be_introspection_query)
+from graphql import build_schema, get_introspection_query, graphql_sync, parse
+
+from .app import create_app
+from .schema import Schema
+from .test_graphqlview import response_json, url_string
+
+introspection_cache = IntrospectionCache()
+INTROSPECTION_QUERY = get_introspection_query()
+
+
+@pytest.fixture
+def app(request):
+    introspection_cache.clear()
+    app = create_app(introspection_cache=introspection_cache)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_serves_introspection_from_cache(app, client):
+    responses = [
+        client.post(url_string(app), json={"query": INTROSPECTION_QUERY})
+        for _ in range(3)
+    ]
+
+    expected = graphql_sync(Schema, INTROSPECTION_QUERY).data
+    for response in responses:
+        assert response.status_code == 200
+        assert response_json(response) == {"data": expected}
+    assert responses[0].data == responses[2].data
+    assert introspection_cache.info()[:2] == (2, 1)
+
+
+def test_caches_type_queries_by_variables(app, client):
+    query = "query T($name: String!) { __type(name: $name) { name kind } }"
+
+    for name in ("QueryRoot", "String", "QueryRoot"):
+        response = client.get(
+            url_string(app, query=query, variables=json.dumps({"name": name}))
+        )
+        kind = "SCALAR" if name == "String" else "OBJECT"
+        assert response_json(response) == {
+            "data": {"__type": {"name": name, "kind": kind}}
+        }
+
+    assert introspection_cache.info()[:2] == (1, 2)
+
+
+def test_does_not_cache_other_queries(app, client):
+    response = client.get(url_string(app, query="{ __typename test }"))
+    assert response_json(response) == {
+        "data": {"__typename": "QueryRoot", "test": "Hello World"}
+    }
+
+    response = client.get(url_string(app, query="{ test }"))
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+    # Queries not mentioning __schema or __type are not even looked up.
+    assert len(introspection_cache) == 0
+
+
+def test_remembers_other_queries_by_their_text(app, client):
+    query = "query Q($name: String!) { __type(name: $name) { name } test }"
+
+    for name in ("QueryRoot", "String", "Other"):
+        response = client.get(
+            url_string(app, query=query, variables=json.dumps({"name": name}))
+        )
+        assert response_json(response)["data"]["test"] == "Hello World"
+
+    assert len(introspection_cache) == 1
+
+
+def test_reports_errors_of_introspection_queries(app, client):
+    response = client.get(url_string(app, query="{ __schema { unknown } }"))
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Cannot query field 'unknown' on type '__Schema'."
+    )
+
+
+def test_invalidates_results_when_the_schema_changes(app, client):
+    query = "{ __schema { queryType { name } } }"
+    client.get(url_string(app, query=query))
+
+    other_app = create_app(
+        schema=build_schema("type Other { a: String } schema { query: Other }"),
+        introspection_cache=introspection_cache,
+    )
+    response = other_app.test_client().get(url_string(app, query=query))
+
+    assert response_json(response) == {
+        "data": {"__schema": {"queryType": {"name": "Other"}}}
+    }
+
+
+def test_charges_cached_responses_to_the_rate_limit():
+    introspection_cache.clear()
+    app = create_app(
+        introspection_cache=introspection_cache, rate_limit=RateLimit(0.001, burst=9)
+    )
+    client = app.test_client()
+    # Costs 3, for the three fields.
+    query = "{ __schema { queryType { name } } }"
+
+    responses = [client.get(url_string(app, query=query)) for _ in range(4)]
+
+    assert [response.status_code for response in responses] == [200, 200, 200, 429]
+    assert introspection_cache.info()[:2] == (3, 1)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        (INTROSPECTION_QUERY, True),
+        ('{ __type(name: "A") { name } __typename }', True),
+        ("{ ...F } fragment F on Q { ... on Q { __schema { types { name } } } }", True),
+        ("{ __typename }", False),
+        ("{ __schema { types { name } } test }", False),
+        ("mutation { __schema { types { name } } }", False),
+    ],
+)
+def test_recognizes_introspection_queries(query, expected):
+    assert is_introspection_query(parse(query)) is expected
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("{ __schema { types { name } } }", True),
+        ('{ t: __type(name: "A") { name } }', True),
+        ("{ __typename }", False),
+        ("{ test(who: \"__type\") }", True),
+        ("{ my__schema }", False),
+        (None, False),
+    ],
+)
+def test_looks_for_introspection_fields_in_the_text(query, expected):
+    assert may_be_introspection_query(query) is expected
@@ -0,0 +1,214 @@
+import multiprocessing
+import re
+
+import pytest
+from flask import Flask
+
+from flask_graphql import (AsyncGraphQLView, GraphQLMetrics, GraphQLView,
+                           MetricsView)
+
+from .schema import AsyncSchema, Schema
+from .test_graphqlview import url_string
+
+
+def create_metrics_app(metrics, view_class=GraphQLView, **kwargs):
+    kwargs.setdefault("schema", Schema)
+    app = Flask(__name__)
+    app.debug = True
+    app.add_url_rule(
+        "/graphql", view_func=view_class.as_view("graphql", metrics=metrics, **kwargs)
+    )
+    app.add_url_rule(
+        "/metrics", view_func=MetricsView.as_view("metrics", metrics=metrics)
+    )
+    return app
+
+
+def parse_samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+@pytest.fixture
+def metrics():
+    return GraphQLMetrics()
+
+
+@pytest.fixture
+def app(metrics):
+    return create_metrics_app(metrics, batch=True)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_exposes_operation_counts_and_phases(app, client):
+    for _ in range(2):
+        client.get(url_string(app, query="query Hello { test }", operationName="Hello"))
+    client.get(url_string(app, query="{ thrower }"))
+    client.get(url_string(app, query="{ unknown }"))
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type == "text/plain; version=0.0.4; charset=utf-8"
+    text = response.get_data(as_text=True)
+    assert "# TYPE graphql_requests_total counter" in text
+    assert "# TYPE graphql_phase_duration_seconds histogram" in text
+    samples = parse_samples(text)
+    assert samples['graphql_requests_total{operation="Hello"}'] == 2
+    assert samples['graphql_requests_total{operation=""}'] == 2
+    assert 'graphql_errors_total{operation="Hello"}' not in samples
+    assert samples['graphql_errors_total{operation=""}'] == 2
+    for phase in ("parse", "validate", "execute", "encode"):
+        labels = f'operation="Hello",phase="{phase}"'
+        assert samples[f"graphql_phase_duration_seconds_count{{{labels}}}"] == 2
+        bucket = f'graphql_phase_duration_seconds_bucket{{{labels},le="+Inf"}}'
+        assert samples[bucket] == 2
+    # Invalid operations are counted, but not executed.
+    anonymous = 'graphql_phase_duration_seconds_count{operation="",phase='
+    assert samples[anonymous + '"validate"}'] == 2
+    assert samples[anonymous + '"execute"}'] == 1
+
+
+def test_records_batch_and_response_sizes(app, client):
+    response = client.post(url_string(app), json=[{"query": "{ test }"}] * 3)
+
+    samples = parse_samples(client.get("/metrics").get_data(as_text=True))
+
+    assert samples['graphql_batch_size_bucket{le="2"}'] == 0
+    assert samples['graphql_batch_size_bucket{le="5"}'] == 1
+    assert samples["graphql_batch_size_sum"] == 3
+    assert samples['graphql_requests_total{operation=""}'] == 3
+    assert samples["graphql_response_size_bytes_sum"] == len(response.data)
+
+
+def test_records_streamed_responses_once_sent(metrics):
+    app = create_metrics_app(metrics, stream_response=True)
+    client = app.test_client()
+
+    response = client.get(
+        url_string(app, query="query Hello { test }", operationName="Hello")
+    )
+    assert response.is_streamed
+    body = response.get_data()
+
+    samples = parse_samples(metrics.render())
+    assert samples["graphql_response_size_bytes_sum"] == len(body)
+    assert samples[
+        'graphql_phase_duration_seconds_count{operation="Hello",phase="encode"}'
+    ] == 1
+
+
+def test_histogram_buckets_are_cumulative(metrics):
+    metrics.get_operation_label("Op")
+    for value in (0.0005, 0.003, 0.003, 20):
+        metrics.observe_encoding("Op", value)
+
+    samples = parse_samples(metrics.render())
+
+    prefix = 'graphql_phase_duration_seconds_bucket{operation="Op",phase="encode",le='
+    assert samples[prefix + '"0.001"}'] == 1
+    assert samples[prefix + '"0.0025"}'] == 1
+    assert samples[prefix + '"0.005"}'] == 3
+    assert samples[prefix + '"10.0"}'] == 3
+    assert samples[prefix + '"+Inf"}'] == 4
+
+
+def test_labels_only_a_limited_number_of_valid_operation_names():
+    metrics = GraphQLMetrics(max_operation_names=2)
+    app = create_metrics_app(metrics)
+    client = app.test_client()
+
+    for name in ("A", "B", "C", "A"):
+        query = f"query {name} {{ test }}"
+        client.get(url_string(app, query=query, operationName=name))
+    client.get(url_string(app, query="query D { unknown }", operationName="D"))
+    client.get(url_string(app, query="query E { test }", operationName="F"))
+
+    samples = parse_samples(metrics.render())
+    assert samples['graphql_requests_total{operation="A"}'] == 2
+    assert samples['graphql_requests_total{operation="B"}'] == 1
+    assert samples['graphql_requests_total{operation="other"}'] == 1
+    assert samples['graphql_requests_total{operation=""}'] == 2
+    assert samples[
+        'graphql_phase_duration_seconds_count{operation="other",phase="encode"}'
+    ] == 3
+
+
+def test_counts_cached_responses_and_rejected_requests(metrics):
+    app = create_metrics_app(metrics, introspection_cache=True, max_query_length=40)
+    client = app.test_client()
+
+    for _ in range(2):
+        client.get(url_string(app, query="{ __schema { queryType { name } } }"))
+    client.get(url_string(app, query="{ test }" * 6))
+
+    samples = parse_samples(metrics.render())
+    assert samples['graphql_cached_responses_total{cache="introspection"}'] == 2
+    assert samples['graphql_rejected_requests_total{status="400"}'] == 1
+    assert "graphql_requests_total" not in "".join(samples)
+
+
+def test_escapes_label_values(metrics):
+    metrics.observe_operation('say "hi"\\\n', {}, None)
+
+    assert 'operation="say \\"hi\\"\\\\\\n"' in metrics.render()
+
+
+def record_in_process(directory, count):
+    metrics = GraphQLMetrics(directory, flush_interval=0)
+    for _ in range(count):
+        metrics.observe_operation("Worker", {}, None)
+
+
+def test_adds_up_processes_sharing_a_directory(tmp_path):
+    metrics = GraphQLMetrics(str(tmp_path), flush_interval=60)
+    metrics.observe_operation("Worker", {}, None)
+    processes = [
+        multiprocessing.Process(target=record_in_process, args=(str(tmp_path), count))
+        for count in (2, 3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    samples = parse_samples(metrics.render())
+
+    assert samples['graphql_requests_total{operation="Worker"}'] == 6
+    assert samples['graphql_errors_total{operation="Worker"}'] == 6
+    assert len(list(tmp_path.glob("metrics-*.json"))) == 3
+
+
+def test_forked_processes_do_not_count_parent_values(tmp_path):
+    metrics = GraphQLMetrics(str(tmp_path))
+    metrics.observe_operation("Parent", {}, None)
+    metrics.flush()
+    metrics.pid = -1  # as seen from a forked child
+
+    metrics.observe_operation("Child", {}, None)
+
+    text = metrics.render()
+    assert re.search(r'requests_total\{operation="Parent"\} 1', text)
+    assert re.search(r'requests_total\{operation="Child"\} 1', text)
+    assert len(list(tmp_path.glob("metrics-*.json"))) == 2
+
+
+def test_async_view_records_operations(metrics):
+    app = create_metrics_app(metrics, AsyncGraphQLView, schema=AsyncSchema)
+    client = app.test_client()
+
+    client.get(url_string(app, query="{ a b c }"))
+
+    samples = parse_samples(metrics.render())
+    assert samples['graphql_requests_total{operation=""}'] == 1
+    assert samples[
+        'graphql_phase_duration_seconds_count{operation="",phase="execute"}'
+    ] == 1
@@ -0,0 +1,166 @@
+import json
+from hashlib import sha256
+
+import pytest
+
+from flask_graphql import (DictPersistedQueryStore, FilePersistedQueryStore,
+                           MemoryPersistedQueryStore)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+QUERY = "{test}"
+QUERY_HASH = sha256(QUERY.encode("utf-8")).hexdigest()
+
+
+def persisted_query_extensions(sha256_hash=QUERY_HASH):
+    return {"persistedQuery": {"version": 1, "sha256Hash": sha256_hash}}
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(persisted_queries=True, batch=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_unknown_hash_returns_persisted_query_not_found(app, client):
+    response = client.get(
+        url_string(app, extensions=json.dumps(persisted_query_extensions()))
+    )
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        "errors": [
+            {
+                "message": "PersistedQueryNotFound",
+                "locations": None,
+                "path": None,
+                "extensions": {"code": "PERSISTED_QUERY_NOT_FOUND"},
+            }
+        ]
+    }
+
+
+def test_registers_query_and_serves_hash_via_get(app, client):
+    extensions = json.dumps(persisted_query_extensions())
+    response = client.get(url_string(app, query=QUERY, extensions=extensions))
+    assert response.status_code == 200
+
+    response = client.get(url_string(app, extensions=extensions))
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+
+
+def test_serves_hash_via_post(app, client):
+    client.post(
+        url_string(app),
+        data=json.dumps(dict(query=QUERY, extensions=persisted_query_extensions())),
+        content_type="application/json",
+    )
+    response = client.post(
+        url_string(app),
+        data=json.dumps(dict(extensions=persisted_query_extensions())),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+
+
+def test_rejects_hash_not_matching_query(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps(
+            dict(query=QUERY, extensions=persisted_query_extensions("0" * 64))
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Provided sha does not match query."
+    )
+
+
+def test_batch_reports_missing_hash_per_operation(app, client):
+    response = client.post(
+        url_string(app),
+        data=json.dumps(
+            [
+                dict(query="{test}"),
+                dict(extensions=persisted_query_extensions("f" * 64)),
+            ]
+        ),
+        content_type="application/json",
+    )
+
+    assert response.status_code == 400
+    first, second = response_json(response)
+    assert first == {"data": {"test": "Hello World"}}
+    assert second["errors"][0]["message"] == "PersistedQueryNotFound"
+
+
+@pytest.mark.parametrize("app", [create_app()])
+def test_hash_only_without_store_is_not_supported(app, client):
+    response = client.get(
+        url_string(app, extensions=json.dumps(persisted_query_extensions()))
+    )
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["extensions"] == {
+        "code": "PERSISTED_QUERY_NOT_SUPPORTED"
+    }
+
+
+@pytest.mark.parametrize("app", [create_app()])
+def test_query_with_hash_without_store_is_executed(app, client):
+    response = client.get(
+        url_string(
+            app, query=QUERY, extensions=json.dumps(persisted_query_extensions())
+        )
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+
+
+def test_handles_poorly_formed_extensions(app, client):
+    response = client.get(url_string(app, extensions="persistedQuery"))
+
+    assert response.status_code == 400
+    assert response_json(response) == {
+        "errors": [
+            {"message": "Extensions are invalid JSON.", "locations": None, "path": None}
+        ]
+    }
+
+
+@pytest.mark.parametrize(
+    "make_store",
+    [
+        lambda tmp_path: MemoryPersistedQueryStore(),
+        lambda tmp_path: DictPersistedQueryStore(),
+        lambda tmp_path: FilePersistedQueryStore(str(tmp_path)),
+    ],
+)
+def test_stores_round_trip(make_store, tmp_path):
+    store = make_store(tmp_path)
+    assert store.get(QUERY_HASH) is None
+    store.set(QUERY_HASH, QUERY)
+    assert store.get(QUERY_HASH) == QUERY
+
+
+def test_file_store_ignores_invalid_hashes(tmp_path):
+    store = FilePersistedQueryStore(str(tmp_path))
+    store.set("../escape", QUERY)
+
+    assert store.get("../escape") is None
+    assert list(tmp_path.iterdir()) == []
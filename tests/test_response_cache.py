@@ -0,0 +1,274 @@
+import time
+
+import pytest
+from flask import request
+from graphql_server import load_json_variables as runtime_load_json_variables
+
+from flask_graphql.response_cache import (CachePolicy, CacheScope,
+                                          FileResponseCache,
+                                          GraphQLCacheControlDirective,
+                                          MemoryResponseCache,
+                                          calculate_cache_policy)
+from graphql.language import parse
+from graphql.type.definition import GraphQLField, GraphQLObjectType
+from graphql.type.directives import specified_directives
+from graphql.type.scalars import GraphQLInt, GraphQLString
+from graphql.type.schema import GraphQLSchema
+from graphql.utilities import build_schema
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+calls = []
+
+
+def resolve_counter(obj, info):
+    calls.append(info.field_name)
+    return len(calls)
+
+
+UserType = GraphQLObjectType(
+    name="User",
+    fields={
+        "name": GraphQLField(GraphQLString, resolve=lambda *_: "Jane"),
+        "visits": GraphQLField(
+            GraphQLInt,
+            resolve=resolve_counter,
+            extensions={"cacheControl": {"maxAge": 10, "scope": "PRIVATE"}},
+        ),
+    },
+    extensions={"cacheControl": {"maxAge": 30}},
+)
+
+QueryType = GraphQLObjectType(
+    name="Query",
+    fields={
+        "counter": GraphQLField(
+            GraphQLInt,
+            resolve=resolve_counter,
+            extensions={"cacheControl": {"maxAge": 60}},
+        ),
+        "uncached": GraphQLField(GraphQLInt, resolve=resolve_counter),
+        "user": GraphQLField(UserType, resolve=lambda *_: {}),
+    },
+)
+
+MutationType = GraphQLObjectType(
+    name="Mutation",
+    fields={
+        "increment": GraphQLField(
+            GraphQLInt,
+            resolve=resolve_counter,
+            extensions={"cacheControl": {"maxAge": 60}},
+        )
+    },
+)
+
+CacheSchema = GraphQLSchema(QueryType, MutationType)
+
+SDLSchema = build_schema(
+    """
+    directive @cacheControl(
+      maxAge: Int
+      scope: CacheControlScope
+    ) on FIELD_DEFINITION | OBJECT | INTERFACE | UNION
+
+    enum CacheControlScope { PUBLIC PRIVATE }
+
+    type Query {
+      posts: [Post] @cacheControl(maxAge: 240)
+      stats: Stats
+    }
+
+    type Post @cacheControl(maxAge: 120) {
+      title: String
+      author: Author
+    }
+
+    type Author {
+      name: String
+    }
+
+    type Stats @cacheControl(maxAge: 5, scope: PRIVATE) {
+      views: Int
+    }
+    """
+)
+
+
+@pytest.fixture
+def app(request):
+    calls.clear()
+    app = create_app(schema=CacheSchema, response_cache=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def policy(query, schema=SDLSchema, default_max_age=0):
+    return calculate_cache_policy(schema, parse(query), default_max_age)
+
+
+def test_uses_smallest_max_age_of_hinted_fields():
+    assert policy("{ posts { title } }") == (240, CacheScope.PUBLIC)
+    assert policy("{ posts { title author { name } } }") == (0, CacheScope.PUBLIC)
+    assert policy("{ posts { title author { name } } }", default_max_age=60) == (
+        60,
+        CacheScope.PUBLIC,
+    )
+    assert policy("{ stats { views } posts { title } }") == (5, CacheScope.PRIVATE)
+
+
+def test_uses_hints_of_types_and_fragments():
+    query = "{ ...Stats } fragment Stats on Query { stats { views } }"
+
+    assert policy(query) == CachePolicy(5, CacheScope.PRIVATE)
+    assert policy("{ user { name } }", CacheSchema) == (30, CacheScope.PUBLIC)
+    assert policy("{ user { visits } counter }", CacheSchema) == (
+        10,
+        CacheScope.PRIVATE,
+    )
+
+
+def test_exports_cache_control_directive():
+    schema = GraphQLSchema(
+        QueryType, directives=specified_directives + (GraphQLCacheControlDirective,)
+    )
+
+    assert schema.get_directive("cacheControl") is GraphQLCacheControlDirective
+
+
+def test_caches_query_responses(app, client):
+    for _ in range(3):
+        response = client.get(url_string(app, query="{ counter }"))
+        assert response.status_code == 200
+        assert response_json(response) == {"data": {"counter": 1}}
+
+    assert calls == ["counter"]
+
+
+def test_caches_by_variables_and_operation_name(app, client):
+    query = "query A($a: Boolean!) { counter @skip(if: $a) } query B { counter }"
+    for variables in ('{"a": false}', '{"a": true}', '{"a": false}'):
+        client.get(url_string(app, query=query, operationName="A", variables=variables))
+    client.get(url_string(app, query=query, operationName="B"))
+
+    assert len(calls) == 2
+
+
+def test_resolves_params_once_per_request(app, client, monkeypatch):
+    decoded = []
+
+    def load_json_variables(variables):
+        decoded.append(variables)
+        return runtime_load_json_variables(variables)
+
+    monkeypatch.setattr(
+        "flask_graphql.runtime.load_json_variables", load_json_variables
+    )
+    query = "query A($a: Boolean!) { counter @skip(if: $a) }"
+    response = client.get(url_string(app, query=query, variables='{"a": false}'))
+
+    assert response_json(response) == {"data": {"counter": 1}}
+    assert decoded == ['{"a": false}']
+
+
+def test_does_not_cache_queries_without_max_age(app, client):
+    for _ in range(2):
+        client.get(url_string(app, query="{ counter uncached }"))
+
+    assert calls == ["counter", "uncached", "counter", "uncached"]
+
+
+def test_does_not_cache_private_responses_without_vary(app, client):
+    for _ in range(2):
+        client.get(url_string(app, query="{ user { visits } }"))
+
+    assert len(calls) == 2
+
+
+def test_never_caches_mutations(app, client):
+    for _ in range(2):
+        response = client.post(url_string(app, query="mutation { increment }"))
+        assert response.status_code == 200
+
+    assert calls == ["increment", "increment"]
+
+
+def test_does_not_cache_errors(app, client):
+    for _ in range(2):
+        response = client.get(url_string(app, query="{ counter unknown }"))
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "app",
+    [
+        create_app(
+            schema=CacheSchema,
+            response_cache=True,
+            response_cache_vary=lambda: request.headers.get("X-User"),
+        )
+    ],
+)
+def test_varies_private_responses(app, client):
+    calls.clear()
+    for user in ("a", "b", "a"):
+        response = client.get(
+            url_string(app, query="{ user { visits } }"), headers={"X-User": user}
+        )
+        assert response.status_code == 200
+
+    assert len(calls) == 2
+
+
+def test_does_not_share_responses_between_schemas_and_versions(tmp_path):
+    cache = FileResponseCache(str(tmp_path))
+    OtherQueryType = GraphQLObjectType(
+        name="Query", fields=dict(QueryType.fields, extra=GraphQLField(GraphQLString))
+    )
+    apps = [
+        create_app(schema=CacheSchema, response_cache=cache),
+        create_app(schema=GraphQLSchema(OtherQueryType), response_cache=cache),
+        create_app(
+            schema=CacheSchema, response_cache=cache, response_cache_version="2"
+        ),
+        create_app(schema=CacheSchema, response_cache=cache),
+    ]
+    calls.clear()
+    for app in apps:
+        with app.test_request_context():
+            url = url_string(app, query="{ counter }")
+        response = app.test_client().get(url)
+        assert response.status_code == 200
+
+    assert len(calls) == 3
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    cache = MemoryResponseCache()
+    cache.set("key", b"body", 10)
+    assert cache.get("key") == b"body"
+
+    now = time.monotonic()
+    monkeypatch.setattr("time.monotonic", lambda: now + 11)
+    assert cache.get("key") is None
+    assert len(cache.cache) == 0
+
+
+def test_file_cache_expires_entries(tmp_path, monkeypatch):
+    cache = FileResponseCache(str(tmp_path))
+    cache.set("key", b"body\nwith lines", 10)
+    assert FileResponseCache(str(tmp_path)).get("key") == b"body\nwith lines"
+    assert cache.get("missing") is None
+
+    now = time.time()
+    monkeypatch.setattr("time.time", lambda: now + 11)
+    assert cache.get("key") is None
+    assert not (tmp_path / "key.response").exists()
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from flask_graphql import (GraphQLMetrics, InMemoryBroker, SocketBroker,
+                           SubscriptionView)
+from flask_graphql.admission import ConcurrencyLimit, RateLimit
+from flask_graphql.subscriptions import format_event
+from graphql import (GraphQLArgument, GraphQLField, GraphQLInt, GraphQLNonNull,
+                     GraphQLObjectType, GraphQLSchema, GraphQLString)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+
+async def countdown(_root, _info, start):
+    for number in range(start, 0, -1):
+        yield number
+
+
+SubscriptionSchema = GraphQLSchema(
+    query=GraphQLObjectType(
+        "Query", {"hello": GraphQLField(GraphQLString, resolve=lambda *_: "world")}
+    ),
+    subscription=GraphQLObjectType(
+        "Subscription",
+        {
+            "message": GraphQLField(
+                GraphQLString,
+                args={"channel": GraphQLArgument(GraphQLNonNull(GraphQLString))},
+                subscribe=lambda _root, info, channel: info.context[
+                    "broker"
+                ].subscribe(channel),
+                resolve=lambda message, _info, channel: message["text"],
+            ),
+            "countdown": GraphQLField(
+                GraphQLInt,
+                args={"start": GraphQLArgument(GraphQLNonNull(GraphQLInt))},
+                subscribe=countdown,
+                resolve=lambda number, _info, start: number,
+            ),
+        },
+    ),
+)
+
+MESSAGES = 'subscription { message(channel: "news") }'
+
+
+@pytest.fixture
+def broker():
+    return InMemoryBroker()
+
+
+def create_subscription_app(**kwargs):
+    app = create_app(view_class=SubscriptionView, schema=SubscriptionSchema, **kwargs)
+    # In debug mode, Flask keeps the request context of streams closed early.
+    app.debug = False
+    return app
+
+
+@pytest.fixture
+def app(broker):
+    app = create_subscription_app(broker=broker)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def next_event(data):
+    return format_event("next", json.dumps(data, separators=(",", ":")))
+
+
+def test_streams_published_messages(app, client, broker):
+    response = client.get(url_string(app, query=MESSAGES))
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    events = response.iter_encoded()
+    assert next(events) == b":\n\n"
+    broker.publish("news", {"text": "first"})
+    broker.publish("other", {"text": "ignored"})
+    broker.publish("news", {"text": "second"})
+    assert next(events) == next_event({"data": {"message": "first"}})
+    assert next(events) == next_event({"data": {"message": "second"}})
+
+    response.close()
+    assert broker.subscriptions == {}
+
+
+def test_completes_finished_subscriptions(app, client):
+    response = client.post(
+        url_string(app),
+        json={
+            "query": "subscription S($start: Int!) { countdown(start: $start) }",
+            "variables": {"start": 2},
+        },
+    )
+
+    assert response.get_data() == b"".join(
+        [
+            b":\n\n",
+            next_event({"data": {"countdown": 2}}),
+            next_event({"data": {"countdown": 1}}),
+            b"event: complete\ndata: \n\n",
+        ]
+    )
+
+
+def test_sends_heartbeats(broker):
+    app = create_subscription_app(broker=broker, heartbeat_interval=0.01)
+    response = app.test_client().get(url_string(app, query=MESSAGES))
+
+    events = response.iter_encoded()
+    assert [next(events) for _ in range(3)] == [b":\n\n"] * 3
+    broker.publish("news", {"text": "later"})
+    assert next(events) == next_event({"data": {"message": "later"}})
+    response.close()
+
+
+def test_streams_errors_of_the_subscription(app, client):
+    response = client.get(
+        url_string(app, query="subscription { message(channel: $x) }")
+    )
+    assert response.status_code == 400
+
+    query = "subscription A { countdown(start: 1) } subscription B { __typename }"
+    response = client.get(url_string(app, query=query))
+    assert response.get_data() == b"".join(
+        [
+            b":\n\n",
+            next_event(
+                {
+                    "errors": [
+                        {
+                            "message": "Must provide operation name"
+                            " if query contains multiple operations.",
+                            "locations": None,
+                            "path": None,
+                        }
+                    ],
+                }
+            ),
+            b"event: complete\ndata: \n\n",
+        ]
+    )
+
+
+def test_rejects_other_operations(app, client):
+    for data in ({"query": "{ hello }"}, [{"query": MESSAGES}]):
+        response = client.post(url_string(app), json=data)
+        assert response.status_code == 400
+
+    response = client.post(url_string(app), json={"query": "{ hello }"})
+    assert response_json(response)["errors"][0]["message"] == (
+        "Only subscription operations can be sent to this endpoint."
+    )
+
+
+COUNTDOWN = "subscription S { countdown(start: 1) }"
+
+
+def test_checks_the_cost_of_subscriptions(broker):
+    app = create_subscription_app(
+        broker=broker, max_depth=0, rate_limit=RateLimit(rate=0.001, burst=2)
+    )
+    client = app.test_client()
+
+    response = client.get(url_string(app, query=COUNTDOWN))
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Query depth of 1 exceeds the maximum allowed depth of 0."
+    )
+    assert client.get(url_string(app, query=COUNTDOWN)).status_code == 400
+    # Both subscriptions have been charged to the rate limit.
+    assert client.get(url_string(app, query=COUNTDOWN)).status_code == 429
+
+
+def test_holds_a_concurrency_slot_while_open(broker):
+    limit = ConcurrencyLimit(1)
+    app = create_subscription_app(broker=broker, concurrency_limit=limit)
+    client = app.test_client()
+
+    response = client.get(url_string(app, query=MESSAGES))
+    assert next(response.iter_encoded()) == b":\n\n"
+    assert client.get(url_string(app, query=MESSAGES)).status_code == 429
+    response.close()
+
+    assert limit.running == 0
+    response = client.get(url_string(app, query=COUNTDOWN))
+    assert response.status_code == 200
+    response.close()
+    assert limit.running == 0
+
+
+def test_counts_subscriptions_in_the_metrics(broker):
+    metrics = GraphQLMetrics()
+    app = create_subscription_app(broker=broker, metrics=metrics)
+    client = app.test_client()
+
+    client.get(url_string(app, query=COUNTDOWN, operationName="S")).get_data()
+    client.get(url_string(app, query="subscription { unknown }"))
+
+    samples = metrics.render()
+    assert 'graphql_requests_total{operation="S"} 1' in samples
+    assert 'graphql_requests_total{operation=""} 1' in samples
+    assert 'graphql_errors_total{operation=""} 1' in samples
+    assert 'graphql_errors_total{operation="S"}' not in samples
+
+
+def test_drops_the_oldest_messages_of_slow_subscribers():
+    broker = InMemoryBroker(max_queue_size=2)
+
+    async def receive():
+        subscription = broker.subscribe("news")
+        for number in range(3):
+            broker.publish("news", number)
+        await asyncio.sleep(0)
+        messages = [await subscription.__anext__() for _ in range(2)]
+        await subscription.aclose()
+        return messages
+
+    assert asyncio.run(receive()) == [1, 2]
+    assert broker.subscriptions == {}
+
+
+def test_socket_broker_delivers_messages_to_other_processes(tmp_path):
+    worker, other_worker = SocketBroker(str(tmp_path)), SocketBroker(str(tmp_path))
+
+    async def receive():
+        subscriptions = [worker.subscribe("news"), other_worker.subscribe("news")]
+        worker.publish("news", {"text": "hello"})
+        return [
+            await asyncio.wait_for(subscription.__anext__(), 5)
+            for subscription in subscriptions
+        ]
+
+    try:
+        assert asyncio.run(receive()) == [{"text": "hello"}] * 2
+    finally:
+        worker.close()
+        other_worker.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_socket_broker_removes_sockets_of_stopped_processes(tmp_path):
+    stale_path = tmp_path / "1-stale.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    stale.bind(str(stale_path))
+    stale.close()
+    broker = SocketBroker(str(tmp_path))
+
+    broker.publish("news", {"text": "hello"})
+
+    assert not stale_path.exists()
+    broker.close()
@@ -0,0 +1,120 @@
+import pytest
+
+from flask_graphql import AsyncGraphQLView
+
+from .app import create_app
+from .schema import AsyncSchema
+from .test_graphqlview import response_json, url_string
+
+traces = []
+
+
+@pytest.fixture
+def app(request):
+    app = create_app(tracing=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def assert_valid_trace(trace):
+    assert trace["version"] == 1
+    assert trace["startTime"].endswith("Z")
+    assert trace["endTime"] >= trace["startTime"]
+    for phase in ("parsing", "validation", "execution"):
+        assert trace[phase]["startOffset"] >= 0
+        assert trace[phase]["duration"] >= 0
+    assert trace["parsing"]["startOffset"] <= trace["validation"]["startOffset"]
+    assert trace["validation"]["startOffset"] <= trace["execution"]["startOffset"]
+    assert trace["duration"] >= trace["execution"]["duration"]
+
+
+def test_adds_trace_to_extensions(app, client):
+    response = client.get(url_string(app, query="{ test context { session } }"))
+
+    assert response.status_code == 200
+    result = response_json(response)
+    assert result["data"] == {"test": "Hello World", "context": {"session": None}}
+    trace = result["extensions"]["tracing"]
+    assert_valid_trace(trace)
+    resolvers = trace["execution"]["resolvers"]
+    assert [
+        (r["path"], r["parentType"], r["fieldName"], r["returnType"])
+        for r in resolvers
+    ] == [
+        (["test"], "QueryRoot", "test", "String"),
+        (["context"], "QueryRoot", "context", "context"),
+        (["context", "session"], "context", "session", "String"),
+    ]
+    for resolver in resolvers:
+        assert resolver["startOffset"] >= trace["execution"]["startOffset"]
+        assert resolver["duration"] >= 0
+
+
+def test_does_not_trace_invalid_queries(app, client):
+    response = client.get(url_string(app, query="{ unknown }"))
+
+    assert response.status_code == 400
+    assert "extensions" not in response_json(response)
+
+
+def test_keeps_custom_middleware():
+    def upper_middleware(next_, root, info, **args):
+        return next_(root, info, **args).upper()
+
+    app = create_app(tracing=True, middleware=[upper_middleware])
+    client = app.test_client()
+
+    response = client.get(url_string(app, query="{ test }"))
+
+    result = response_json(response)
+    assert result["data"] == {"test": "HELLO WORLD"}
+    assert len(result["extensions"]["tracing"]["execution"]["resolvers"]) == 1
+
+
+@pytest.mark.parametrize("app", [create_app(tracing=traces.append)])
+def test_sends_trace_to_sink(app, client):
+    traces.clear()
+    response = client.get(url_string(app, query="{ test }"))
+
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+    assert len(traces) == 1
+    assert_valid_trace(traces[0])
+
+
+@pytest.mark.parametrize("app", [create_app(tracing=True, batch=True)])
+def test_traces_every_operation_of_a_batch(app, client):
+    response = client.post(
+        url_string(app),
+        json=[{"query": "{ test }"}, {"query": "{ context { session } }"}],
+    )
+
+    results = response_json(response)
+    assert [
+        len(result["extensions"]["tracing"]["execution"]["resolvers"])
+        for result in results
+    ] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "app",
+    [create_app(view_class=AsyncGraphQLView, schema=AsyncSchema, tracing=True)],
+)
+def test_traces_async_resolvers(app, client):
+    response = client.get(url_string(app, query="{ a b c }"))
+
+    result = response_json(response)
+    assert result["data"] == {"a": "hey", "b": "hey2", "c": "hey3"}
+    trace = result["extensions"]["tracing"]
+    assert_valid_trace(trace)
+    durations = {
+        r["fieldName"]: r["duration"] for r in trace["execution"]["resolvers"]
+    }
+    assert durations["a"] >= 1_000_000
+    assert durations["c"] < durations["a"]
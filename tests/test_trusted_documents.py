@@ -0,0 +1,188 @@
+import json
+from hashlib import sha256
+
+import pytest
+
+from flask_graphql import TrustedDocuments
+from flask_graphql.trusted_documents import load_manifest
+
+from .app import create_app
+from .schema import Schema
+from .test_graphqlview import response_json, url_string
+
+QUERY = "query helloWho($who: String){ test(who: $who) }"
+QUERY_HASH = sha256(QUERY.encode("utf-8")).hexdigest()
+MUTATION = "mutation TestMutation { writeTest { test } }"
+MUTATION_HASH = sha256(MUTATION.encode("utf-8")).hexdigest()
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({QUERY_HASH: QUERY, MUTATION_HASH: MUTATION}))
+    return str(path)
+
+
+@pytest.fixture
+def app(manifest):
+    app = create_app(trusted_documents=manifest, batch=True)
+
+    ctx = app.app_context()
+    ctx.push()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def error_response(message, code):
+    return {
+        "errors": [
+            {
+                "message": message,
+                "locations": None,
+                "path": None,
+                "extensions": {"code": code},
+            }
+        ]
+    }
+
+
+def test_executes_documents_by_id(app, client):
+    for response in (
+        client.get(url_string(app, documentId=QUERY_HASH)),
+        client.get(url_string(app, documentId="sha256:" + QUERY_HASH)),
+        client.post(
+            url_string(app),
+            json={"documentId": QUERY_HASH, "variables": {"who": "Dolly"}},
+        ),
+    ):
+        assert response.status_code == 200
+        assert response_json(response)["data"]["test"].startswith("Hello")
+
+
+def test_executes_documents_by_persisted_query_hash(app, client):
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": MUTATION_HASH}}
+    response = client.post(url_string(app), json={"extensions": extensions})
+
+    assert response.status_code == 200
+    assert response_json(response) == {
+        "data": {"writeTest": {"test": "Hello World"}}
+    }
+
+
+def test_accepts_query_text_matching_the_document(app, client):
+    response = client.post(
+        url_string(app), json={"documentId": QUERY_HASH, "query": QUERY}
+    )
+
+    assert response_json(response) == {"data": {"test": "Hello World"}}
+
+
+def test_rejects_arbitrary_queries(app, client):
+    for response in (
+        client.get(url_string(app, query="{ test }")),
+        client.post(url_string(app), json={"query": QUERY}),
+    ):
+        assert response.status_code == 400
+        assert response_json(response) == error_response(
+            "Only trusted documents may be executed, send a documentId.",
+            "OPERATION_NOT_IN_PERSISTED_QUERY_LIST",
+        )
+
+    response = client.post(
+        url_string(app), json={"documentId": QUERY_HASH, "query": "{ test }"}
+    )
+    assert response_json(response) == error_response(
+        "Provided query does not match the document.",
+        "OPERATION_NOT_IN_PERSISTED_QUERY_LIST",
+    )
+
+
+def test_rejects_unknown_documents(app, client):
+    response = client.get(url_string(app, documentId="unknown"))
+
+    assert response.status_code == 400
+    assert response_json(response) == error_response(
+        "Unknown document id 'unknown'.", "PERSISTED_QUERY_NOT_IN_LIST"
+    )
+
+
+def test_reports_errors_per_operation_of_a_batch(app, client):
+    response = client.post(
+        url_string(app),
+        json=[{"documentId": QUERY_HASH}, {"query": "{ test }"}],
+    )
+
+    assert response.status_code == 400
+    results = response_json(response)
+    assert results[0] == {"data": {"test": "Hello World"}}
+    assert results[1]["errors"][0]["extensions"] == {
+        "code": "OPERATION_NOT_IN_PERSISTED_QUERY_LIST"
+    }
+
+
+def test_requests_do_not_parse_documents():
+    documents = TrustedDocuments({QUERY_HASH: QUERY, MUTATION_HASH: MUTATION})
+    app = create_app(trusted_documents=documents)
+    assert documents.document_cache.info()[1:] == (2, 0, 2, 2)
+
+    client = app.test_client()
+    for _ in range(3):
+        client.get(url_string(app, documentId=QUERY_HASH))
+
+    assert documents.document_cache.info()[1:] == (2, 0, 2, 2)
+
+
+def test_rejects_invalid_documents_when_the_view_is_created():
+    with pytest.raises(ValueError) as exc_info:
+        create_app(trusted_documents={"a": "{ test }", "b": "{ unknown }", "c": "{"})
+
+    assert str(exc_info.value) == (
+        "Invalid trusted documents:\n"
+        "b: Cannot query field 'unknown' on type 'QueryRoot'.\n"
+        "c: Syntax Error: Expected Name, found <EOF>."
+    )
+
+
+def test_prepares_documents_for_several_schemas():
+    documents = TrustedDocuments({QUERY_HASH: QUERY})
+    other_schema = type(Schema)(query=Schema.query_type)
+
+    assert documents.prepare(Schema) is documents.prepare(other_schema)
+    assert len(documents.document_cache) == 2
+
+
+def test_loads_apollo_manifests(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(
+        json.dumps(
+            {
+                "format": "apollo-persisted-query-manifest",
+                "version": 1,
+                "operations": [
+                    {
+                        "id": QUERY_HASH,
+                        "name": "helloWho",
+                        "type": "query",
+                        "body": QUERY,
+                    }
+                ],
+            }
+        )
+    )
+
+    assert load_manifest(str(path)) == {QUERY_HASH: QUERY}
+
+
+@pytest.mark.parametrize(
+    "manifest", [[QUERY], {"a": 1}, {"operations": [{"id": "a"}]}, {"operations": 1}]
+)
+def test_rejects_invalid_manifests(tmp_path, manifest):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError):
+        load_manifest(str(path))
@@ -0,0 +1,232 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from flask_graphql import GraphQLUpload
+from graphql import (GraphQLArgument, GraphQLField, GraphQLList,
+                     GraphQLNonNull, GraphQLObjectType, GraphQLSchema,
+                     GraphQLString)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+uploads = []
+
+
+def describe(file):
+    uploads.append(file)
+    content = file.read().decode()
+    rolled = "disk" if file.stream._rolled else "memory"
+    return f"{file.filename}:{content[:5]}:{len(content)}:{rolled}"
+
+
+UploadSchema = GraphQLSchema(
+    query=GraphQLObjectType(
+        "Query", {"hello": GraphQLField(GraphQLString, resolve=lambda *_: "world")}
+    ),
+    mutation=GraphQLObjectType(
+        "Mutation",
+        {
+            "upload": GraphQLField(
+                GraphQLString,
+                args={"file": GraphQLArgument(GraphQLNonNull(GraphQLUpload))},
+                resolve=lambda _root, _info, file: describe(file),
+            ),
+            "uploadMany": GraphQLField(
+                GraphQLList(GraphQLString),
+                args={"files": GraphQLArgument(GraphQLList(GraphQLUpload))},
+                resolve=lambda _root, _info, files: [describe(f) for f in files],
+            ),
+        },
+    ),
+)
+
+UPLOAD = "mutation Upload($file: Upload!) { upload(file: $file) }"
+UPLOAD_MANY = "mutation UploadMany($files: [Upload]) { uploadMany(files: $files) }"
+
+
+@pytest.fixture(autouse=True)
+def clear_uploads():
+    uploads.clear()
+
+
+def create_upload_app(**kwargs):
+    return create_app(
+        schema=UploadSchema, multipart_uploads=True, upload_spool_size=100, **kwargs
+    )
+
+
+def post_multipart(app, operations, file_map, files):
+    data = {"operations": json.dumps(operations), "map": json.dumps(file_map)}
+    for name, (content, filename) in files.items():
+        data[name] = (BytesIO(content), filename)
+    return app.test_client().post(
+        url_string(app), data=data, content_type="multipart/form-data"
+    )
+
+
+def test_maps_files_into_variables():
+    app = create_upload_app()
+
+    response = post_multipart(
+        app,
+        {"query": UPLOAD, "variables": {"file": None}},
+        {"0": ["variables.file"]},
+        {"0": (b"hello", "a.txt")},
+    )
+
+    assert response.status_code == 200
+    assert response_json(response) == {"data": {"upload": "a.txt:hello:5:memory"}}
+    # Werkzeug closes the files with the request.
+    assert uploads[0].stream.closed
+
+
+def test_spools_large_files_to_disk():
+    app = create_upload_app()
+
+    response = post_multipart(
+        app,
+        {"query": UPLOAD_MANY, "variables": {"files": [None, None]}},
+        {"small": ["variables.files.0"], "large": ["variables.files.1"]},
+        {"small": (b"x" * 100, "small.txt"), "large": (b"y" * 101, "large.txt")},
+    )
+
+    assert response_json(response) == {
+        "data": {
+            "uploadMany": [
+                "small.txt:xxxxx:100:memory",
+                "large.txt:yyyyy:101:disk",
+            ]
+        }
+    }
+
+
+def test_maps_files_into_batches():
+    app = create_upload_app(batch=True)
+
+    response = post_multipart(
+        app,
+        [
+            {"query": UPLOAD, "variables": {"file": None}},
+            {"query": UPLOAD_MANY, "variables": {"files": [None, None]}},
+        ],
+        {
+            "0": ["0.variables.file", "1.variables.files.1"],
+            "1": ["1.variables.files.0"],
+        },
+        {"0": (b"first", "a.txt"), "1": (b"second", "b.txt")},
+    )
+
+    assert response_json(response) == [
+        {"data": {"upload": "a.txt:first:5:memory"}},
+        {"data": {"uploadMany": ["b.txt:secon:6:memory", "a.txt::0:memory"]}},
+    ]
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (
+            {"max_upload_file_size": 5},
+            "Uploaded file is too large, the limit is 5 bytes.",
+        ),
+        (
+            {"max_upload_size": 8},
+            "Uploaded files are too large, the limit is 8 bytes in total.",
+        ),
+    ],
+)
+def test_rejects_files_over_the_limits(options, message):
+    app = create_upload_app(**options)
+
+    response = post_multipart(
+        app,
+        {"query": UPLOAD_MANY, "variables": {"files": [None, None]}},
+        {"0": ["variables.files.0"], "1": ["variables.files.1"]},
+        {"0": (b"12345", "a.txt"), "1": (b"123456", "b.txt")},
+    )
+
+    assert response.status_code == 413
+    assert response_json(response)["errors"][0]["message"] == message
+
+
+@pytest.mark.parametrize(
+    "operations, file_map, message",
+    [
+        (
+            {"query": UPLOAD, "variables": {"file": None}},
+            {"1": ["variables.file"]},
+            "The file '1' is missing.",
+        ),
+        (
+            {"query": UPLOAD},
+            {"0": ["variables.file"]},
+            "The path 'variables.file' does not exist in the operations.",
+        ),
+        (
+            {"query": UPLOAD, "variables": {"file": None}},
+            {"0": "variables.file"},
+            "The paths of the file '0' must be a list.",
+        ),
+        ("query", {}, "The operations must be an object or an array."),
+    ],
+)
+def test_rejects_invalid_multipart_requests(operations, file_map, message):
+    app = create_upload_app()
+
+    response = post_multipart(app, operations, file_map, {"0": (b"data", "a.txt")})
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        f"Invalid multipart request: {message}"
+    )
+
+
+def test_measures_variables_without_the_files():
+    app = create_upload_app(max_variables_size=40)
+    files = {"0": (b"x" * 100, "a.txt")}
+
+    response = post_multipart(
+        app,
+        {"query": UPLOAD, "variables": {"file": None}},
+        {"0": ["variables.file"]},
+        files,
+    )
+    assert response_json(response) == {"data": {"upload": "a.txt:xxxxx:100:memory"}}
+
+    response = post_multipart(
+        app,
+        {"query": UPLOAD, "variables": {"file": None, "padding": "x" * 40}},
+        {"0": ["variables.file"]},
+        files,
+    )
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "The variables are too large, the limit is 40 bytes."
+    )
+
+
+def test_accepts_form_data_without_operations():
+    app = create_upload_app()
+
+    response = app.test_client().post(
+        url_string(app),
+        data={"query": "{ hello }", "file": (BytesIO(b"ignored"), "a.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert response_json(response) == {"data": {"hello": "world"}}
+
+
+def test_rejects_upload_values_that_are_not_files():
+    app = create_upload_app()
+
+    response = app.test_client().post(
+        url_string(app), json={"query": UPLOAD, "variables": {"file": "a.txt"}}
+    )
+
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Variable '$file' got invalid value 'a.txt'; Upload value is not a file."
+    )
@@ -0,0 +1,223 @@
+import json
+
+import pytest
+from graphql_server import load_json_variables
+
+from flask_graphql.execution_plan import ExecutionPlan
+from flask_graphql.variables import VariablesPlan
+from graphql import execute, parse
+from graphql.type import (GraphQLArgument, GraphQLBoolean, GraphQLField,
+                          GraphQLFloat, GraphQLID, GraphQLInputField,
+                          GraphQLInputObjectType, GraphQLInt, GraphQLList,
+                          GraphQLNonNull, GraphQLObjectType, GraphQLScalarType,
+                          GraphQLSchema, GraphQLString)
+
+from .app import create_app
+from .test_graphqlview import response_json, url_string
+
+
+class Point:
+    def __init__(self, values):
+        self.values = values
+
+
+def parse_even(value):
+    if value % 2:
+        raise ValueError("Odd number.")
+    return value
+
+
+EvenType = GraphQLScalarType("Even", parse_value=parse_even)
+
+FilterType = GraphQLInputObjectType(
+    "Filter",
+    lambda: {
+        "name": GraphQLInputField(GraphQLNonNull(GraphQLString), out_name="title"),
+        "limit": GraphQLInputField(GraphQLInt, default_value=10),
+        "tags": GraphQLInputField(GraphQLList(GraphQLNonNull(GraphQLID))),
+        "and": GraphQLInputField(GraphQLList(FilterType)),
+    },
+)
+
+PointType = GraphQLInputObjectType(
+    "Point",
+    {"x": GraphQLInputField(GraphQLFloat), "y": GraphQLInputField(GraphQLFloat)},
+    out_type=Point,
+)
+
+
+def echo(_root, _info, **args):
+    return json.dumps(
+        args, sort_keys=True, default=lambda value: vars(value) | {"type": "Point"}
+    )
+
+
+schema = GraphQLSchema(
+    GraphQLObjectType(
+        "Query",
+        {
+            "echo": GraphQLField(
+                GraphQLString,
+                args={
+                    "filters": GraphQLArgument(GraphQLList(FilterType)),
+                    "points": GraphQLArgument(GraphQLList(GraphQLList(PointType))),
+                    "flag": GraphQLArgument(GraphQLBoolean),
+                    "even": GraphQLArgument(EvenType),
+                    "size": GraphQLArgument(GraphQLNonNull(GraphQLInt)),
+                },
+                resolve=echo,
+            )
+        },
+    )
+)
+
+QUERY = """
+    query Echo(
+        $filters: [Filter]
+        $points: [[Point]]
+        $flag: Boolean = true
+        $even: Even
+        $size: Int!
+    ) {
+        echo(filters: $filters, points: $points, flag: $flag, even: $even, size: $size)
+    }
+"""
+
+
+def execute_planned(query, variables, operation_name=None):
+    document = parse(query)
+    plan = ExecutionPlan(schema, document)
+    return execute(
+        schema,
+        document,
+        variable_values=variables,
+        operation_name=operation_name,
+        execution_context_class=plan.execution_context_class,
+    )
+
+
+VALID_VARIABLES = [
+    {"size": 1},
+    {"size": 2, "flag": None, "even": 4},
+    {
+        "size": 3,
+        "filters": [
+            {"name": "a", "tags": ["x", 1]},
+            None,
+            {"name": "b", "limit": None, "and": [{"name": "c", "and": []}]},
+        ],
+        "points": [[{"x": 1, "y": 2.5}], [None], None],
+    },
+    {"size": 4, "filters": [{"name": "single", "tags": "one"}], "points": []},
+]
+
+# Coerced by graphql-core, because they are invalid or need a conversion.
+OTHER_VARIABLES = [
+    {"size": 5, "filters": [{"name": "a", "tags": [None]}]},
+    {"size": 6, "filters": [{"limit": 1}]},
+    {"size": 7, "filters": [{"name": "a", "unknown": 1}]},
+    {"size": 8, "points": [[{"x": "1"}]]},
+    {"size": 9, "even": 3},
+    {"size": 2 ** 31},
+    {"size": 1.0},
+    {"size": None},
+    {"flag": True},
+    {"size": 10, "filters": "not a filter"},
+    {"size": 11, "filters": {"name": "single"}},
+    None,
+]
+
+
+@pytest.mark.parametrize(
+    "variables, planned",
+    [(variables, True) for variables in VALID_VARIABLES]
+    + [(variables, False) for variables in OTHER_VARIABLES],
+)
+def test_coerces_variables_like_graphql_core(variables, planned):
+    expected = execute(schema, parse(QUERY), variable_values=variables)
+    plan = VariablesPlan(schema, parse(QUERY).definitions[0])
+
+    assert execute_planned(QUERY, variables) == expected
+    assert (plan.coerce(variables) is not None) == planned
+
+
+def test_coerces_lists_of_input_objects():
+    filters = [{"name": f"filter {index}", "tags": [index]} for index in range(1000)]
+    plan = VariablesPlan(schema, parse(QUERY).definitions[0])
+
+    coerced = plan.coerce({"filters": filters, "size": 1})
+
+    assert coerced["filters"][999] == {
+        "title": "filter 999",
+        "limit": 10,
+        "tags": ["999"],
+    }
+    assert coerced["flag"] is True
+    filters[500]["name"] = None
+    assert plan.coerce({"filters": filters, "size": 1}) is None
+
+
+def test_finds_operations_like_graphql_core():
+    query = "query A { __typename } query B($size: Int!) { echo(size: $size) }"
+    plan = ExecutionPlan(schema, parse(query))
+
+    assert plan.get_operation(None) is None
+    assert plan.get_operation("C") is None
+    operation, _variables_plan = plan.get_operation("B")
+    assert operation.name.value == "B"
+    assert plan.get_operation("B")[0] is operation
+
+    for operation_name in (None, "C", "B"):
+        assert execute_planned(query, {"size": 1}, operation_name) == execute(
+            schema,
+            parse(query),
+            variable_values={"size": 1},
+            operation_name=operation_name,
+        )
+
+
+def test_coerces_variables_of_compiled_queries_in_the_view():
+    app = create_app(schema=schema, compile_queries=True)
+    client = app.test_client()
+    query = "query Q($size: Int!, $flag: Boolean) { echo(size: $size, flag: $flag) }"
+
+    response = client.get(
+        url_string(app, query=query, variables=json.dumps({"size": 3, "flag": False}))
+    )
+    assert response_json(response) == {"data": {"echo": '{"flag": false, "size": 3}'}}
+
+    response = client.post(
+        url_string(app), json={"query": query, "variables": {"size": "3"}}
+    )
+    assert response.status_code == 400
+    assert response_json(response)["errors"][0]["message"] == (
+        "Variable '$size' got invalid value '3'; "
+        "Int cannot represent non-integer value: '3'"
+    )
+
+
+def test_decodes_variables_once_with_all_caches(monkeypatch):
+    app = create_app(
+        schema=schema,
+        compile_queries=True,
+        response_cache=True,
+        http_caching=True,
+        introspection_cache=True,
+    )
+    decoded = []
+
+    def counting_load_json_variables(variables):
+        decoded.append(variables)
+        return load_json_variables(variables)
+
+    monkeypatch.setattr(
+        "flask_graphql.runtime.load_json_variables", counting_load_json_variables
+    )
+    query = "query Q($size: Int!) { echo(size: $size) }"
+    variables = json.dumps({"size": 3})
+    response = app.test_client().get(
+        url_string(app, query=query, variables=variables)
+    )
+
+    assert response_json(response) == {"data": {"echo": '{"size": 3}'}}
+    assert decoded == [variables]